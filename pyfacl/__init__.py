@@ -1,17 +1,52 @@
 # isort: skip_file
 
+from . import metrics
+from .metrics import MetricsRegistry
+from .pyfacl_source import (
+    ACLSource,
+    AutoSource,
+    BatchGetfaclSource,
+    CachingSource,
+    GetfaclSource,
+    IndexSource,
+    SnapshotSource,
+    XattrSource,
+)
+from .pyfacl_scheduler import FetchScheduler, ScheduledSource
+from .pyfacl_result import CheckResult, TraceResult
+from .pyfacl_query import Query, compile_query
 from .pyfacl import FACL
+from .pyfacl_kernel import FACLKernel
+from .pyfacl_path import PathResolver
 from .pyfacl_trace import FACLTrace
 from .pyfacl_has import FACLHas
+from .pyfacl_trusted import TrustedPrefixes
+from .pyfacl_groups import GroupResolver, GroupSnapshot
+from .pyfacl_multi import FACLMulti
+from .pyfacl_matrix import FACLMatrix
+from .pyfacl_memo import TraceMemo
+from .pyfacl_validate import FACLValidator
+from .pyfacl_audit import FACLAudit
+from .pyfacl_stream import FACLStream
+from .pyfacl_checkpoint import FACLCheckpoint
+from .pyfacl_diff import FACLDiff
+from .pyfacl_policy import FACLPolicy
 
 
 def has_permission(
     path: str,
     acl: str,
-    mode: str = "at_least",
+    mode: str = None,
     trace: bool = False,
     can_execute: bool = False,
     v: int = 0,
+    memo: TraceMemo = None,
+    numeric: bool = False,
+    source: ACLSource = None,
+    lazy: bool = False,
+    trusted: TrustedPrefixes = None,
+    return_result: bool = False,
+    groups=None,
     _pytest_acls: dict = None,
 ) -> bool:
     """
@@ -19,9 +54,10 @@ def has_permission(
 
     Args:
         path (str): The file or directory path to check.
-        acl (str): The ACL string to check (e.g., "user:user1:rwx").
-        mode (str): The permission mode ("at_least", "exact", or "at_most").
-            Defaults to "at_least".
+        acl (str | Query): The ACL string to check (e.g., "user:user1:rwx") or a
+            `Query` from `compile_query`.
+        mode (str, optional): The permission mode ("at_least", "exact", or
+            "at_most"). Defaults to the mode of the query, or "at_least".
         trace (bool): If True, the permission must be granted at every level of the
             directory hierarchy from root to the target path. Cannot be combined with
             can_execute. Defaults to False.
@@ -30,6 +66,23 @@ def has_permission(
             permission+mode for the target path only. Cannot be combined with trace.
             Defaults to False.
         v (int): Verbosity level. Defaults to 0.
+        memo (TraceMemo, optional): Memo of ancestor verdicts shared across calls,
+            used by trace and can_execute checks. Defaults to None.
+        numeric (bool): Match numeric uids/gids (e.g., "user:1234:r-x") using
+            `getfacl -n` and `os.getgrouplist` instead of names. Defaults to False.
+        source (ACLSource, optional): Backend used to read FACLs, e.g. an
+            `XattrSource` or a `CachingSource`. Defaults to running `getfacl`.
+        lazy (bool): For trace and can_execute checks, walk top-down from `/` and
+            stop at the first denial instead of fetching every level. Defaults to
+            False.
+        trusted (TrustedPrefixes, optional): Trusted boundaries whose ancestor
+            verdicts are reused by trace and can_execute checks. Defaults to None.
+        return_result (bool): Return a `CheckResult` (or `TraceResult` for trace and
+            can_execute checks) with the matched entry, path chain and timing
+            instead of a bool. Results are falsy if denied. Defaults to False.
+        groups (GroupResolver | GroupSnapshot, optional): Resolve the group
+            memberships of users, e.g. from a snapshot of another host. Defaults to
+            `id -Gn` (or `os.getgrouplist` if numeric).
         _pytest_acls (dict, optional): Pre-defined ACL dictionary for testing purposes.
 
     Returns:
@@ -48,25 +101,104 @@ def has_permission(
         )
         raise ValueError(msg)
 
-    if trace:
-        return FACLTrace(path=path, v=v).has_permission(
-            acl, mode, _pytest_acls=_pytest_acls
-        )
+    if _pytest_acls is not None:
+        source = SnapshotSource(_pytest_acls, v=v)
+    kwargs = dict(v=v, numeric=numeric, source=source, groups=groups)
 
-    if can_execute:
-        return FACLHas(path=path, v=v).has_permission(
-            acl, mode, _pytest_acls=_pytest_acls
-        )
+    with metrics.registry.timed("pyfacl_check_duration_seconds", api="has_permission"):
+        if trace or can_execute:
+            cls = FACLTrace if trace else FACLHas
+            checker = cls(path=path, memo=memo, trusted=trusted, **kwargs)
+            if return_result:
+                return checker.check(acl, mode, lazy=lazy)
+            return checker.has_permission(acl, mode, lazy=lazy)
 
-    # Basic single-path check
-    if _pytest_acls is not None:
-        facl = FACL(_facl=_pytest_acls[path], v=v)
-        facl.is_init = True
-        facl._parse_metadata()
-        facl._parse_acls()
+        # Basic single-path check
+        facl = FACL(path=path, **kwargs)
+        if return_result:
+            return facl.check(acl, mode)
         return facl.has_permission(acl, mode)
 
-    return FACL(path=path, v=v).has_permission(acl, mode)
+
+def has_permissions(
+    path: str,
+    acls: list,
+    mode: str = "at_least",
+    trace: bool = False,
+    can_execute: bool = False,
+    v: int = 0,
+    numeric: bool = False,
+    source: ACLSource = None,
+    groups=None,
+    _pytest_acls: dict = None,
+) -> dict:
+    """
+    Check which of many users or groups have a certain permission for a given path.
+
+    Args:
+        path (str): The file or directory path to check.
+        acls (list): The ACL strings (e.g., ["user:user1:r-x"]) or `Query` objects.
+        mode (str): The permission mode ("at_least", "exact", or "at_most").
+            Defaults to "at_least".
+        trace (bool): Same as in `has_permission`. Defaults to False.
+        can_execute (bool): Same as in `has_permission`. Defaults to False.
+        v (int): Verbosity level. Defaults to 0.
+        numeric (bool): Same as in `has_permission`. Defaults to False.
+        source (ACLSource, optional): Same as in `has_permission`.
+        groups (GroupResolver | GroupSnapshot, optional): Same as in
+            `has_permission`.
+        _pytest_acls (dict, optional): Pre-defined ACL dictionary for testing purposes.
+
+    Returns:
+        dict: Mapping of each ACL string to True if the permission check passes.
+
+    Raises:
+        ValueError: If both trace and can_execute are True.
+    """
+    if trace and can_execute:
+        raise ValueError("Cannot set both 'trace' and 'can_execute' to True.")
+
+    if _pytest_acls is not None:
+        source = SnapshotSource(_pytest_acls, v=v)
+
+    return FACLMulti(
+        path=path, v=v, numeric=numeric, source=source, groups=groups
+    ).has_permission(acls, mode, trace=trace, can_execute=can_execute)
 
 
-__all__ = ["FACL", "FACLTrace", "FACLHas", "has_permission"]
+__all__ = [
+    "MetricsRegistry",
+    "ACLSource",
+    "AutoSource",
+    "BatchGetfaclSource",
+    "CachingSource",
+    "GetfaclSource",
+    "IndexSource",
+    "SnapshotSource",
+    "XattrSource",
+    "FetchScheduler",
+    "ScheduledSource",
+    "CheckResult",
+    "TraceResult",
+    "Query",
+    "compile_query",
+    "FACL",
+    "FACLKernel",
+    "PathResolver",
+    "FACLTrace",
+    "FACLHas",
+    "TrustedPrefixes",
+    "FACLMulti",
+    "FACLMatrix",
+    "TraceMemo",
+    "FACLAudit",
+    "FACLStream",
+    "FACLCheckpoint",
+    "FACLDiff",
+    "FACLPolicy",
+    "FACLValidator",
+    "GroupResolver",
+    "GroupSnapshot",
+    "has_permission",
+    "has_permissions",
+]
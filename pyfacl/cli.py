@@ -1,12 +1,122 @@
+import json
+import sys
+
 import typer
 
-from pyfacl import FACLHas, FACLTrace
+from pyfacl import (
+    AutoSource,
+    BatchGetfaclSource,
+    FACLAudit,
+    FACLCheckpoint,
+    FACLDiff,
+    FACLHas,
+    FACLPolicy,
+    FACLStream,
+    FACLTrace,
+    FACLValidator,
+    GetfaclSource,
+    GroupSnapshot,
+    ScheduledSource,
+    TrustedPrefixes,
+    XattrSource,
+)
+from pyfacl.pyfacl_diff import load_snapshot
 
 app = typer.Typer(
     help="pyfacl: A tool to manage and analyze POSIX file ACLs.", no_args_is_help=True
 )
 
 
+SOURCES = {
+    "auto": AutoSource,
+    "getfacl": GetfaclSource,
+    "getfacl-batch": BatchGetfaclSource,
+    "xattr": XattrSource,
+}
+
+
+def _get_source(name: str, numeric: bool = False):
+    """Return the ACL source for a backend name."""
+    if name not in SOURCES:
+        raise typer.BadParameter(
+            f"Invalid source '{name}'. Choose from {', '.join(SOURCES)}."
+        )
+    return SOURCES[name](numeric=numeric)
+
+
+def _schedule(source, rate: float, max_concurrency: int, target_latency: float):
+    """Wrap a source in a fetch scheduler if any limit is configured."""
+    if rate is None and max_concurrency is None and target_latency is None:
+        return source
+    return ScheduledSource(
+        source,
+        rate=rate,
+        max_concurrency=max_concurrency or 4,
+        target_latency=target_latency,
+    )
+
+
+def _get_groups(group_file: str, passwd_file: str, numeric: bool = False):
+    """Return a group snapshot from dumps, or None to resolve groups locally."""
+    if not group_file:
+        if passwd_file:
+            raise typer.BadParameter("--passwd-file requires --group-file.")
+        return None
+    return GroupSnapshot.from_files(group_file, passwd_file, numeric=numeric)
+
+
+def _get_validator(
+    rate: float, max_overhead: float, engine: str, numeric: bool, source
+):
+    """Return a validator against the kernel, or None if validation is off."""
+    if not rate:
+        return None
+    try:
+        return FACLValidator(
+            rate=rate,
+            max_overhead=max_overhead,
+            engine=engine,
+            numeric=numeric,
+            source=source,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+def _report_validation(validator, output: str) -> None:
+    """Print the validation summary and write the discrepancies."""
+    if validator is None:
+        return
+    typer.echo(validator.summary(), err=True)
+    if output:
+        validator.write(output)
+
+
+def _get_trusted(prefixes: list, trust_mounts: bool):
+    """Return the trusted boundaries, or None if none are configured."""
+    if not prefixes and not trust_mounts:
+        return None
+    return TrustedPrefixes(prefixes or [], mount_points=trust_mounts)
+
+
+TRUSTED_HELP = "Trust the FACLs of this directory and its ancestors (repeatable)."
+TRUST_MOUNTS_HELP = "Trust the FACLs of all mount points and their ancestors."
+GROUP_FILE_HELP = "Resolve groups from this /etc/group or 'getent group' dump."
+PASSWD_FILE_HELP = "Primary groups from this /etc/passwd or 'getent passwd' dump."
+RATE_HELP = (
+    "Maximum paths fetched per second over all jobs, to protect shared metadata "
+    "servers."
+)
+MAX_CONCURRENCY_HELP = "Maximum fetches in flight per mount."
+TARGET_LATENCY_HELP = "Adapt concurrency per mount to keep fetches below N seconds."
+VALIDATE_RATE_HELP = (
+    "Compare this fraction of paths with the kernel as the current user."
+)
+VALIDATE_OVERHEAD_HELP = "Maximum fraction of the run time spent validating."
+VALIDATE_ENGINE_HELP = "The checks to validate: 'facl', 'trace' or 'has'."
+VALIDATE_OUTPUT_HELP = "Write discrepancies with the kernel to this JSON lines file."
+
+
 @app.command("trace")
 def permission_trace(
     path: str = typer.Argument(..., help="The file or directory path to trace."),
@@ -17,11 +127,29 @@ def permission_trace(
         "at_least",
         help="The mode, must be 'exact', 'at_least', 'at_most'.",
     ),
+    numeric: bool = typer.Option(
+        False, help="Match numeric uids/gids (e.g., 'user:1234:r-x')."
+    ),
+    source: str = typer.Option(
+        "getfacl",
+        help="The ACL backend: 'auto', 'getfacl', 'getfacl-batch' or 'xattr'.",
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+    trusted: list[str] = typer.Option(None, help=TRUSTED_HELP),
+    trust_mounts: bool = typer.Option(False, help=TRUST_MOUNTS_HELP),
 ):
     """
     Trace and analyze ACL permissions through a directory hierarchy.
     """
-    facl_trace = FACLTrace(path=path, v=1)
+    facl_trace = FACLTrace(
+        path=path,
+        v=1,
+        numeric=numeric,
+        groups=_get_groups(group_file, passwd_file, numeric),
+        source=_get_source(source, numeric),
+        trusted=_get_trusted(trusted, trust_mounts),
+    )
     has_permission = facl_trace.has_permission(acl, mode)
     if has_permission:
         typer.echo(f"Permission '{mode}' for ACL '{acl}' is granted on path '{path}'.")
@@ -40,12 +168,30 @@ def permission_has(
     mode: str = typer.Option(
         "at_least", help="The mode, must be 'exact', 'at_least', 'at_most'."
     ),
+    numeric: bool = typer.Option(
+        False, help="Match numeric uids/gids (e.g., 'user:1234:r-x')."
+    ),
+    source: str = typer.Option(
+        "getfacl",
+        help="The ACL backend: 'auto', 'getfacl', 'getfacl-batch' or 'xattr'.",
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+    trusted: list[str] = typer.Option(None, help=TRUSTED_HELP),
+    trust_mounts: bool = typer.Option(False, help=TRUST_MOUNTS_HELP),
 ):
     """
     Check if user/group can navigate to path (--x), and specified ACL granted.
     """
     # get trace and final paths
-    facl_has = FACLHas(path=path, v=1)
+    facl_has = FACLHas(
+        path=path,
+        v=1,
+        numeric=numeric,
+        groups=_get_groups(group_file, passwd_file, numeric),
+        source=_get_source(source, numeric),
+        trusted=_get_trusted(trusted, trust_mounts),
+    )
     has_permission = facl_has.has_permission(acl, mode)
     if has_permission:
         typer.echo(f"Permission '{mode}' for ACL '{acl}' is granted on path '{path}'.")
@@ -55,6 +201,242 @@ def permission_has(
         )
 
 
+@app.command("audit")
+def permission_audit(
+    acl: str = typer.Argument(
+        ..., help="The ACL string to check (e.g., 'user:user1:rwx')."
+    ),
+    paths: list[str] = typer.Argument(None, help="The file or directory paths."),
+    paths_from: str = typer.Option(
+        None, help="Read paths from a file, one per line ('-' for stdin)."
+    ),
+    mode: str = typer.Option(
+        "at_least", help="The mode, must be 'exact', 'at_least', 'at_most'."
+    ),
+    trace: bool = typer.Option(False, help="Require the ACL at every level."),
+    can_execute: bool = typer.Option(
+        False, help="Require --x on parents and the ACL on the path."
+    ),
+    jobs: int = typer.Option(1, help="Number of worker processes (0 for all cores)."),
+    numeric: bool = typer.Option(
+        False, help="Match numeric uids/gids (e.g., 'user:1234:r-x')."
+    ),
+    source: str = typer.Option(
+        "getfacl",
+        help="The ACL backend: 'auto', 'getfacl', 'getfacl-batch' or 'xattr'.",
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+    trusted: list[str] = typer.Option(None, help=TRUSTED_HELP),
+    trust_mounts: bool = typer.Option(False, help=TRUST_MOUNTS_HELP),
+    rate: float = typer.Option(None, help=RATE_HELP),
+    max_concurrency: int = typer.Option(None, help=MAX_CONCURRENCY_HELP),
+    target_latency: float = typer.Option(None, help=TARGET_LATENCY_HELP),
+    validate_rate: float = typer.Option(0.0, help=VALIDATE_RATE_HELP),
+    validate_overhead: float = typer.Option(0.05, help=VALIDATE_OVERHEAD_HELP),
+    validate_engine: str = typer.Option("has", help=VALIDATE_ENGINE_HELP),
+    validate_output: str = typer.Option(None, help=VALIDATE_OUTPUT_HELP),
+):
+    """
+    Check one ACL against many paths using multiple worker processes.
+    """
+    paths = list(paths or [])
+    if paths_from == "-":
+        paths.extend(line.strip() for line in sys.stdin if line.strip())
+    elif paths_from:
+        with open(paths_from) as f:
+            paths.extend(line.strip() for line in f if line.strip())
+
+    acl_source = _schedule(
+        _get_source(source, numeric), rate, max_concurrency, target_latency
+    )
+    validator = _get_validator(
+        validate_rate, validate_overhead, validate_engine, numeric, acl_source
+    )
+    facl_audit = FACLAudit(
+        acl,
+        mode,
+        trace=trace,
+        can_execute=can_execute,
+        jobs=jobs,
+        numeric=numeric,
+        groups=_get_groups(group_file, passwd_file, numeric),
+        source=acl_source,
+        trusted=_get_trusted(trusted, trust_mounts),
+        validator=validator,
+    )
+    n_granted = n_total = 0
+    for path, granted in facl_audit.run(paths):
+        n_total += 1
+        n_granted += granted
+        typer.echo(f"{'granted' if granted else 'denied'}\t{path}")
+    typer.echo(
+        f"Permission '{mode}' for ACL '{acl}' is granted on {n_granted}/{n_total} "
+        "paths.",
+        err=True,
+    )
+    _report_validation(validator, validate_output)
+
+
+@app.command("audit-tree")
+def permission_audit_tree(
+    root: str = typer.Argument(..., help="The directory to audit recursively."),
+    acl: str = typer.Argument(
+        ..., help="The ACL string to check (e.g., 'user:user1:rwx')."
+    ),
+    mode: str = typer.Option(
+        "at_least", help="The mode, must be 'exact', 'at_least', 'at_most'."
+    ),
+    trace: bool = typer.Option(False, help="Require the ACL at every level."),
+    can_execute: bool = typer.Option(
+        False, help="Require --x on parents and the ACL on the path."
+    ),
+    numeric: bool = typer.Option(
+        False, help="Match numeric uids/gids (e.g., 'user:1234:r-x')."
+    ),
+    source: str = typer.Option(
+        "getfacl",
+        help="The ACL backend: 'auto', 'getfacl', 'getfacl-batch' or 'xattr'.",
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+    max_acls: int = typer.Option(
+        1024, help="Maximum number of distinct parsed ACLs kept in memory."
+    ),
+    max_depth: int = typer.Option(None, help="Maximum depth below the root."),
+    output: str = typer.Option(
+        None, help="Write the results to this file instead of stdout."
+    ),
+    checkpoint: str = typer.Option(
+        None, help="Periodically save progress to this file (requires --output)."
+    ),
+    checkpoint_interval: float = typer.Option(
+        60.0, help="Seconds between two checkpoints."
+    ),
+    resume: bool = typer.Option(
+        False, help="Continue an interrupted audit from its --checkpoint."
+    ),
+    rate: float = typer.Option(None, help=RATE_HELP),
+    max_concurrency: int = typer.Option(None, help=MAX_CONCURRENCY_HELP),
+    target_latency: float = typer.Option(None, help=TARGET_LATENCY_HELP),
+    validate_rate: float = typer.Option(0.0, help=VALIDATE_RATE_HELP),
+    validate_overhead: float = typer.Option(0.05, help=VALIDATE_OVERHEAD_HELP),
+    validate_engine: str = typer.Option("has", help=VALIDATE_ENGINE_HELP),
+    validate_output: str = typer.Option(None, help=VALIDATE_OUTPUT_HELP),
+):
+    """
+    Check one ACL against every path below a directory with bounded memory.
+    """
+    if (checkpoint or resume) and not (checkpoint and output):
+        raise typer.BadParameter("--checkpoint and --resume require --output.")
+    acl_source = _schedule(
+        _get_source(source, numeric), rate, max_concurrency, target_latency
+    )
+    validator = _get_validator(
+        validate_rate, validate_overhead, validate_engine, numeric, acl_source
+    )
+    kwargs = dict(
+        trace=trace,
+        can_execute=can_execute,
+        numeric=numeric,
+        groups=_get_groups(group_file, passwd_file, numeric),
+        source=acl_source,
+        max_acls=max_acls,
+        max_depth=max_depth,
+        validator=validator,
+    )
+    if checkpoint:
+        stats = FACLCheckpoint(
+            checkpoint, acl, mode, interval=checkpoint_interval, **kwargs
+        ).run(root, output, resume=resume)
+    elif output:
+        with open(output, "w", errors="surrogateescape") as f:
+            stats = FACLStream(acl, mode, **kwargs).run(
+                root,
+                lambda path, granted: f.write(
+                    f"{'granted' if granted else 'denied'}\t{path}\n"
+                ),
+            )
+    else:
+        stats = FACLStream(acl, mode, **kwargs).run(
+            root,
+            lambda path, granted: typer.echo(
+                f"{'granted' if granted else 'denied'}\t{path}"
+            ),
+        )
+    typer.echo(
+        f"Permission '{mode}' for ACL '{acl}' is granted on "
+        f"{stats['granted']}/{stats['total']} paths.",
+        err=True,
+    )
+    _report_validation(validator, validate_output)
+
+
+@app.command("diff")
+def permission_diff(
+    old: str = typer.Argument(
+        ..., help="The old snapshot: a SQLite index or saved 'getfacl -R' output."
+    ),
+    new: str = typer.Argument(
+        ..., help="The new snapshot: a SQLite index or saved 'getfacl -R' output."
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print one JSON record per line."
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+):
+    """
+    Show who gained or lost access between two ACL snapshots.
+    """
+    facl_diff = FACLDiff(groups=_get_groups(group_file, passwd_file))
+    n_changed = 0
+    for record in facl_diff.diff(load_snapshot(old), load_snapshot(new)):
+        n_changed += 1
+        if as_json:
+            typer.echo(json.dumps(record))
+        else:
+            typer.echo(facl_diff.format_record(record))
+    typer.echo(f"{n_changed} paths with changed permissions.", err=True)
+
+
+@app.command("check-policy")
+def permission_check_policy(
+    rules: str = typer.Argument(..., help="The rule file (JSON, TOML or YAML)."),
+    paths: list[str] = typer.Argument(
+        None, help="Paths to check instead of walking the tree below the rules."
+    ),
+    numeric: bool = typer.Option(
+        False, help="Match numeric uids/gids (e.g., 'user:1234:r-x')."
+    ),
+    source: str = typer.Option(
+        "getfacl",
+        help="The ACL backend: 'auto', 'getfacl', 'getfacl-batch' or 'xattr'.",
+    ),
+    group_file: str = typer.Option(None, help=GROUP_FILE_HELP),
+    passwd_file: str = typer.Option(None, help=PASSWD_FILE_HELP),
+):
+    """
+    Check a rule file of expected permissions and list all violations.
+    """
+    policy = FACLPolicy.from_file(
+        rules,
+        numeric=numeric,
+        source=_get_source(source, numeric),
+        groups=_get_groups(group_file, passwd_file, numeric),
+    )
+    n_violations = 0
+    for violation in policy.check(paths or None):
+        n_violations += 1
+        typer.echo(
+            f"violation\t{violation['rule']}\t{violation['path']}\t"
+            f"{violation['acl']} ({violation['mode']})"
+        )
+    typer.echo(f"{n_violations} violations.", err=True)
+    if n_violations:
+        raise typer.Exit(code=1)
+
+
 def main():
     """Entry point for the CLI."""
     app()
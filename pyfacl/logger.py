@@ -1,57 +1,92 @@
 import logging
 
+_loggers = {}
+_configured = set()
 
-def logger_basic(name: str, v: int = 0) -> logging.Logger:
-    """
-    Set up and return a logger with the specified name and logging level.
 
-    Args:
-        name (str): The name of the logger.
-        level (int): The logging level (default is logging.INFO).
+class VerboseLogger:
+    """
+    Lightweight view on a shared logger with its own verbosity threshold.
 
-    Returns:
-        logging.Logger: Configured logger instance.
+    The underlying logger and its handler are configured once per name. Verbosity is
+    applied per instance, so switching `v` between calls never touches the global
+    logger or handler state. Messages use lazy `%`-style formatting.
     """
 
-    level = logging.INFO if v == 0 else logging.DEBUG
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
+    __slots__ = ("logger", "level")
+
+    def __init__(self, logger: logging.Logger, level: int) -> None:
+        self.logger = logger
+        self.level = level
+
+    def isEnabledFor(self, level: int) -> bool:
+        """
+        Return True if a message of the given level would be emitted.
+        """
+        return level >= self.level and self.logger.isEnabledFor(level)
 
-    if not logger.hasHandlers():
-        ch = logging.StreamHandler()
-        ch.setLevel(level)
+    def debug(self, msg: str, *args, **kwargs) -> None:
+        if self.isEnabledFor(logging.DEBUG):
+            self.logger.log(logging.DEBUG, msg, *args, stacklevel=2, **kwargs)
 
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        ch.setFormatter(formatter)
+    def info(self, msg: str, *args, **kwargs) -> None:
+        if self.isEnabledFor(logging.INFO):
+            self.logger.log(logging.INFO, msg, *args, stacklevel=2, **kwargs)
 
-        logger.addHandler(ch)
+    def warning(self, msg: str, *args, **kwargs) -> None:
+        if self.isEnabledFor(logging.WARNING):
+            self.logger.log(logging.WARNING, msg, *args, stacklevel=2, **kwargs)
 
-    return logger
+    def error(self, msg: str, *args, **kwargs) -> None:
+        if self.isEnabledFor(logging.ERROR):
+            self.logger.log(logging.ERROR, msg, *args, stacklevel=2, **kwargs)
 
 
-def logger_print(v: int = 0) -> logging.Logger:
+def _get_logger(name: str, level: int, fmt: str) -> VerboseLogger:
     """
-    Set up a print logger without a specific name or other configurations.
+    Return a cached logger view, configuring the named logger on first use.
+    """
+    key = (name, level)
+    if key not in _loggers:
+        logger = logging.getLogger(name)
+        if name not in _configured:
+            _configured.add(name)
+            if logger.level == logging.NOTSET:
+                logger.setLevel(logging.DEBUG)
+            if not logger.hasHandlers():
+                ch = logging.StreamHandler()
+                ch.setFormatter(logging.Formatter(fmt))
+                logger.addHandler(ch)
+        _loggers[key] = VerboseLogger(logger, level)
+    return _loggers[key]
+
+
+def logger_basic(name: str, v: int = 0) -> VerboseLogger:
+    """
+    Set up and return a logger with the specified name and logging level.
 
     Args:
+        name (str): The name of the logger.
         v (int): Verbosity level (0 for INFO, 1 for DEBUG).
 
     Returns:
-        logging.Logger: Configured logger instance.
+        VerboseLogger: Configured logger instance.
     """
-    level = logging.WARNING if v == 0 else logging.DEBUG
-    logger = logging.getLogger("print_logger")
-    logger.setLevel(level)
+    level = logging.INFO if v == 0 else logging.DEBUG
+    return _get_logger(
+        name, level, "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
 
-    if not logger.hasHandlers():
-        ch = logging.StreamHandler()
-        ch.setLevel(level)
 
-        formatter = logging.Formatter("%(message)s")
-        ch.setFormatter(formatter)
+def logger_print(v: int = 0) -> VerboseLogger:
+    """
+    Set up a print logger without a specific name or other configurations.
 
-        logger.addHandler(ch)
+    Args:
+        v (int): Verbosity level (0 for WARNING, 1 for DEBUG).
 
-    return logger
+    Returns:
+        VerboseLogger: Configured logger instance.
+    """
+    level = logging.WARNING if v == 0 else logging.DEBUG
+    return _get_logger("print_logger", level, "%(message)s")
@@ -0,0 +1,265 @@
+import bisect
+import contextlib
+import threading
+import time
+
+# upper bounds of the latency histograms, in seconds
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+HELP = {
+    "pyfacl_checks": "Permission checks by API and verdict.",
+    "pyfacl_check_duration_seconds": "Duration of permission checks by API.",
+    "pyfacl_acl_fetch_duration_seconds": "Duration of ACL fetches by source.",
+    "pyfacl_acl_fetches": "Paths whose ACL was fetched, by source.",
+    "pyfacl_cache_requests": "Cache lookups by cache and result (hit or miss).",
+    "pyfacl_group_lookup_duration_seconds": "Duration of group membership lookups.",
+    "pyfacl_subprocesses": "Subprocesses started, by command.",
+    "pyfacl_validations": "Checks compared with the kernel, by engine and result.",
+}
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        value = int(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class NullRegistry:
+    """
+    Registry that discards everything, the default while metrics are disabled.
+    """
+
+    enabled = False
+    _timer = contextlib.nullcontext()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        pass
+
+    def timed(self, name: str, **labels):
+        return self._timer
+
+    def add_collector(self, collector) -> None:
+        pass
+
+    def collect(self) -> dict:
+        return {"counters": {}, "gauges": {}, "histograms": {}}
+
+    def render(self) -> str:
+        return "# EOF\n"
+
+
+class MetricsRegistry:
+    """
+    Collect counters and latency histograms of pyfacl operations.
+
+    Metrics are disabled by default. Enable them for the process with
+    `pyfacl.metrics.enable()` (or `set_registry`), then render them as OpenMetrics
+    text with `render()` or read them with `collect()`. Callbacks registered with
+    `add_collector` are called on every collection, e.g. to export the counters of
+    a `CachingSource` or `FetchScheduler` as gauges.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        """
+        Args:
+            buckets (tuple): Upper bounds of the histogram buckets, in seconds.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Increment a counter, e.g. `inc("pyfacl_subprocesses", command="getfacl")`.
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Add an observation (e.g., a duration in seconds) to a histogram.
+        """
+        key = (name, _labels(labels))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "count": 0,
+                    "sum": 0.0,
+                }
+            histogram["buckets"][i] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    @contextlib.contextmanager
+    def timed(self, name: str, **labels):
+        """
+        Observe the duration of a `with` block in a histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, collector) -> None:
+        """
+        Register a callback returning `(name, labels, value)` gauge samples.
+        """
+        self._collectors.append(collector)
+
+    def collect(self) -> dict:
+        """
+        Return a snapshot of all metrics.
+
+        Returns:
+            dict: `counters` and `gauges` map `(name, labels)` to values,
+                `histograms` map `(name, labels)` to cumulative bucket counts
+                (by upper bound), `count` and `sum`. Labels are sorted tuples of
+                `(key, value)` pairs.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {}
+            for key, histogram in self._histograms.items():
+                cumulative = []
+                total = 0
+                for bound, count in zip(
+                    self.buckets + (float("inf"),), histogram["buckets"]
+                ):
+                    total += count
+                    cumulative.append((bound, total))
+                histograms[key] = {
+                    "buckets": cumulative,
+                    "count": histogram["count"],
+                    "sum": histogram["sum"],
+                }
+        gauges = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges[(name, _labels(labels))] = value
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def render(self) -> str:
+        """
+        Render all metrics in the OpenMetrics text format.
+        """
+        data = self.collect()
+        families = {}
+        for kind in ("counters", "gauges", "histograms"):
+            for (name, labels), value in data[kind].items():
+                families.setdefault((name, kind), []).append((labels, value))
+
+        lines = []
+        types = {"counters": "counter", "gauges": "gauge", "histograms": "histogram"}
+        for (name, kind), samples in sorted(families.items()):
+            lines.append(f"# TYPE {name} {types[kind]}")
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            for labels, value in sorted(samples, key=lambda sample: sample[0]):
+                if kind == "counters":
+                    lines.append(
+                        f"{name}_total{_format_labels(labels)} {_format_value(value)}"
+                    )
+                elif kind == "gauges":
+                    lines.append(
+                        f"{name}{_format_labels(labels)} {_format_value(value)}"
+                    )
+                else:
+                    for bound, count in value["buckets"]:
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        bucket = _format_labels(labels, f'le="{le}"')
+                        lines.append(f"{name}_bucket{bucket} {count}")
+                    lines.append(
+                        f"{name}_count{_format_labels(labels)} {value['count']}"
+                    )
+                    lines.append(
+                        f"{name}_sum{_format_labels(labels)} "
+                        f"{_format_value(value['sum'])}"
+                    )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def record_check(api: str, result) -> None:
+    """
+    Count a check and observe its duration, from a `CheckResult` or `TraceResult`.
+    """
+    if registry.enabled:
+        granted = "true" if result.granted else "false"
+        registry.inc("pyfacl_checks", api=api, granted=granted)
+        registry.observe("pyfacl_check_duration_seconds", result.elapsed, api=api)
+
+
+# the process-wide registry used by all instrumented code
+registry = NullRegistry()
+
+
+def set_registry(new_registry) -> object:
+    """
+    Replace the process-wide registry.
+
+    Returns:
+        The previous registry.
+    """
+    global registry
+    previous, registry = registry, new_registry
+    return previous
+
+
+def enable(buckets: tuple = DEFAULT_BUCKETS) -> MetricsRegistry:
+    """
+    Enable metrics for the process with a new `MetricsRegistry`.
+    """
+    new_registry = MetricsRegistry(buckets)
+    set_registry(new_registry)
+    return new_registry
+
+
+def disable() -> None:
+    """
+    Disable metrics for the process.
+    """
+    set_registry(NullRegistry())
@@ -1,7 +1,22 @@
 import os
+import stat
 import subprocess
-
-from pyfacl import logger
+import time
+
+from pyfacl import logger, metrics
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_query import Query, compile_query
+from pyfacl.pyfacl_result import CheckResult
+from pyfacl.pyfacl_source import (
+    XATTR_ACCESS,
+    GetfaclSource,
+    XattrSource,
+    _abspath,
+    _group_name,
+    _user_name,
+    reads_filesystem,
+    stat_minimal,
+)
 
 
 class FACL:
@@ -9,14 +24,48 @@ class FACL:
     Represents a POSIX File Access Control List (FACL) for a given file or directory.
     """
 
-    def __init__(self, path: str = None, v: int = 0, _facl: str = None):
+    # label of the checks in metrics
+    _api = "facl"
+
+    def __init__(
+        self,
+        path: str = None,
+        v: int = 0,
+        _facl: str = None,
+        groups=None,
+        numeric: bool = False,
+        source=None,
+    ):
         """
         Initialize the FACL object. Args are used for debugging and testing.
+
+        Args:
+            groups (GroupResolver, optional): Shared resolver used to look up group
+                memberships. If None, `id -Gn` is called for every lookup (or
+                `os.getgrouplist` in numeric mode).
+            numeric (bool): Work with numeric uids/gids instead of names. The ACL is
+                read with `getfacl -n`, queries such as `user:1234:r-x` are matched
+                by id and group memberships are resolved with `os.getgrouplist`.
+            source (ACLSource, optional): Backend used to read the FACL of `path`.
+                Defaults to running `getfacl`.
         """
         self.logger = logger.logger_basic(__name__, v)
+        if numeric and groups is None:
+            groups = GroupResolver(v=v, numeric=True)
+        self.groups_resolver = groups
+        self.numeric = numeric
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        self._index = None
         self.is_init = False
         self.facl = _facl
+        # `path` is replaced by the `# file:` header when parsed, results report
+        # the path the caller asked for
         self.path = path
+        self.requested_path = path
+        # file type and mode bits, if known from a stat
+        self.st_mode = None
         self.owner = ""
         self.group = ""
         self.flags = ""
@@ -32,17 +81,237 @@ class FACL:
                 f"Path looks like an ACL entry. Please check your input:\nPath: {path}"
             )
 
+    @classmethod
+    def from_facl(cls, facl: str, path: str = None, **kwargs) -> "FACL":
+        """
+        Create a parsed FACL object from FACL text, e.g. fetched in a batch.
+
+        Args:
+            facl (str): The FACL text in `getfacl` output format.
+            path (str, optional): The path the FACL belongs to.
+            **kwargs: Passed to `FACL`.
+        """
+        obj = cls(_facl=facl, **kwargs)
+        obj.requested_path = path
+        obj.is_init = True
+        obj._parse_metadata()
+        if obj.numeric and path and not (obj.owner and obj.group):
+            obj._stat_metadata(path)
+        obj._parse_acls()
+        return obj
+
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result, **kwargs) -> "FACL":
+        """
+        Create a FACL object from the mode bits of a file without an extended ACL.
+
+        The owner, group, flags and the `user::`, `group::` and `other::` entries
+        are the same as parsing the `getfacl` output of the file would give, but
+        no FACL text is fetched, rendered or parsed (`facl` stays empty).
+
+        Args:
+            path (str): The path the FACL belongs to.
+            st (os.stat_result): The stat of the path, see `stat_minimal`.
+            **kwargs: Passed to `FACL`.
+        """
+        obj = cls(_facl="", **kwargs)
+        obj.requested_path = path
+        obj.is_init = True
+        obj._load_stat(path, st)
+        return obj
+
+    @classmethod
+    def from_source(cls, paths: list, source, **kwargs) -> dict:
+        """
+        Fetch and parse the FACLs of many paths in one batch.
+
+        If the source reads the live filesystem, paths without an extended ACL
+        are evaluated from `os.stat` (see `from_stat`) and only the others are
+        fetched from the source, a single path with `source.get`.
+
+        Args:
+            paths (list): The paths to fetch.
+            source (ACLSource): Backend used to read FACLs.
+            **kwargs: Passed to `FACL`.
+        Returns:
+            dict: Mapping of path to parsed FACL object.
+        """
+        facls = {}
+        missing = []
+        fast = reads_filesystem(source)
+        for path in paths:
+            st = stat_minimal(path) if fast else None
+            if st is None:
+                missing.append(path)
+            else:
+                facls[path] = cls.from_stat(path, st, source=source, **kwargs)
+
+        registry = metrics.registry
+        if facls:
+            registry.inc("pyfacl_acl_fetches", len(facls), source="stat")
+        if missing:
+            name = type(source).__name__
+            registry.inc("pyfacl_acl_fetches", len(missing), source=name)
+            with registry.timed("pyfacl_acl_fetch_duration_seconds", source=name):
+                if len(missing) == 1:
+                    texts = {missing[0]: source.get(missing[0])}
+                else:
+                    texts = source.get_many(missing)
+            for path in missing:
+                facls[path] = cls.from_facl(
+                    texts[path], path=path, source=source, **kwargs
+                )
+        return {path: facls[path] for path in paths}
+
+    @classmethod
+    def scan_directory(
+        cls,
+        directory: str,
+        acl,
+        mode: str = None,
+        v: int = 0,
+        numeric: bool = False,
+        groups=None,
+    ):
+        """
+        Check a permission on every entry of a directory with a single scan.
+
+        The directory is listed once with `os.scandir` on an open directory file
+        descriptor, entries are stat'ed and their `system.posix_acl_access` xattr
+        read relative to it. Entries are grouped by what decides the verdict:
+        entries without an extended ACL by their file type, mode bits, owner and
+        group, and entries with an extended ACL by their file type, raw ACL, owner
+        and group. Each group
+        is evaluated once, so a directory of mostly plain files needs only a
+        handful of evaluations however many entries it holds.
+
+        Args:
+            directory (str): The directory whose entries are checked.
+            acl (str | Query): The ACL string (e.g., "user:user1:r-x") or a
+                compiled `Query`.
+            mode (str, optional): The permission mode. Defaults to the mode of the
+                query, or "at_least".
+            numeric (bool): Match numeric uids/gids instead of names.
+            groups (GroupResolver, optional): Shared resolver for group memberships.
+
+        Yields:
+            tuple: The path of every entry and True if the permission check passes.
+        """
+        log = logger.logger_basic(__name__, v)
+        mode = mode or getattr(acl, "mode", "at_least")
+        query = compile_query(acl, mode, numeric=numeric)
+        if groups is None:
+            groups = GroupResolver(v=v, numeric=numeric)
+        renderer = XattrSource(numeric=numeric, v=v)
+
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            # resolve names relative to the open directory instead of the full path
+            prefix = f"/proc/self/fd/{fd}/"
+            if not os.path.isdir(prefix):
+                prefix = directory.rstrip("/") + "/"
+            verdicts = {}
+            with os.scandir(fd) as entries:
+                for entry in entries:
+                    path = os.path.join(directory, entry.name)
+                    try:
+                        st = entry.stat()
+                        access = XattrSource._read_xattr(
+                            prefix + entry.name, XATTR_ACCESS
+                        )
+                    except OSError as e:
+                        log.warning("Error retrieving FACL for %s: %s", path, e)
+                        yield path, False
+                        continue
+
+                    # the file type matters too: root gets --x on any directory
+                    file_type = stat.S_IFMT(st.st_mode)
+                    if access is None:
+                        key = (file_type, st.st_mode & 0o777, st.st_uid, st.st_gid)
+                    else:
+                        key = (file_type, access, st.st_uid, st.st_gid)
+                    granted = verdicts.get(key)
+                    if granted is None:
+                        kwargs = dict(v=v, numeric=numeric, groups=groups)
+                        if access is None:
+                            facl = cls.from_stat(path, st, **kwargs)
+                        else:
+                            facl = cls.from_facl(
+                                renderer._render(
+                                    path, st, XattrSource._decode_xattr(access), []
+                                ),
+                                path=path,
+                                **kwargs,
+                            )
+                        facl.path = path
+                        granted = verdicts[key] = facl.has_permission(query, mode)
+                    yield path, granted
+            log.debug("Evaluated %d distinct ACLs in %s", len(verdicts), directory)
+        finally:
+            os.close(fd)
+
     def parse(self) -> None:
         """
         Parse the FACL for the given file or directory path.
         Args:
             path (str): The file or directory path.
         """
+        path = self.path
         self.is_init = True
-        self.facl = self._get_facl(self.path)
+        if reads_filesystem(self.source):
+            st = stat_minimal(path)
+            if st is not None:
+                metrics.registry.inc("pyfacl_acl_fetches", source="stat")
+                self._load_stat(path, st)
+                return
+        self.facl = self._get_facl(path)
         self._parse_metadata()
+        if self.numeric and not (self.owner and self.group):
+            self._stat_metadata(path)
         self._parse_acls()
 
+    def _load_stat(self, path: str, st: os.stat_result) -> None:
+        """
+        Fill in metadata and ACL entries from the mode bits, see `from_stat`.
+        """
+        self.facl = ""
+        self.st_mode = st.st_mode
+        # as in the `# file:` header of `getfacl`
+        self.path = _abspath(path).lstrip("/") or "."
+        if self.numeric:
+            self.owner, self.group = str(st.st_uid), str(st.st_gid)
+        else:
+            self.owner, self.group = _user_name(st.st_uid), _group_name(st.st_gid)
+        flags = XattrSource._mode_flags(st.st_mode)
+        if flags != "---":
+            self.flags = flags
+        names = {"user_obj": self.owner, "group_obj": self.group, "other": ""}
+        self.acls = []
+        for tag, _, permissions in XattrSource._mode_entries(st.st_mode):
+            acl_type = tag.split("_")[0]
+            self.acls.append(
+                {
+                    "default": False,
+                    "type": acl_type,
+                    "name": names[tag],
+                    "permissions": permissions,
+                    "line": f"{acl_type}::{permissions}",
+                }
+            )
+        self._after_load()
+
+    def _stat_metadata(self, path: str) -> None:
+        """
+        Fill in a missing numeric owner and group from `os.stat`.
+        """
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            self.logger.warning("Error retrieving owner for %s: %s", path, e)
+            return
+        self.owner = self.owner or str(st.st_uid)
+        self.group = self.group or str(st.st_gid)
+
     @staticmethod
     def _facl_available():
         """
@@ -51,43 +320,23 @@ class FACL:
         Returns:
             bool: True if `getfacl` is available, False otherwise.
         """
-        return (
-            subprocess.call(
-                ["which", "getfacl"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            == 0
-        )
+        return GetfaclSource._facl_available()
 
     def _get_facl(self, path: str) -> str:
         """
-        Retrieve the FACL for the given path using the `getfacl` command.
+        Retrieve the FACL for the given path from the ACL source.
 
         Args:
             path (str): The file or directory path.
         Returns:
-            str: The raw FACL output from the `getfacl` command.
+            str: The raw FACL text in `getfacl` output format.
         """
-
-        # facl available
-        if not self._facl_available():
-            self.logger.error("The 'getfacl' command is not available on this system.")
-            return ""
-
-        try:
-            # prep path
-            if not path.startswith("/"):
-                path = os.path.abspath(path)
-
-            # get facl
-            result = subprocess.run(
-                ["getfacl", path], capture_output=True, text=True, check=True
-            )
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Error retrieving FACL for {path}: {e}")
-            return ""
+        registry = metrics.registry
+        registry.inc("pyfacl_acl_fetches", source=type(self.source).__name__)
+        with registry.timed(
+            "pyfacl_acl_fetch_duration_seconds", source=type(self.source).__name__
+        ):
+            return self.source.get(path)
 
     def _parse_metadata(self):
         """
@@ -122,7 +371,8 @@ class FACL:
         for key, pattern in patterns.items():
             if pattern["required"] and pattern["pattern"] not in self.facl:
                 self.logger.warning(
-                    f"Metadata pattern '{pattern['pattern']}' not found in FACL output."
+                    "Metadata pattern '%s' not found in FACL output.",
+                    pattern["pattern"],
                 )
                 continue
             for line in self.facl.splitlines():
@@ -157,11 +407,11 @@ class FACL:
         default = len(acl_split) == 4
         if default:
             if acl_split[0] not in ["d", "default"]:
-                msg = (
-                    f"Unexpected default ACL prefix '{acl_split[0]}' in line:"
-                    f"\n{acl_line}"
+                self.logger.warning(
+                    "Unexpected default ACL prefix '%s' in line:\n%s",
+                    acl_split[0],
+                    acl_line,
                 )
-                self.logger.warning(msg)
                 return None
             acl_split = acl_split[1:]  # remove default prefix
 
@@ -178,7 +428,7 @@ class FACL:
         }
         if acl_split[0] not in type_map:
             self.logger.warning(
-                f"Unexpected ACL type '{acl_split[0]}' in line:\n{acl_line}"
+                "Unexpected ACL type '%s' in line:\n%s", acl_split[0], acl_line
             )
             return None
         acl_type = type_map[acl_split[0]]
@@ -199,7 +449,7 @@ class FACL:
         permissions = acl_split[2]
         if not all(c in "rwx-" for c in permissions) or len(permissions) != 3:
             self.logger.warning(
-                f"Invalid permissions '{permissions}' in line:\n{acl_line}"
+                "Invalid permissions '%s' in line:\n%s", permissions, acl_line
             )
             return None
 
@@ -236,6 +486,14 @@ class FACL:
             acl_entry = self._parse_acl(line)
             if acl_entry:
                 self.acls.append(acl_entry)
+        self._after_load()
+
+    def _after_load(self) -> None:
+        """
+        Reset state derived from the ACL entries after they were loaded, either
+        parsed from FACL text or built from the mode bits. Subclasses extend it.
+        """
+        self._index = None
 
     @staticmethod
     def _permission_match(perm_key: str, perm_query: str, mode: str) -> bool:
@@ -279,17 +537,45 @@ class FACL:
         Returns:
             list: List of groups the user belongs to.
         """
+        if self.groups_resolver is not None:
+            return self.groups_resolver.groups(user)
         try:
-            result = subprocess.run(
-                ["id", "-Gn", user], capture_output=True, text=True, check=True
-            )
+            metrics.registry.inc("pyfacl_subprocesses", command="id")
+            with metrics.registry.timed("pyfacl_group_lookup_duration_seconds"):
+                result = subprocess.run(
+                    ["id", "-Gn", user], capture_output=True, text=True, check=True
+                )
             groups = result.stdout.strip().split()
             return groups
         except subprocess.CalledProcessError as e:
-            self.logger.warning(f"Error retrieving groups for user {user}: {e}")
+            self.logger.warning("Error retrieving groups for user %s: %s", user, e)
             return []
 
-    def get_applicable_acl(self, acl: str) -> list:
+    def _parse_query(self, acl) -> Query:
+        """
+        Return the compiled query for an ACL string or `Query`. In numeric mode,
+        user and group names are converted to ids so they can be compared with
+        `getfacl -n` output. Owner queries (`user::r-x`) get the owner's name.
+        """
+        if isinstance(acl, Query) and acl.numeric == self.numeric:
+            query = acl
+        elif isinstance(acl, Query):
+            query = compile_query(acl, acl.mode, numeric=self.numeric)
+        else:
+            query = compile_query(acl, numeric=self.numeric)
+        if not query.name and query.type in ("user", "group"):
+            query = query.with_name(self.owner if query.type == "user" else self.group)
+        return query
+
+    def _query_groups(self, query: Query) -> list:
+        """
+        Return the pre-resolved groups of a user query, or infer them.
+        """
+        if query.groups is not None:
+            return query.groups
+        return self._infer_groups(query.name)
+
+    def get_applicable_acl(self, acl) -> list:
         """
         Return the first applicable ACL for a given user or group. Lookup order is:
         - owner
@@ -301,64 +587,192 @@ class FACL:
         TODO: Currently, owner user and group are overwritten and could in rare cases lead to incorrect results (for example if an owning user is also a named user with different permissions that are listed first).  # noqa: E501
         https://www.usenix.org/legacy/publications/library/proceedings/usenix03/tech/freenix03/full_papers/gruenbacher/gruenbacher_html/main.html#:~:text=How%20ACLs%20Work,one%20of%20these%20two%20classes.  # noqa: E501
         """
-        acl_entry = self._parse_acl(acl)
-        entity_type = acl_entry["type"]
-        name = acl_entry["name"]
+        query = self._parse_query(acl)
+        entity_type = query.type
+        name = query.name
+
+        groups = None
+        if entity_type == "user" and name not in self._get_index()["user"]:
+            groups = self._query_groups(query)
+        applicable_acl = self._lookup_applicable_acl(entity_type, name, groups)
+        if applicable_acl is not None:
+            return applicable_acl
+
+        self.logger.warning(
+            "No applicable ACL found for entity type '%s' and name '%s'.\n"
+            "This should not happen as 'other' ACL should always be present.",
+            entity_type,
+            name,
+        )
+        return None
 
-        # check user
-        if entity_type in ["user"]:
+    def _get_index(self) -> dict:
+        """
+        Index the non-default ACL entries by type for repeated lookups.
+
+        Entries keep their original order, and the first entry wins for duplicate
+        user names, so lookups give the same result as scanning `self.acls`.
+        """
+        if self._index is None:
+            index = {"user": {}, "group": [], "other": None}
             for acl in self.acls:
                 if acl["default"]:
                     continue
-                if acl["type"] == "user" and acl["name"] == name:
-                    return acl
+                if acl["type"] == "user":
+                    index["user"].setdefault(acl["name"], acl)
+                elif acl["type"] == "group":
+                    index["group"].append(acl)
+                elif acl["type"] == "other" and index["other"] is None:
+                    index["other"] = acl
+            self._index = index
+        return self._index
+
+    def _lookup_applicable_acl(
+        self, entity_type: str, name: str, groups: list = None
+    ) -> dict:
+        """
+        Return the first applicable ACL from the index, or None.
+
+        Args:
+            entity_type (str): 'user', 'group' or 'other'.
+            name (str): The name of the user or group.
+            groups (list, optional): Groups of the user. Only used for users
+                without a matching user entry.
+        """
+        index = self._get_index()
+
+        # check user
+        if entity_type == "user" and name in index["user"]:
+            return index["user"][name]
 
         # check groups
         if entity_type in ["user", "group"]:
-            if entity_type == "user":
-                groups = self._infer_groups(name)
-            else:
+            if entity_type == "group":
                 groups = [name]
-            for acl in self.acls:
-                if acl["default"]:
-                    continue
-                if acl["type"] == "group" and acl["name"] in groups:
+            groups = set(groups or [])
+            for acl in index["group"]:
+                if acl["name"] in groups:
                     return acl
 
         # check other
         if entity_type in ["user", "group", "other"]:
-            for acl in self.acls:
-                if acl["default"]:
-                    continue
-                if acl["type"] == "other":
-                    return acl
-
-        msg = f"""
-        No applicable ACL found for entity type '{entity_type}' and name '{name}'.
-        This should not happen as 'other' ACL should always be present.
-        """
-        self.logger.warning(msg)
+            return index["other"]
         return None
 
-    def has_permission(self, acl: str, mode: str) -> bool:
+    def has_permission(self, acl, mode: str = None) -> bool:
         """
         Check if a specific user or group has a certain permission.
         Users are checked first, then groups, and finally 'other'.
 
         Args:
-            entity_type (str): 'user' or 'group'.
-            name (str): The name of the user or group.
-            permission (str): The permission to check ('r', 'w', or 'x').
+            acl (str | Query): The ACL string (e.g., "user:user1:rwx") or a
+                compiled `Query`.
+            mode (str, optional): The permission mode ("at_least", "exact", or
+                "at_most"). Defaults to the mode of the query, or "at_least".
+        """
+        if metrics.registry.enabled:
+            return self.check(acl, mode).granted
+        return self._verdict(acl, mode)[0]
+
+    def _verdict(self, acl, mode: str = None) -> tuple:
+        """
+        Return the verdict and the deciding entry without recording metrics, for
+        the levels evaluated inside traces.
+        """
+        query = self._parse_query(acl)
+        return self._evaluate(query, mode or query.mode)
+
+    def _evaluate(self, query: Query, mode: str) -> tuple:
+        """
+        Return the verdict of a compiled query and the entry that decided it.
         """
-        # parse acl
-        acl_entry = self._parse_acl(acl)
+        applicable_acl = self.get_applicable_acl(query)
+        granted = bool(applicable_acl) and self._permission_match(
+            applicable_acl["permissions"], query.permissions, mode
+        )
+        return granted, applicable_acl
+
+    def check(self, acl, mode: str = None) -> CheckResult:
+        """
+        Check a permission and return the verdict with the entry that decided it.
 
-        # get applicable acls
-        applicable_acl = self.get_applicable_acl(acl)
-        if not applicable_acl:
-            return False
+        Args:
+            acl (str | Query): The ACL string (e.g., "user:user1:rwx") or a
+                compiled `Query`.
+            mode (str, optional): The permission mode ("at_least", "exact", or
+                "at_most"). Defaults to the mode of the query, or "at_least".
 
-        # check permission
-        return self._permission_match(
-            applicable_acl["permissions"], acl_entry["permissions"], mode
+        Returns:
+            CheckResult: The verdict, applicable entry and timing.
+        """
+        start = time.perf_counter()
+
+        # parse acl once
+        query = self._parse_query(acl)
+        mode = mode or query.mode
+
+        # get applicable acls and check permission
+        granted, applicable_acl = self._evaluate(query, mode)
+        result = CheckResult(
+            self.requested_path or self.path,
+            str(acl),
+            mode,
+            granted,
+            applicable_acl,
+            time.perf_counter() - start,
         )
+        metrics.record_check(self._api, result)
+        return result
+
+    def has_permissions(self, acls: list, mode: str = None) -> list:
+        """
+        Check many users/groups against this FACL in a single pass.
+
+        Each query is parsed once and group memberships of all queried users are
+        resolved together, so this is much cheaper than calling `has_permission`
+        for every principal.
+
+        Args:
+            acls (list): ACL strings to check (e.g., ["user:user1:r-x", "other::r--"])
+                or compiled `Query` objects.
+            mode (str, optional): The permission mode ('exact', 'at_least',
+                'at_most'). Defaults to the mode of each query.
+
+        Returns:
+            list: One boolean per ACL string, in the same order.
+        """
+        queries = [self._parse_query(acl) for acl in acls]
+        groups = self._resolve_query_groups(queries)
+        results = []
+        for query in queries:
+            user_groups = query.groups
+            if user_groups is None:
+                user_groups = groups.get(query.name)
+            applicable_acl = self._lookup_applicable_acl(
+                query.type, query.name, user_groups
+            )
+            results.append(
+                applicable_acl is not None
+                and self._permission_match(
+                    applicable_acl["permissions"],
+                    query.permissions,
+                    mode or query.mode,
+                )
+            )
+        return results
+
+    def _resolve_query_groups(self, queries: list) -> dict:
+        """
+        Resolve groups for all queried users that have no matching user entry.
+        """
+        index = self._get_index()
+        users = [
+            q.name
+            for q in queries
+            if q.type == "user" and q.groups is None and q.name not in index["user"]
+        ]
+        if not users:
+            return {}
+        if self.groups_resolver is not None:
+            return self.groups_resolver.groups_many(users)
+        return {user: self._infer_groups(user) for user in dict.fromkeys(users)}
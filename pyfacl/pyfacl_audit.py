@@ -0,0 +1,200 @@
+import multiprocessing
+import os
+
+from pyfacl import FACL, FACLHas, FACLTrace, logger
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_memo import TraceMemo
+from pyfacl.pyfacl_query import compile_query
+from pyfacl.pyfacl_source import SnapshotSource
+
+# per-process caches, created once per worker by `_init_worker`
+_worker = {}
+
+
+def _init_worker(
+    v: int = 0, numeric: bool = False, trusted=None, groups=None, source=None
+) -> None:
+    """
+    Create the warm caches of a worker process.
+
+    The source is copied once per worker, so a `CachingSource` stays warm and a
+    `ScheduledSource` keeps its rate and limits across shards.
+    """
+    _worker["memo"] = TraceMemo()
+    if groups is None:
+        groups = GroupResolver(v=v, numeric=numeric)
+    _worker["groups"] = groups
+    _worker["trusted"] = trusted
+    _worker["source"] = source
+
+
+def _check(
+    path: str,
+    acl: str,
+    mode: str,
+    trace: bool,
+    can_execute: bool,
+    v: int,
+    numeric: bool,
+) -> bool:
+    """
+    Check a single path with the caches and source of the current process.
+    """
+    kwargs = dict(
+        v=v, numeric=numeric, groups=_worker["groups"], source=_worker["source"]
+    )
+    if trace or can_execute:
+        cls = FACLTrace if trace else FACLHas
+        return cls(
+            path=path, memo=_worker["memo"], trusted=_worker["trusted"], **kwargs
+        ).has_permission(acl, mode, lazy=True)
+    return FACL(path=path, **kwargs).has_permission(acl, mode)
+
+
+def _audit_shard(task: tuple) -> list:
+    """
+    Check all paths of one shard and return compact `(path, granted)` tuples.
+    """
+    paths, options = task
+    return [(path, _check(path, **options)) for path in paths]
+
+
+class FACLAudit:
+    """
+    Check one ACL against many paths, sharded by subtree across worker processes.
+
+    Paths are grouped by their top-level subtree so that each worker reuses its own
+    trace memo and group cache for sibling paths. Results are merged into a single
+    stream of `(path, granted)` tuples as shards complete.
+    """
+
+    def __init__(
+        self,
+        acl: str,
+        mode: str = "at_least",
+        trace: bool = False,
+        can_execute: bool = False,
+        jobs: int = 1,
+        chunk_size: int = 1000,
+        v: int = 0,
+        numeric: bool = False,
+        source=None,
+        trusted=None,
+        groups=None,
+        validator=None,
+    ) -> None:
+        """
+        Args:
+            source (ACLSource, optional): Backend used to read FACLs. It is copied
+                into every worker process. The rate of a `ScheduledSource` is split
+                evenly over the workers. Defaults to running `getfacl`.
+            trusted (TrustedPrefixes, optional): Trusted boundaries. Precomputed
+                verdicts are copied into every worker process.
+            groups (GroupSnapshot, optional): Group memberships copied into every
+                worker process. By default, every worker resolves its own.
+            validator (FACLValidator, optional): Cross-check a sample of the
+                results against the kernel, in the main process.
+        """
+        if trace and can_execute:
+            raise ValueError("Cannot set both 'trace' and 'can_execute' to True.")
+        self.logger = logger.logger_basic(__name__, v)
+        self.acl = compile_query(acl, mode, numeric=numeric)
+        self.mode = mode
+        self.trace = trace
+        self.can_execute = can_execute
+        self.jobs = jobs if jobs > 0 else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.v = v
+        self.numeric = numeric
+        self.source = source
+        self.trusted = trusted
+        self.groups = groups
+        self.validator = validator
+
+    def _shards(self, paths: list) -> list:
+        """
+        Partition paths by top-level subtree.
+
+        The subtree is the first path component below the common path of all
+        paths. Subtrees larger than `chunk_size` are split into contiguous chunks
+        of sorted paths, so siblings still end up in the same shard.
+
+        Returns:
+            list: List of shards, each a list of absolute paths.
+        """
+        paths = [p if p.startswith("/") else os.path.abspath(p) for p in paths]
+        if not paths:
+            return []
+        root = os.path.commonpath(paths)
+        subtrees = {}
+        for path in paths:
+            top = os.path.relpath(path, root).split(os.sep, 1)[0]
+            subtrees.setdefault(top, []).append(path)
+
+        shards = []
+        for top in sorted(subtrees):
+            subtree = sorted(subtrees[top])
+            for i in range(0, len(subtree), self.chunk_size):
+                shards.append(subtree[i : i + self.chunk_size])
+        return shards
+
+    def run(self, paths: list, _pytest_acls: dict = None):
+        """
+        Check all paths and yield `(path, granted)` tuples as they complete.
+
+        Args:
+            paths (list): Paths to check.
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Yields:
+            tuple: The absolute path and True if the permission check passes.
+        """
+        for path, granted in self._run(paths, _pytest_acls):
+            if self.validator is not None:
+                self.validator.observe(path)
+            yield path, granted
+
+    def _run(self, paths: list, _pytest_acls: dict = None):
+        """
+        Check all shards in the worker processes, see `run`.
+        """
+        options = dict(
+            acl=self.acl,
+            mode=self.mode,
+            trace=self.trace,
+            can_execute=self.can_execute,
+            v=self.v,
+            numeric=self.numeric,
+        )
+        source = self.source
+        if _pytest_acls is not None:
+            source = SnapshotSource(_pytest_acls, v=self.v)
+        if self.trusted is not None and (self.trace or self.can_execute):
+            self.trusted.precompute(
+                [self.acl],
+                self.mode,
+                navigation=self.can_execute,
+                numeric=self.numeric,
+                groups=self.groups,
+                source=source,
+            )
+        tasks = [(shard, options) for shard in self._shards(paths)]
+        self.logger.debug("Auditing %d shards with %d jobs", len(tasks), self.jobs)
+
+        if self.jobs == 1 or len(tasks) <= 1:
+            _init_worker(self.v, self.numeric, self.trusted, self.groups, source)
+            for task in tasks:
+                yield from _audit_shard(task)
+            return
+
+        processes = min(self.jobs, len(tasks))
+        # the rate limit protects shared servers, so it holds over all workers
+        if hasattr(source, "split"):
+            source = source.split(processes)
+        with multiprocessing.Pool(
+            processes=processes,
+            initializer=_init_worker,
+            initargs=(self.v, self.numeric, self.trusted, self.groups, source),
+        ) as pool:
+            for results in pool.imap_unordered(_audit_shard, tasks):
+                yield from results
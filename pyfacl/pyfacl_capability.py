@@ -0,0 +1,140 @@
+import errno
+import functools
+import os
+import re
+import shutil
+
+MOUNTINFO = "/proc/self/mountinfo"
+
+# filesystems where the getfacl tooling is more reliable than native xattr reads
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "gpfs", "lustre", "cifs", "smb3", "beegfs"}
+
+# per mount point result of the xattr probe, see `xattr_supported`
+_xattr_support = {}
+
+
+class Mount:
+    """
+    A single entry of `/proc/self/mountinfo`.
+    """
+
+    __slots__ = ("mount_point", "fstype", "device")
+
+    def __init__(self, mount_point: str, fstype: str, device: str) -> None:
+        self.mount_point = mount_point
+        self.fstype = fstype
+        self.device = device
+
+    def __repr__(self) -> str:
+        return f"Mount({self.mount_point!r}, {self.fstype!r}, {self.device!r})"
+
+
+def _unescape(field: str) -> str:
+    """
+    Undo the octal escaping used in mountinfo (e.g., `\\040` for a space).
+    """
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def parse_mountinfo(text: str) -> list:
+    """
+    Parse the content of `/proc/self/mountinfo`.
+
+    Example line:
+    ```
+    36 35 98:0 /mnt1 /mnt/parent rw,noatime master:1 - ext3 /dev/root rw
+    ```
+
+    Returns:
+        list: List of `Mount` objects.
+    """
+    mounts = []
+    for line in text.splitlines():
+        if " - " not in line:
+            continue
+        before, after = line.split(" - ", 1)
+        fields = before.split()
+        fs_fields = after.split()
+        if len(fields) < 5 or len(fs_fields) < 2:
+            continue
+        mounts.append(Mount(_unescape(fields[4]), fs_fields[0], fs_fields[1]))
+    return mounts
+
+
+@functools.cache
+def mounts() -> tuple:
+    """
+    Return the mounts of the current process, read once per process.
+    """
+    try:
+        with open(MOUNTINFO) as f:
+            return tuple(parse_mountinfo(f.read()))
+    except OSError:
+        return (Mount("/", "unknown", "unknown"),)
+
+
+def mount_for(path: str, _mounts: list = None) -> Mount:
+    """
+    Return the mount containing a path (longest matching mount point).
+    """
+    path = os.path.abspath(path)
+    best = None
+    for mount in _mounts if _mounts is not None else mounts():
+        mp = mount.mount_point
+        if path == mp or path.startswith(mp.rstrip("/") + "/"):
+            if best is None or len(mp) >= len(best.mount_point):
+                best = mount
+    return best or Mount("/", "unknown", "unknown")
+
+
+@functools.cache
+def getfacl_available() -> bool:
+    """
+    Check once per process if the `getfacl` command is available.
+    """
+    return shutil.which("getfacl") is not None
+
+
+def xattr_supported(path: str, _mounts: list = None) -> bool:
+    """
+    Check if POSIX ACL xattrs can be read on the filesystem of a path.
+
+    The probe runs once per mount point, on the first path seen on that mount.
+    """
+    mount_point = mount_for(path, _mounts).mount_point
+    if mount_point not in _xattr_support:
+        try:
+            os.getxattr(path, "system.posix_acl_access")
+            supported = True
+        except OSError as e:
+            if e.errno == errno.ENODATA:
+                supported = True
+            elif e.errno in (errno.ENOTSUP, errno.EOPNOTSUPP):
+                supported = False
+            else:
+                # e.g. missing path, decide on the next probe
+                return False
+        _xattr_support[mount_point] = supported
+    return _xattr_support[mount_point]
+
+
+def backend_for(path: str, _mounts: list = None) -> str:
+    """
+    Pick the fastest working ACL backend for the filesystem of a path.
+
+    - Network/parallel filesystems (NFS, GPFS, Lustre, ...) use batched `getfacl`.
+    - Other filesystems read xattrs natively if supported.
+    - Otherwise fall back to whatever is available.
+
+    Returns:
+        str: "xattr", "getfacl-batch", or None if no backend is available.
+    """
+    mount = mount_for(path, _mounts)
+    network = mount.fstype.split(".")[0] in NETWORK_FILESYSTEMS
+    if network and getfacl_available():
+        return "getfacl-batch"
+    if xattr_supported(path, _mounts):
+        return "xattr"
+    if getfacl_available():
+        return "getfacl-batch"
+    return None
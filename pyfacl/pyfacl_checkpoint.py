@@ -0,0 +1,149 @@
+import json
+import os
+import time
+
+from pyfacl import FACLStream, logger
+
+CHECKPOINT_VERSION = 1
+
+
+def write_atomic(path: str, data: str) -> None:
+    """
+    Replace a file atomically, so a crash leaves either the old or the new content.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class FACLCheckpoint:
+    """
+    Audit a tree like `FACLStream`, periodically saving progress to a checkpoint.
+
+    Results are written to an output file, one `granted|denied<TAB>path` line per
+    path. The checkpoint holds the walk frontier (open directories with the
+    verdicts of their ancestors, the number of entries already written and the
+    subdirectories still to visit) and the size of the output file at that
+    point. A resumed audit truncates the output to that size and continues from
+    the frontier, so completed subtrees are neither fetched nor written again.
+    """
+
+    def __init__(
+        self,
+        checkpoint: str,
+        acl: str,
+        mode: str = "at_least",
+        trace: bool = False,
+        can_execute: bool = False,
+        interval: float = 60.0,
+        v: int = 0,
+        **kwargs,
+    ) -> None:
+        """
+        Args:
+            checkpoint (str): Path of the checkpoint file.
+            acl (str): The ACL string to check (e.g., "user:user1:r-x").
+            mode (str): The permission mode ("at_least", "exact", or "at_most").
+            trace (bool): Require the permission at every level from `/`.
+            can_execute (bool): Require --x on every parent directory and the
+                permission on the path only.
+            interval (float): Seconds between two checkpoints.
+            **kwargs: Passed to `FACLStream`, e.g. `source` or `max_acls`.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.checkpoint = checkpoint
+        self.acl = str(acl)
+        self.mode = mode
+        self.trace = trace
+        self.can_execute = can_execute
+        self.interval = interval
+        self.stream = FACLStream(
+            acl, mode, trace=trace, can_execute=can_execute, v=v, **kwargs
+        )
+
+    def _options(self, root: str) -> dict:
+        return {
+            "root": os.path.abspath(root),
+            "acl": self.acl,
+            "mode": self.mode,
+            "trace": self.trace,
+            "can_execute": self.can_execute,
+        }
+
+    def load(self, root: str) -> dict:
+        """
+        Load the checkpoint of an audit of `root`.
+
+        Raises:
+            ValueError: If the checkpoint belongs to another audit.
+        """
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {self.checkpoint}.")
+        options = self._options(root)
+        if state["options"] != options:
+            raise ValueError(
+                f"Checkpoint {self.checkpoint} belongs to another audit: "
+                f"{state['options']}"
+            )
+        return state
+
+    def save(self, root: str, output_offset: int, complete: bool = False) -> None:
+        """
+        Save the current frontier and output offset.
+        """
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "options": self._options(root),
+            "complete": complete,
+            "frontier": [] if complete else self.stream.frontier(),
+            "output_offset": output_offset,
+            "stats": self.stream.stats,
+        }
+        write_atomic(self.checkpoint, json.dumps(state))
+
+    def run(self, root: str, output: str, resume: bool = False) -> dict:
+        """
+        Audit the tree below `root` and write the results to `output`.
+
+        Args:
+            root (str): The directory to audit, included in the results.
+            output (str): The output file.
+            resume (bool): Continue from the checkpoint instead of starting over.
+
+        Returns:
+            dict: Counts of `total` and `granted` paths, fetched and parsed ACLs.
+        """
+        frontier = None
+        mode = "w"
+        if resume:
+            state = self.load(root)
+            self.stream.stats = dict(state["stats"])
+            if state["complete"]:
+                self.logger.info("Audit of %s is already complete.", root)
+                return dict(state["stats"])
+            frontier = state["frontier"]
+            with open(output, "a", errors="surrogateescape") as f:
+                f.truncate(state["output_offset"])
+            mode = "a"
+            self.logger.info(
+                "Resuming audit of %s after %d paths.", root, state["stats"]["total"]
+            )
+
+        with open(output, mode, errors="surrogateescape") as f:
+            last = time.monotonic()
+            for path, granted in self.stream.iter_results(root, frontier=frontier):
+                f.write(f"{'granted' if granted else 'denied'}\t{path}\n")
+                if time.monotonic() - last >= self.interval:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.save(root, f.tell())
+                    last = time.monotonic()
+            f.flush()
+            os.fsync(f.fileno())
+            self.save(root, f.tell(), complete=True)
+        return dict(self.stream.stats)
@@ -0,0 +1,273 @@
+import hashlib
+
+from pyfacl import FACL, logger
+from pyfacl.pyfacl_source import (
+    IndexSource,
+    SnapshotSource,
+    split_getfacl_output,
+    tree_key,
+)
+
+
+def facl_hash(facl: str) -> bytes:
+    """
+    Hash the content of a FACL text, ignoring its `# file:` header.
+
+    Paths with identical ACLs, owner and group share the same hash.
+    """
+    content = "\n".join(
+        line
+        for line in facl.splitlines()
+        if line.strip() and not line.startswith("# file:")
+    )
+    return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+
+def load_snapshot(path: str, v: int = 0):
+    """
+    Load a snapshot file, either a SQLite index or saved `getfacl -R` output.
+
+    Returns:
+        IndexSource | dict: The index, or a mapping of path to FACL text.
+    """
+    with open(path, "rb") as f:
+        header = f.read(16)
+    if header == b"SQLite format 3\x00":
+        return IndexSource(path, v=v)
+    with open(path) as f:
+        return split_getfacl_output(f.read())
+
+
+def _iter_snapshot(snapshot):
+    """
+    Yield the `(path, facl)` pairs of a snapshot in tree order.
+    """
+    if isinstance(snapshot, IndexSource):
+        return snapshot.iter_sorted()
+    if isinstance(snapshot, SnapshotSource):
+        snapshot = snapshot.acls
+    return iter(sorted(snapshot.items(), key=lambda item: tree_key(item[0])))
+
+
+def _apply_mask(permissions: str, mask: str) -> str:
+    """
+    Limit permissions to those granted by a mask, e.g. `rwx` and `r--` to `r--`.
+    """
+    return "".join(c if c in mask else "-" for c in permissions)
+
+
+class FACLDiff:
+    """
+    Compare two ACL snapshots and report effective permission changes.
+
+    Effective permissions of named users, named groups and the owning group are
+    limited by the `mask::` entry, so a mask change is reported as a change of
+    every principal it limits.
+
+    Both snapshots are read in tree order and aligned with a sorted merge, so only
+    the current path and its changed ancestors are held in memory when reading
+    from indexes. Paths whose ACL content hash did not change are skipped, and
+    effective permissions are computed once per distinct ACL content.
+    """
+
+    def __init__(self, groups=None, v: int = 0, cache_size: int = 10_000) -> None:
+        """
+        Args:
+            groups (GroupResolver, optional): Resolve group memberships of users
+                without a named entry. By default, such users are matched against
+                `other` only.
+            cache_size (int): Maximum number of distinct ACLs kept evaluated.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        self.groups = groups
+        self.cache_size = cache_size
+        self._effective = {}
+
+    @staticmethod
+    def _principals(facl: FACL) -> list:
+        """
+        Return the principals named in the access ACL, e.g. `user:alice`.
+        """
+        principals = []
+        for acl in facl.acls:
+            if acl["default"] or acl["type"] not in ("user", "group", "other"):
+                continue
+            name = "" if acl["type"] == "other" else acl["name"]
+            principals.append(f"{acl['type']}:{name}")
+        return principals
+
+    def _evaluated(self, facl_str: str) -> dict:
+        """
+        Return the parsed FACL and its evaluated principals, shared by content.
+        """
+        digest = facl_hash(facl_str)
+        evaluated = self._effective.get(digest)
+        if evaluated is None:
+            if len(self._effective) >= self.cache_size:
+                self._effective.clear()
+            facl = FACL.from_facl(facl_str, v=self.v)
+            mask = next(
+                (
+                    acl["permissions"]
+                    for acl in facl.acls
+                    if acl["type"] == "mask" and not acl["default"]
+                ),
+                None,
+            )
+            evaluated = self._effective[digest] = {
+                "facl": facl,
+                "mask": mask,
+                "permissions": {},
+            }
+        return evaluated
+
+    def effective_permissions(self, facl_str: str, principals: list) -> dict:
+        """
+        Return the effective permissions of principals for one FACL text.
+
+        Args:
+            facl_str (str): The FACL text.
+            principals (list): Principals such as `user:alice` or `other:`.
+        Returns:
+            dict: Mapping of principal to permissions, e.g. `{"user:alice": "r-x"}`.
+        """
+        evaluated = self._evaluated(facl_str)
+        facl = evaluated["facl"]
+        mask = evaluated["mask"]
+        permissions = evaluated["permissions"]
+        for principal in principals:
+            if principal not in permissions:
+                entity_type, name = principal.split(":", 1)
+                groups = None
+                if entity_type == "user" and self.groups is not None:
+                    groups = self.groups.groups(name)
+                acl = facl._lookup_applicable_acl(entity_type, name, groups)
+                if acl is None:
+                    permissions[principal] = "---"
+                    continue
+                permissions[principal] = acl["permissions"]
+                # the owner (`user::`) and `other::` are not limited by the mask
+                owner = acl["type"] == "user" and acl["line"].split(":")[1] == ""
+                if mask is not None and acl["type"] != "other" and not owner:
+                    permissions[principal] = _apply_mask(acl["permissions"], mask)
+        return {principal: permissions[principal] for principal in principals}
+
+    def _compare(self, path: str, old: str, new: str) -> dict:
+        """
+        Compare the FACL texts of one path, either of which may be None.
+        """
+        principals = []
+        for facl_str in (old, new):
+            if facl_str is not None:
+                principals += self._principals(self._evaluated(facl_str)["facl"])
+        principals = list(dict.fromkeys(principals))
+
+        before = self.effective_permissions(old, principals) if old else {}
+        after = self.effective_permissions(new, principals) if new else {}
+        changes = []
+        for principal in principals:
+            if before.get(principal) != after.get(principal):
+                changes.append(
+                    {
+                        "principal": principal,
+                        "old": before.get(principal),
+                        "new": after.get(principal),
+                    }
+                )
+        status = "changed"
+        if old is None:
+            status = "added"
+        elif new is None:
+            status = "removed"
+        return {"path": path, "status": status, "changes": changes, "descendants": 0}
+
+    @staticmethod
+    def _traversal_changed(record: dict) -> bool:
+        """
+        Check if any principal gained or lost execute (traversal) permission.
+        """
+        return record["status"] == "changed" and any(
+            ("x" in (change["old"] or "")) != ("x" in (change["new"] or ""))
+            for change in record["changes"]
+        )
+
+    def _merge(self, old_snapshot, new_snapshot):
+        """
+        Align two snapshots in tree order and yield `(path, old, new)` triples.
+        """
+        old_items = _iter_snapshot(old_snapshot)
+        new_items = _iter_snapshot(new_snapshot)
+        old_item = next(old_items, None)
+        new_item = next(new_items, None)
+        while old_item is not None or new_item is not None:
+            if new_item is None or (
+                old_item is not None and tree_key(old_item[0]) < tree_key(new_item[0])
+            ):
+                yield old_item[0], old_item[1], None
+                old_item = next(old_items, None)
+            elif old_item is None or tree_key(new_item[0]) < tree_key(old_item[0]):
+                yield new_item[0], None, new_item[1]
+                new_item = next(new_items, None)
+            else:
+                yield old_item[0], old_item[1], new_item[1]
+                old_item = next(old_items, None)
+                new_item = next(new_items, None)
+
+    def diff(self, old_snapshot, new_snapshot):
+        """
+        Yield the permission changes between two snapshots.
+
+        Snapshots are `IndexSource` indexes, `SnapshotSource` objects or dicts of
+        path to FACL text. Records are dictionaries:
+        ```
+        {
+            "path": "/data1/lab",
+            "status": "changed",  # or "added", "removed"
+            "changes": [{"principal": "group:lab", "old": "r-x", "new": "---"}],
+            "descendants": 42,
+        }
+        ```
+        `descendants` counts the paths below a directory where a principal gained
+        or lost execute, i.e. whose trace outcome may change. Such records are
+        yielded once their subtree has been read; all others immediately.
+
+        Yields:
+            dict: One record per path with changed effective permissions.
+        """
+        # changed directories whose subtree is still being read
+        stack = []
+        for path, old, new in self._merge(old_snapshot, new_snapshot):
+            while stack and not path.startswith(stack[-1]["path"].rstrip("/") + "/"):
+                yield stack.pop()
+            for record in stack:
+                record["descendants"] += 1
+
+            if old is not None and new is not None:
+                if old == new or facl_hash(old) == facl_hash(new):
+                    continue
+            record = self._compare(path, old, new)
+            if not record["changes"] and record["status"] == "changed":
+                continue
+            if self._traversal_changed(record):
+                stack.append(record)
+            else:
+                yield record
+        while stack:
+            yield stack.pop()
+
+    @staticmethod
+    def format_record(record: dict) -> str:
+        """
+        Render a record as tab-separated lines, one per principal change.
+        """
+        lines = []
+        impact = ""
+        if record["descendants"]:
+            impact = f"\t(+{record['descendants']} descendants)"
+        for change in record["changes"] or [{"principal": "", "old": "", "new": ""}]:
+            lines.append(
+                f"{record['status']}\t{record['path']}\t{change['principal']}\t"
+                f"{change['old'] or '-'} -> {change['new'] or '-'}{impact}"
+            )
+        return "\n".join(lines)
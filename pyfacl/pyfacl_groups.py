@@ -0,0 +1,259 @@
+import os
+import pwd
+import subprocess
+import sys
+
+from pyfacl import logger, metrics
+
+
+class GroupResolver:
+    """
+    Resolve and cache the group memberships of users.
+
+    Memberships are looked up once per user and reused for every subsequent check,
+    which matters when the same principals are evaluated at many directory levels.
+    """
+
+    def __init__(self, v: int = 0, chunk_size: int = 256, numeric: bool = False):
+        """
+        Args:
+            numeric (bool): Users are numeric uids and groups are returned as gids,
+                looked up with `os.getgrouplist` instead of the `groups` command.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.chunk_size = chunk_size
+        self.numeric = numeric
+        self._cache = {}
+
+    def groups(self, user: str) -> list:
+        """
+        Return the groups a user belongs to.
+
+        Args:
+            user (str): The username.
+        Returns:
+            list: List of groups the user belongs to.
+        """
+        if user not in self._cache:
+            self._cache.update(self._lookup([user]))
+        return self._cache[user]
+
+    def groups_many(self, users: list) -> dict:
+        """
+        Return the groups for many users, resolving unknown users in bulk.
+
+        Args:
+            users (list): List of usernames.
+        Returns:
+            dict: Mapping of username to list of groups.
+        """
+        missing = list(dict.fromkeys(u for u in users if u not in self._cache))
+        for i in range(0, len(missing), self.chunk_size):
+            self._cache.update(self._lookup(missing[i : i + self.chunk_size]))
+        return {user: self._cache[user] for user in users}
+
+    def _lookup(self, users: list) -> dict:
+        """
+        Look up groups for several users with a single `groups` invocation.
+
+        `groups u1 u2` prints one `user : g1 g2` line per known user and reports
+        unknown users on stderr, so a single bad name does not fail the batch.
+        """
+        if self.numeric:
+            return {uid: self._lookup_gids(uid) for uid in users}
+
+        resolved = {user: [] for user in users}
+        metrics.registry.inc("pyfacl_subprocesses", command="groups")
+        with metrics.registry.timed("pyfacl_group_lookup_duration_seconds"):
+            result = subprocess.run(
+                ["groups", *users], capture_output=True, text=True, check=False
+            )
+        if result.returncode != 0:
+            self.logger.warning(
+                "Error retrieving groups for users %s: %s",
+                users,
+                result.stderr.strip(),
+            )
+        for user, groups in self._parse_groups_output(result.stdout, users).items():
+            resolved[user] = groups
+        return resolved
+
+    def _lookup_gids(self, uid: str) -> list:
+        """
+        Look up the gids of a numeric uid, including its primary group.
+        """
+        try:
+            pw = pwd.getpwuid(int(uid))
+        except (KeyError, ValueError) as e:
+            self.logger.warning("Error retrieving groups for uid %s: %s", uid, e)
+            return []
+        return [str(gid) for gid in os.getgrouplist(pw.pw_name, pw.pw_gid)]
+
+    @staticmethod
+    def _parse_groups_output(output: str, users: list) -> dict:
+        """
+        Parse the output of `groups u1 u2 ...`.
+
+        Example:
+        ```
+        user1 : group1 group2
+        user2 : group3
+        ```
+        A single user query may print the groups without the `user :` prefix.
+        """
+        parsed = {}
+        for line in output.splitlines():
+            if " : " in line:
+                user, groups = line.split(" : ", 1)
+                parsed[user.strip()] = groups.split()
+            elif line.strip() and len(users) == 1:
+                parsed[users[0]] = line.split()
+        return parsed
+
+
+class GroupSnapshot:
+    """
+    In-memory group memberships loaded from `/etc/group` and `/etc/passwd` files
+    or `getent group` / `getent passwd` dumps.
+
+    Memberships are indexed both ways (user to groups, group to users) including
+    primary groups, which `/etc/group` does not list. A snapshot can be passed as
+    `groups` to every check API instead of a `GroupResolver`, e.g. to evaluate
+    captured ACLs on another host without looking up users there.
+    """
+
+    def __init__(
+        self,
+        group_text: str = "",
+        passwd_text: str = "",
+        numeric: bool = False,
+        v: int = 0,
+    ) -> None:
+        """
+        Args:
+            group_text (str): Lines in `/etc/group` format (`name:x:gid:u1,u2`).
+            passwd_text (str): Lines in `/etc/passwd` format
+                (`name:x:uid:gid:gecos:home:shell`), used for primary groups.
+            numeric (bool): Users are numeric uids and groups are returned as gids.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.numeric = numeric
+        self._user_groups = {}
+        self._group_members = {}
+        self._load(group_text, passwd_text)
+
+    @classmethod
+    def from_files(
+        cls, group: str = "/etc/group", passwd: str = "/etc/passwd", **kwargs
+    ) -> "GroupSnapshot":
+        """
+        Load a snapshot from files in `/etc/group` and `/etc/passwd` format, e.g.
+        saved `getent group` and `getent passwd` output.
+        """
+        with open(group) as f:
+            group_text = f.read()
+        passwd_text = ""
+        if passwd:
+            with open(passwd) as f:
+                passwd_text = f.read()
+        return cls(group_text, passwd_text, **kwargs)
+
+    @classmethod
+    def from_getent(cls, **kwargs) -> "GroupSnapshot":
+        """
+        Load a snapshot of all users and groups known to NSS (including LDAP or
+        SSSD) with one `getent group` and one `getent passwd` call.
+        """
+        texts = []
+        for database in ("group", "passwd"):
+            metrics.registry.inc("pyfacl_subprocesses", command="getent")
+            result = subprocess.run(
+                ["getent", database], capture_output=True, text=True, check=True
+            )
+            texts.append(result.stdout)
+        return cls(*texts, **kwargs)
+
+    @staticmethod
+    def _records(text: str, n_fields: int):
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split(":")
+            if len(fields) >= n_fields:
+                yield fields
+
+    def _add(self, user: str, group: str) -> None:
+        groups = self._user_groups.setdefault(user, [])
+        if group not in groups:
+            groups.append(group)
+            self._group_members.setdefault(group, []).append(user)
+
+    def _load(self, group_text: str, passwd_text: str) -> None:
+        """
+        Build the inverted indexes, primary groups first.
+        """
+        # gid to group name, and supplementary members by user name
+        group_names = {}
+        members = []
+        for name, _, gid, users in self._records(group_text, 4):
+            name, gid = sys.intern(name), sys.intern(gid)
+            group_names.setdefault(gid, name)
+            self._group_members.setdefault(gid if self.numeric else name, [])
+            for user in users.split(","):
+                if user:
+                    members.append((sys.intern(user), gid if self.numeric else name))
+
+        # user name to uid, and primary groups
+        uids = {}
+        for name, _, uid, gid, *_ in self._records(passwd_text, 4):
+            name, uid, gid = sys.intern(name), sys.intern(uid), sys.intern(gid)
+            uids.setdefault(name, uid)
+            user = uid if self.numeric else name
+            self._add(user, gid if self.numeric else group_names.get(gid, gid))
+
+        for user, group in members:
+            if self.numeric:
+                if user not in uids:
+                    self.logger.debug("Member %s of gid %s has no uid.", user, group)
+                    continue
+                user = uids[user]
+            self._add(user, group)
+
+    def groups(self, user: str) -> list:
+        """
+        Return the groups a user belongs to, its primary group first.
+
+        Args:
+            user (str): The username (or uid if numeric).
+        Returns:
+            list: List of groups (or gids if numeric), empty for unknown users.
+        """
+        groups = self._user_groups.get(user)
+        if groups is None:
+            self.logger.debug("User %s is not in the group snapshot.", user)
+            return []
+        return groups
+
+    def groups_many(self, users: list) -> dict:
+        """
+        Return the groups for many users.
+        """
+        return {user: self.groups(user) for user in users}
+
+    def members(self, group: str) -> list:
+        """
+        Return the users of a group, including users with it as primary group.
+
+        Args:
+            group (str): The group name (or gid if numeric).
+        Returns:
+            list: List of usernames (or uids if numeric).
+        """
+        return self._group_members.get(group, [])
+
+    def members_many(self, groups: list) -> dict:
+        """
+        Return the users of many groups.
+        """
+        return {group: self.members(group) for group in groups}
@@ -1,6 +1,12 @@
+import logging
 import os
+import time
 
-from pyfacl import FACL, FACLTrace, logger
+from pyfacl import FACL, FACLTrace, logger, metrics
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_query import compile_query
+from pyfacl.pyfacl_result import TraceResult, format_level
+from pyfacl.pyfacl_source import GetfaclSource, SnapshotSource
 
 
 class FACLHas:
@@ -8,39 +14,149 @@ class FACLHas:
     Check if user/group can navigate to path (--x), and specified ACL granted.
     """
 
-    def __init__(self, path: str = None, v: int = 0) -> None:
+    def __init__(
+        self,
+        path: str = None,
+        v: int = 0,
+        memo=None,
+        numeric: bool = False,
+        groups=None,
+        source=None,
+        resolver=None,
+        trusted=None,
+    ) -> None:
+        """
+        Args:
+            memo (TraceMemo, optional): Shared memo used for the --x navigation
+                check of the parent directories.
+            numeric (bool): Match numeric uids/gids instead of names.
+            groups (GroupResolver, optional): Shared resolver for group memberships.
+            source (ACLSource, optional): Backend used to read FACLs. Defaults to
+                running `getfacl`.
+            resolver (PathResolver, optional): Shared resolver for symlinks. If the
+                path is a symlink, its target and the parents of the target are
+                checked.
+            trusted (TrustedPrefixes, optional): Trusted boundaries for the --x
+                navigation check of the parent directories.
+        """
         self.logger = logger.logger_basic(__name__, v)
         self.print = logger.logger_print(v)
         self.v = v
         self.path = path
+        self.memo = memo
+        self.numeric = numeric
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        if resolver is None:
+            resolver = PathResolver(v=v)
+        self.resolver = resolver
+        self.trusted = trusted
 
-    def has_permission(self, acl: str, mode: str, _pytest_acls: dict = None) -> bool:
+    def has_permission(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> bool:
         """
         Check if user/group can navigate to path (--x), and specified ACL granted.
 
         Args:
             path (str): The file or directory path to check.
-            acl (str): The ACL string to check (e.g., "user:user1:rwx").
-            mode (str): The permission mode (e.g., "at_least", "exact", "at_most").
+            acl (str | Query): The ACL string to check (e.g., "user:user1:rwx") or
+                a compiled `Query`.
+            mode (str, optional): The permission mode (e.g., "at_least", "exact",
+                "at_most"). Defaults to the mode of the query, or "at_least".
             _pytest_acls (dict, optional): A dictionary of ACLs for testing purposes.
+                Shortcut for a `SnapshotSource`.
+            lazy (bool): Check navigation top-down, stop at the first denial and
+                only fetch the target path if it can be reached.
 
         Returns:
             bool: True if user/group can navigate and has ACL permission.
         """
+        result, navigation = self._check(
+            acl, mode, _pytest_acls=_pytest_acls, lazy=lazy
+        )
+        # only the navigation levels are printed, the verdict is printed by callers
+        if self.print.isEnabledFor(logging.INFO):
+            for entry in result.chain[:navigation]:
+                self.print.info("%s", format_level(entry))
+        return result.granted
+
+    def check(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> TraceResult:
+        """
+        Check navigation and permission, and return the verdict with the path chain.
+
+        The chain holds the --x navigation entries of the parent directories,
+        followed by the entry of the target path if it was evaluated.
+
+        Args:
+            acl (str | Query): The ACL string to check (e.g., "user:user1:rwx") or
+                a compiled `Query`.
+            mode (str, optional): The permission mode (e.g., "at_least", "exact",
+                "at_most"). Defaults to the mode of the query, or "at_least".
+            _pytest_acls (dict, optional): A dictionary of ACLs for testing purposes.
+            lazy (bool): Check navigation top-down, stop at the first denial and
+                only fetch the target path if it can be reached.
+
+        Returns:
+            TraceResult: The verdict, the evaluated entries from `/` down and timing.
+        """
+        return self._check(acl, mode, _pytest_acls=_pytest_acls, lazy=lazy)[0]
+
+    def _check(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> tuple:
+        """
+        Run `check` and also return the number of navigation entries in the chain.
+        """
+        start = time.perf_counter()
+        source = self.source
+        if _pytest_acls is not None:
+            source = SnapshotSource(_pytest_acls, v=self.v)
+
         # get trace and final paths
-        facl_trace = FACLTrace(path=os.path.dirname(self.path), v=self.v)
-        if _pytest_acls is None:
-            facl_path = FACL(path=self.path, v=self.v)
-        else:
-            facl_path = FACL(_facl=_pytest_acls[self.path], v=self.v)
-            facl_path.is_init = True
-            facl_path._parse_metadata()
-            facl_path._parse_acls()
+        path = self.resolver.resolve_for(self.path, source)
+        facl_trace = FACLTrace(
+            path=os.path.dirname(path),
+            v=self.v,
+            memo=self.memo,
+            numeric=self.numeric,
+            groups=self.groups,
+            source=source,
+            resolver=self.resolver,
+            trusted=self.trusted,
+        )
 
         # replace acl with --x for navigation check
-        acl_nav = ":".join(acl.split(":")[:-1] + ["--x"])
-        can_navigate = facl_trace.has_permission(
-            acl_nav, "at_least", _pytest_acls=_pytest_acls
+        mode = mode or getattr(acl, "mode", "at_least")
+        query = compile_query(acl, mode, numeric=self.numeric)
+        nav = facl_trace._check(query.navigation(), "at_least", lazy=lazy)
+        chain = nav.chain
+        navigation = len(chain)
+        granted = nav.granted
+        if granted or not lazy:
+            facl_path = FACL(
+                path=path,
+                v=self.v,
+                numeric=self.numeric,
+                groups=self.groups,
+                source=source,
+            )
+            target, entry = facl_path._verdict(query, mode)
+            chain.append(
+                {
+                    "path": path,
+                    "applicable_acl": entry,
+                    "has_permission": target,
+                    "index": len(chain),
+                }
+            )
+            granted = granted and target
+        result = TraceResult(
+            self.path, str(acl), mode, granted, chain, time.perf_counter() - start
         )
-        has_permission = facl_path.has_permission(acl, mode)
-        return can_navigate and has_permission
+        metrics.record_check("has", result)
+        return result, navigation
@@ -0,0 +1,140 @@
+import os
+import stat
+
+from pyfacl import FACL
+from pyfacl.pyfacl_query import BITS
+
+
+def _to_bits(permissions: str) -> int:
+    return sum(BITS[c] for c in permissions if c in BITS)
+
+
+def _to_permissions(bits: int) -> str:
+    return "".join(c if bits & BITS[c] else "-" for c in "rwx")
+
+
+class FACLKernel(FACL):
+    """
+    FACL evaluator that follows the access check of the Linux kernel.
+
+    Unlike `FACL.has_permission`, the first matching class is final:
+    1. root (CAP_DAC_OVERRIDE) may always read and write, and execute if the path
+       is a directory or any execute bit is set,
+    2. the owner gets the `user::` entry, without falling through to groups,
+    3. a named user gets its entry, limited by the mask,
+    4. groups: the owning group and matching named groups, each limited by the
+       mask. For "at_least", the permission is granted if a single matching
+       entry grants it, like the kernel does. For "exact" and "at_most" the
+       union of the matching entries is compared,
+    5. everyone else gets `other::`.
+
+    Group memberships are only resolved if steps 1-3 do not apply.
+    """
+
+    _api = "kernel"
+    _kernel_entries = None
+
+    def _after_load(self) -> None:
+        super()._after_load()
+        self._kernel_entries = None
+
+    def _entries(self) -> dict:
+        """
+        Return the access entries by class: user_obj, users, groups, mask, other.
+        """
+        if self._kernel_entries is None:
+            entries = {
+                "user_obj": None,
+                "users": {},
+                "group_obj": None,
+                "groups": [],
+                "mask": None,
+                "other": None,
+            }
+            for acl in self.acls:
+                if acl["default"]:
+                    continue
+                obj = acl["line"].split(":")[1] == ""
+                if acl["type"] == "user":
+                    if obj:
+                        entries["user_obj"] = entries["user_obj"] or acl
+                    else:
+                        entries["users"].setdefault(acl["name"], acl)
+                elif acl["type"] == "group":
+                    if obj:
+                        entries["group_obj"] = entries["group_obj"] or acl
+                    entries["groups"].append(acl)
+                elif acl["type"] in ("mask", "other"):
+                    entries[acl["type"]] = entries[acl["type"]] or acl
+            self._kernel_entries = entries
+        return self._kernel_entries
+
+    def _is_directory(self) -> bool:
+        """
+        Whether the FACL belongs to a directory, from the stat of the fast path or
+        the absolute path (the `# file:` header is relative to `/`).
+        """
+        if self.st_mode is not None:
+            return stat.S_ISDIR(self.st_mode)
+        path = self.requested_path or self.path
+        if not path:
+            return False
+        return os.path.isdir(path if path.startswith("/") else "/" + path)
+
+    def _root_bits(self, entries: dict) -> int:
+        """
+        Permissions of root with CAP_DAC_OVERRIDE.
+        """
+        bits = BITS["r"] | BITS["w"]
+        exec_entries = [entries["user_obj"], entries["mask"] or entries["group_obj"]]
+        exec_entries.append(entries["other"])
+        if self._is_directory() or any(
+            entry and "x" in entry["permissions"] for entry in exec_entries
+        ):
+            bits |= BITS["x"]
+        return bits
+
+    def _evaluate(self, query, mode: str) -> tuple:
+        """
+        Return the kernel verdict of a compiled query and the deciding entry
+        (None for root).
+        """
+        entity_type, name = query.type, query.name
+        entries = self._entries()
+        mask = _to_bits(entries["mask"]["permissions"]) if entries["mask"] else 7
+
+        entry = None
+        bits = None
+        if entity_type == "user":
+            if name == ("0" if self.numeric else "root"):
+                bits = self._root_bits(entries)
+            elif name == self.owner:
+                entry = entries["user_obj"]
+                bits = _to_bits(entry["permissions"]) if entry else 0
+            elif name in entries["users"]:
+                entry = entries["users"][name]
+                bits = _to_bits(entry["permissions"]) & mask
+
+        if bits is None and entity_type in ("user", "group"):
+            groups = (
+                {name} if entity_type == "group" else set(self._query_groups(query))
+            )
+            matched = [g for g in entries["groups"] if g["name"] in groups]
+            if matched:
+                want = query.bits
+                entry = matched[0]
+                bits = 0
+                for group in matched:
+                    group_bits = _to_bits(group["permissions"]) & mask
+                    if mode == "at_least" and group_bits & want == want:
+                        entry, bits = group, group_bits
+                        break
+                    if mode != "at_least":
+                        bits |= group_bits
+
+        if bits is None:
+            entry = entries["other"]
+            bits = _to_bits(entry["permissions"]) if entry else 0
+
+        granted = self._permission_match(_to_permissions(bits), query.permissions, mode)
+        return granted, entry
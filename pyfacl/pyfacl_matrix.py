@@ -0,0 +1,320 @@
+import os
+
+from pyfacl import FACL, logger
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_multi import FACLMulti
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_source import GetfaclSource, SnapshotSource
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+PERMISSION_BITS = {"r": 4, "w": 2, "x": 1}
+
+
+def _permission_bits(permissions: str) -> int:
+    """
+    Encode a permission string (e.g., 'r-x') as bits (r=4, w=2, x=1).
+    """
+    return sum(PERMISSION_BITS.get(c, 0) for c in permissions)
+
+
+class FACLMatrix:
+    """
+    Compute permissions for many paths and many users/groups at once.
+
+    With NumPy installed, every directory's ACL entries are encoded as bit arrays
+    over all principals and the ancestor chains are combined with vectorized ANDs.
+    Without NumPy, the pure-Python `FACLMulti` is used for every path.
+    """
+
+    def __init__(
+        self,
+        paths: list,
+        v: int = 0,
+        groups=None,
+        numeric: bool = False,
+        source=None,
+        resolver=None,
+    ) -> None:
+        """
+        Args:
+            resolver (PathResolver, optional): Shared resolver for symlinks. Both
+                engines check the canonical paths, like `FACLMulti`.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        self.paths = [p if p.startswith("/") else os.path.abspath(p) for p in paths]
+        self.numeric = numeric
+        if groups is None:
+            groups = GroupResolver(v=v, numeric=numeric)
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        if resolver is None:
+            resolver = PathResolver(v=v)
+        self.resolver = resolver
+
+    def _source(self, _pytest_acls: dict = None):
+        """
+        Return the source, or a snapshot of pre-defined ACLs for testing.
+        """
+        if _pytest_acls is not None:
+            return SnapshotSource(_pytest_acls, v=self.v)
+        return self.source
+
+    def _get_facls(self, paths: list, _pytest_acls: dict = None) -> dict:
+        """
+        Fetch and parse the FACLs of many paths in one batch.
+        """
+        source = self._source(_pytest_acls)
+        return FACL.from_source(
+            paths, source, v=self.v, groups=self.groups, numeric=self.numeric
+        )
+
+    def _directories(self, paths: list) -> list:
+        """
+        Return all unique paths and ancestors, parents always before children.
+        """
+        directories = set()
+        for path in paths:
+            while path not in directories:
+                directories.add(path)
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        return sorted(directories, key=lambda p: (p.count("/"), p != "/", p))
+
+    def _encode_principals(self, queries: list) -> tuple:
+        """
+        Encode principals as a membership matrix (principals x groups).
+
+        Returns:
+            tuple: The group name to column mapping and the membership matrix.
+        """
+        users = [
+            q.name for q in queries if q.type == "user" and q.name and q.groups is None
+        ]
+        user_groups = self.groups.groups_many(users)
+
+        group_ids = {}
+        members = []
+        for q in queries:
+            if not q.name and q.type in ("user", "group"):
+                names = []  # owner queries are evaluated per FACL
+            elif q.type == "user":
+                names = q.groups if q.groups is not None else user_groups[q.name]
+            elif q.type == "group":
+                names = [q.name]
+            else:
+                names = []
+            members.append([group_ids.setdefault(n, len(group_ids)) for n in names])
+
+        membership = np.zeros((len(queries), len(group_ids) + 1), dtype=bool)
+        for i, columns in enumerate(members):
+            membership[i, columns] = True
+        return group_ids, membership
+
+    def _effective_bits(
+        self, facl: FACL, queries: list, group_ids: dict, membership
+    ) -> tuple:
+        """
+        Return the applicable permission bits of every principal for one FACL.
+
+        Lookup order is the same as in `FACL.get_applicable_acl`: named/owning user,
+        first matching group entry, then other. Owner queries (`user::r-x`) name
+        the owner of every FACL, so they are looked up with the FACL itself.
+
+        Returns:
+            tuple: Permission bits (uint8) and whether any entry applied (bool).
+        """
+        index = facl._get_index()
+        n = len(queries)
+        bits = np.zeros(n, dtype=np.uint8)
+        valid = np.zeros(n, dtype=bool)
+
+        # other
+        if index["other"] is not None:
+            bits[:] = _permission_bits(index["other"]["permissions"])
+            valid[:] = True
+
+        # groups, first matching entry wins
+        if index["group"]:
+            unknown = membership.shape[1] - 1
+            columns = [group_ids.get(acl["name"], unknown) for acl in index["group"]]
+            entry_bits = np.array(
+                [_permission_bits(acl["permissions"]) for acl in index["group"]],
+                dtype=np.uint8,
+            )
+            hits = membership[:, columns]
+            matched = hits.any(axis=1)
+            first = hits.argmax(axis=1)
+            bits = np.where(matched, entry_bits[first], bits)
+            valid |= matched
+
+        # users, and owners
+        for i, q in enumerate(queries):
+            if not q.name and q.type in ("user", "group"):
+                acl = facl.get_applicable_acl(q)
+                bits[i] = _permission_bits(acl["permissions"]) if acl else 0
+                valid[i] = acl is not None
+            elif q.type == "user" and q.name in index["user"]:
+                bits[i] = _permission_bits(index["user"][q.name]["permissions"])
+                valid[i] = True
+        return bits, valid
+
+    @staticmethod
+    def _bits_match(bits, query_bits, mode: str):
+        """
+        Vectorized version of `FACL._permission_match` on permission bits.
+        """
+        if mode == "exact":
+            return bits == query_bits
+        elif mode == "at_least":
+            return (bits & query_bits) == query_bits
+        elif mode == "at_most":
+            return (bits & ~query_bits & 7) == 0
+        raise ValueError(
+            f"Invalid mode '{mode}'. Choose from 'exact', 'at_least', 'at_most'."
+        )
+
+    def _matrix_numpy(
+        self,
+        acls: list,
+        mode: str,
+        trace: bool = False,
+        can_execute: bool = False,
+        _pytest_acls: dict = None,
+    ):
+        """
+        Compute the (paths x principals) boolean matrix with NumPy.
+        """
+        parser = FACL(_facl="", v=self.v, numeric=self.numeric)
+        parser.is_init = True
+        queries = [parser._parse_query(acl) for acl in acls]
+        query_bits = np.array(
+            [_permission_bits(q.permissions) for q in queries], dtype=np.uint8
+        )
+        group_ids, membership = self._encode_principals(queries)
+
+        # verdict per directory
+        source = self._source(_pytest_acls)
+        paths = [self.resolver.resolve_for(path, source) for path in self.paths]
+        directories = self._directories(paths)
+        row = {path: i for i, path in enumerate(directories)}
+        verdict = np.zeros((len(directories), len(queries)), dtype=bool)
+        navigate = np.zeros((len(directories), len(queries)), dtype=bool)
+        facls = self._get_facls(directories, _pytest_acls=_pytest_acls)
+        for i, path in enumerate(directories):
+            facl = facls[path]
+            bits, valid = self._effective_bits(facl, queries, group_ids, membership)
+            verdict[i] = valid & self._bits_match(bits, query_bits, mode)
+            navigate[i] = valid & ((bits & 1) == 1)
+
+        # ancestor chains, parents are always processed before children
+        if trace or can_execute:
+            chain = verdict if trace else navigate
+            cumulative = np.empty_like(chain)
+            for i, path in enumerate(directories):
+                parent = os.path.dirname(path)
+                if parent == path:
+                    cumulative[i] = chain[i]
+                else:
+                    cumulative[i] = chain[i] & cumulative[row[parent]]
+
+        rows = np.array([row[path] for path in paths], dtype=np.intp)
+        if trace:
+            return cumulative[rows]
+        if can_execute:
+            parents = np.array(
+                [row[os.path.dirname(path)] for path in paths], dtype=np.intp
+            )
+            return verdict[rows] & cumulative[parents]
+        return verdict[rows]
+
+    def _matrix_python(
+        self,
+        acls: list,
+        mode: str,
+        trace: bool = False,
+        can_execute: bool = False,
+        _pytest_acls: dict = None,
+    ) -> list:
+        """
+        Compute the (paths x principals) matrix as nested lists without NumPy.
+        """
+        matrix = []
+        for path in self.paths:
+            facl_multi = FACLMulti(
+                path=path,
+                v=self.v,
+                groups=self.groups,
+                numeric=self.numeric,
+                source=self.source,
+                resolver=self.resolver,
+            )
+            result = facl_multi.has_permission(
+                acls,
+                mode,
+                trace=trace,
+                can_execute=can_execute,
+                _pytest_acls=_pytest_acls,
+            )
+            matrix.append([result[acl] for acl in acls])
+        return matrix
+
+    def matrix(
+        self,
+        acls: list,
+        mode: str = "at_least",
+        trace: bool = False,
+        can_execute: bool = False,
+        sparse: bool = False,
+        engine: str = "auto",
+        _pytest_acls: dict = None,
+    ):
+        """
+        Check every path against every ACL string.
+
+        Args:
+            acls (list): ACL strings (e.g., ["user:user1:r-x"]) or `Query` objects.
+            mode (str): The permission mode ("at_least", "exact", or "at_most").
+            trace (bool): Require the permission at every level from `/`.
+            can_execute (bool): Require --x on every parent directory and the
+                permission on the target path only.
+            sparse (bool): If True, return the coordinates `(rows, columns)` of
+                all granted cells instead of the dense matrix.
+            engine (str): "numpy", "python" or "auto" (NumPy if installed).
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Returns:
+            The dense matrix with one row per path and one column per ACL string
+            (a NumPy bool array, or nested lists for the Python engine), or the
+            coordinates of granted cells if `sparse` is True.
+
+        Raises:
+            ValueError: If both trace and can_execute are True, or if the NumPy
+                engine is requested but NumPy is not installed.
+        """
+        if trace and can_execute:
+            raise ValueError("Cannot set both 'trace' and 'can_execute' to True.")
+        if engine == "auto":
+            engine = "python" if np is None else "numpy"
+        if engine == "numpy" and np is None:
+            raise ValueError("The 'numpy' engine requires NumPy to be installed.")
+
+        kwargs = dict(trace=trace, can_execute=can_execute, _pytest_acls=_pytest_acls)
+        if engine == "numpy":
+            matrix = self._matrix_numpy(acls, mode, **kwargs)
+            return np.nonzero(matrix) if sparse else matrix
+        elif engine == "python":
+            matrix = self._matrix_python(acls, mode, **kwargs)
+            if not sparse:
+                return matrix
+            cells = [(i, j) for i, r in enumerate(matrix) for j, c in enumerate(r) if c]
+            return ([i for i, _ in cells], [j for _, j in cells])
+        raise ValueError(f"Invalid engine '{engine}'. Choose from 'numpy', 'python'.")
@@ -0,0 +1,105 @@
+from pyfacl import metrics
+
+
+class _MemoNode:
+    """
+    A single directory in the memo trie.
+    """
+
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.entries = {}
+
+
+class TraceMemo:
+    """
+    Trie-structured memo of trace entries keyed by (directory, acl, mode).
+
+    Each node stores the trace entry of one directory. Since every cached directory
+    also has its ancestors cached (up to the level where the trace stopped), the
+    full trace prefix from `/` can be rebuilt by walking the trie, and sibling
+    paths only need to evaluate the levels below their first cached ancestor.
+    """
+
+    def __init__(self) -> None:
+        self._root = _MemoNode()
+
+    @staticmethod
+    def _components(path: str) -> list:
+        return [c for c in path.split("/") if c]
+
+    def _nodes(self, path: str, create: bool = False) -> list:
+        """
+        Return the trie nodes from `/` down to `path`, or None if not present.
+        """
+        node = self._root
+        nodes = [node]
+        for component in self._components(path):
+            child = node.children.get(component)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[component] = _MemoNode()
+            node = child
+            nodes.append(node)
+        return nodes
+
+    def get(self, path: str, acl: str, mode: str) -> list:
+        """
+        Return the cached trace from `/` down to `path`, or None if not cached.
+
+        Args:
+            path (str): Absolute path of the directory.
+            acl (str | Query): The ACL string of the query.
+            mode (str): The permission mode of the query.
+
+        Returns:
+            list: Copies of the trace entries, ordered from `/` to `path`.
+        """
+        key = (str(acl), mode)
+        nodes = self._nodes(path)
+        if nodes is None or key not in nodes[-1].entries:
+            metrics.registry.inc(
+                "pyfacl_cache_requests", cache="trace_memo", result="miss"
+            )
+            return None
+        metrics.registry.inc("pyfacl_cache_requests", cache="trace_memo", result="hit")
+
+        # walk up until the level where the original trace stopped
+        prefix = []
+        for node in reversed(nodes):
+            entry = node.entries.get(key)
+            if entry is None:
+                break
+            prefix.append(dict(entry))
+            if entry["applicable_acl"] is None:
+                break
+        prefix.reverse()
+        return prefix
+
+    def put(self, trace: list, acl: str, mode: str) -> None:
+        """
+        Store all entries of a trace.
+
+        Args:
+            trace (list): Trace entries with at least `path`, `applicable_acl` and
+                `has_permission`.
+            acl (str): The ACL string of the query.
+            mode (str): The permission mode of the query.
+        """
+        key = (str(acl), mode)
+        for entry in trace:
+            node = self._nodes(entry["path"], create=True)[-1]
+            node.entries[key] = {
+                "path": entry["path"],
+                "applicable_acl": entry["applicable_acl"],
+                "has_permission": entry["has_permission"],
+            }
+
+    def clear(self) -> None:
+        """
+        Remove all cached entries.
+        """
+        self._root = _MemoNode()
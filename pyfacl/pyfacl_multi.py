@@ -0,0 +1,155 @@
+from pyfacl import FACL, logger
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_query import compile_query
+from pyfacl.pyfacl_source import GetfaclSource, SnapshotSource
+
+
+class FACLMulti:
+    """
+    Check many users/groups against one path, or its directory hierarchy, at once.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        v: int = 0,
+        groups=None,
+        numeric: bool = False,
+        source=None,
+        resolver=None,
+    ) -> None:
+        """
+        Args:
+            resolver (PathResolver, optional): Shared resolver for symlinks. Traces
+                are evaluated over the canonical path chain.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        self.path = path
+        self.numeric = numeric
+        if groups is None:
+            groups = GroupResolver(v=v, numeric=numeric)
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        if resolver is None:
+            resolver = PathResolver(v=v)
+        self.resolver = resolver
+
+        # catch common error that path and acl are mixed up
+        if "/" not in path and ":" in path:
+            raise ValueError(
+                f"Path looks like an ACL entry. Please check your input:\nPath: {path}"
+            )
+
+    def _source(self, _pytest_acls: dict = None):
+        """
+        Return the source, or a snapshot of pre-defined ACLs for testing.
+        """
+        if _pytest_acls is not None:
+            return SnapshotSource(_pytest_acls, v=self.v)
+        return self.source
+
+    def _get_facls(self, paths: list, _pytest_acls: dict = None) -> dict:
+        """
+        Fetch and parse the FACLs of many paths in one batch.
+        """
+        source = self._source(_pytest_acls)
+        return FACL.from_source(
+            paths, source, v=self.v, groups=self.groups, numeric=self.numeric
+        )
+
+    def _levels(self, source) -> list:
+        """
+        Return all paths from `/` down to the target path.
+        """
+        levels = self.resolver.levels_for(self.path, source)
+        levels.reverse()
+        return levels
+
+    def matrix(
+        self,
+        acls: list,
+        mode: str = "at_least",
+        trace: bool = False,
+        can_execute: bool = False,
+        _pytest_acls: dict = None,
+    ) -> dict:
+        """
+        Return the verdict of every ACL string at every relevant directory level.
+
+        With `trace` or `can_execute`, the rows show at which level a principal
+        loses access. Otherwise, only the target path is evaluated. Group
+        memberships are resolved for all users up front, and every level is
+        parsed once and checked for all principals in one pass.
+
+        Args:
+            acls (list): ACL strings (e.g., ["user:user1:r-x"]) or `Query` objects.
+            mode (str): The permission mode ("at_least", "exact", or "at_most").
+            trace (bool): Evaluate the permission at every level from `/`.
+            can_execute (bool): Evaluate --x on every parent directory and the
+                permission on the target path only.
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Returns:
+            dict: With keys `paths` (levels from `/`), `acls` (the ACL strings) and
+                `matrix`, a list with one row of booleans per path and one column
+                per ACL string. With `can_execute` on `/`, `/` is listed twice:
+                once for --x and once for the permission.
+        """
+        if trace and can_execute:
+            raise ValueError("Cannot set both 'trace' and 'can_execute' to True.")
+
+        queries = [compile_query(acl, mode, numeric=self.numeric) for acl in acls]
+        users = [q.name for q in queries if q.type == "user" and q.groups is None]
+        self.groups.groups_many(users)
+
+        levels = self._levels(self._source(_pytest_acls))
+        if not (trace or can_execute):
+            levels = levels[-1:]
+        elif can_execute and len(levels) == 1:
+            # like `FACLHas`, `/` is its own parent and needs --x as well
+            levels = levels * 2
+        queries_nav = [query.navigation() for query in queries]
+
+        facls = self._get_facls(list(dict.fromkeys(levels)), _pytest_acls=_pytest_acls)
+        matrix = []
+        for i, path in enumerate(levels):
+            facl = facls[path]
+            if can_execute and i < len(levels) - 1:
+                matrix.append(facl.has_permissions(queries_nav, "at_least"))
+            else:
+                matrix.append(facl.has_permissions(queries, mode))
+        return {"paths": levels, "acls": [str(acl) for acl in acls], "matrix": matrix}
+
+    def has_permission(
+        self,
+        acls: list,
+        mode: str,
+        trace: bool = False,
+        can_execute: bool = False,
+        _pytest_acls: dict = None,
+    ) -> dict:
+        """
+        Check which of the given users/groups have a certain permission.
+
+        Args:
+            acls (list): ACL strings (e.g., ["user:user1:r-x"]) or `Query` objects.
+            mode (str): The permission mode ("at_least", "exact", or "at_most").
+            trace (bool): Require the permission at every level from `/`.
+            can_execute (bool): Require --x on every parent directory and the
+                permission on the target path only.
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Returns:
+            dict: Mapping of each ACL string to True if the check passes.
+        """
+        result = self.matrix(
+            acls, mode, trace=trace, can_execute=can_execute, _pytest_acls=_pytest_acls
+        )
+        return {
+            acl: all(row[j] for row in result["matrix"])
+            for j, acl in enumerate(result["acls"])
+        }
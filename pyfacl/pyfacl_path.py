@@ -0,0 +1,106 @@
+import os
+
+from pyfacl import logger
+from pyfacl.pyfacl_source import _abspath, reads_filesystem
+
+
+def ancestors(path: str) -> list:
+    """
+    Return an absolute path and all its ancestors, from the path up to `/`.
+    """
+    levels = [path]
+    while os.path.dirname(levels[-1]) != levels[-1]:
+        levels.append(os.path.dirname(levels[-1]))
+    return levels
+
+
+class PathResolver:
+    """
+    Resolve paths to their canonical, symlink-free form with per-component caching.
+
+    Paths are resolved one component at a time. Each `(resolved parent, name)`
+    pair is resolved once with `os.path.realpath` if it is a symlink, so sibling
+    paths and repeated checks below the same symlinked directory reuse earlier
+    lookups. `..` is applied after resolving the preceding components, like the
+    kernel does, instead of lexically as in `os.path.abspath`.
+    """
+
+    def __init__(self, v: int = 0, maxsize: int = 100_000) -> None:
+        """
+        Args:
+            maxsize (int): Maximum number of cached components before the cache is
+                cleared.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.maxsize = maxsize
+        self._components = {}
+
+    def _resolve_component(self, path: str) -> str:
+        """
+        Resolve a path whose parent is already canonical.
+        """
+        real = self._components.get(path)
+        if real is None:
+            real = os.path.realpath(path) if os.path.islink(path) else path
+            if real != path:
+                self.logger.debug("Resolved symlink %s -> %s", path, real)
+            if len(self._components) >= self.maxsize:
+                self._components.clear()
+            self._components[path] = real
+        return real
+
+    def resolve(self, path: str) -> str:
+        """
+        Return the canonical path, with every symlinked component resolved.
+
+        Missing components are kept as they are.
+
+        Args:
+            path (str): Absolute or relative path.
+        Returns:
+            str: Canonical absolute path.
+        """
+        if not path.startswith("/"):
+            path = os.path.join(os.getcwd(), path)
+        real = "/"
+        for name in path.split("/"):
+            if name in ("", "."):
+                continue
+            if name == "..":
+                real = os.path.dirname(real)
+                continue
+            real = self._resolve_component(os.path.join(real, name))
+        return real
+
+    def levels(self, path: str) -> list:
+        """
+        Return the canonical path and all its ancestors, from the path up to `/`.
+        """
+        return ancestors(self.resolve(path))
+
+    def resolve_for(self, path: str, source) -> str:
+        """
+        Resolve a path for checks against a source.
+
+        Symlinks are only resolved if the source reads the live filesystem.
+        Snapshots and indexes are keyed by the paths as they were captured, which
+        local symlinks must not rewrite.
+
+        Returns:
+            str: The canonical path, or the absolute path as given.
+        """
+        if reads_filesystem(source):
+            return self.resolve(path)
+        return _abspath(path)
+
+    def levels_for(self, path: str, source) -> list:
+        """
+        Return `resolve_for(path, source)` and all its ancestors, up to `/`.
+        """
+        return ancestors(self.resolve_for(path, source))
+
+    def clear(self) -> None:
+        """
+        Drop all cached components, e.g. after symlinks changed.
+        """
+        self._components.clear()
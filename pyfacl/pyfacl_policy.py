@@ -0,0 +1,257 @@
+import json
+import os
+import re
+import tomllib
+
+from pyfacl import FACL, FACLHas, FACLTrace, logger
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_memo import TraceMemo
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_query import MODES, compile_query
+from pyfacl.pyfacl_source import CachingSource, GetfaclSource, SnapshotSource
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """
+    Translate a path glob to a regular expression.
+
+    `*` and `?` match within one path component, `**` matches any number of
+    components. A trailing `/**` also matches the directory itself.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "(/.*)?"
+            i += 3
+        elif pattern.startswith("**/", i):
+            regex += "(.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex + r"\Z"
+
+
+def _glob_root(pattern: str) -> str:
+    """
+    Return the deepest directory of a glob without wildcards.
+    """
+    root = []
+    for component in pattern.split("/"):
+        if any(c in component for c in "*?"):
+            break
+        root.append(component)
+    return "/".join(root) or "/"
+
+
+def load_rules(path: str) -> list:
+    """
+    Load rules from a JSON, TOML or YAML file.
+
+    The file holds a list of rules, either at the top level or under `rules`:
+    ```toml
+    [[rules]]
+    name = "lab_x can read its collab folder"
+    acl = "group:lab_x:r-x"
+    paths = "/data1/collab002/lab_x/**"
+    can_execute = true
+
+    [[rules]]
+    name = "other has at most --x"
+    acl = "other::--x"
+    mode = "at_most"
+    paths = "/data1/**"
+    ```
+
+    Returns:
+        list: The rule dictionaries.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif ext in (".yaml", ".yml"):
+        if yaml is None:
+            raise ImportError(
+                "Reading YAML rules requires PyYAML, install with "
+                "'pip install pyfacl[yaml]'."
+            )
+        with open(path) as f:
+            data = yaml.safe_load(f)
+    else:
+        with open(path) as f:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return data
+
+
+class FACLPolicy:
+    """
+    Evaluate a set of declarative permission rules against a directory tree.
+
+    Rules are compiled once. The tree below all rule roots is walked once and every
+    path is checked against all rules matching it, sharing one FACL cache, trace
+    memo, group resolver and path resolver across rules.
+    """
+
+    def __init__(
+        self,
+        rules: list,
+        v: int = 0,
+        numeric: bool = False,
+        groups=None,
+        source=None,
+    ) -> None:
+        """
+        Args:
+            rules (list): Rule dictionaries with `acl`, `paths` (a glob or a list of
+                globs) and optionally `name`, `mode` (defaults to "at_least"),
+                `trace` and `can_execute`.
+            groups (GroupResolver, optional): Shared resolver for group memberships.
+            source (ACLSource, optional): Backend used to read FACLs. Defaults to
+                running `getfacl`. It is wrapped in a `CachingSource`.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        self.numeric = numeric
+        if groups is None:
+            groups = GroupResolver(v=v, numeric=numeric)
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        self.rules = [self._compile(i, rule) for i, rule in enumerate(rules)]
+        for rule in self.rules:
+            rule["query"] = compile_query(rule["acl"], rule["mode"], numeric=numeric)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FACLPolicy":
+        """
+        Create a policy from a JSON, TOML or YAML rule file, see `load_rules`.
+        """
+        return cls(load_rules(path), **kwargs)
+
+    @staticmethod
+    def _compile(i: int, rule: dict) -> dict:
+        """
+        Validate a rule and compile its path globs.
+        """
+        if "acl" not in rule or "paths" not in rule:
+            raise ValueError(f"Rule {i} needs 'acl' and 'paths': {rule}")
+        mode = rule.get("mode", "at_least")
+        if mode not in MODES:
+            raise ValueError(f"Rule {i} has invalid mode '{mode}'.")
+        trace = bool(rule.get("trace", False))
+        can_execute = bool(rule.get("can_execute", False))
+        if trace and can_execute:
+            raise ValueError(
+                f"Rule {i} cannot set both 'trace' and 'can_execute' to True."
+            )
+        globs = rule["paths"]
+        if isinstance(globs, str):
+            globs = [globs]
+        return {
+            "name": rule.get("name", f"rule {i}"),
+            "acl": rule["acl"],
+            "mode": mode,
+            "trace": trace,
+            "can_execute": can_execute,
+            "regex": re.compile("|".join(_glob_to_regex(g) for g in globs)),
+            "roots": [_glob_root(g) for g in globs],
+        }
+
+    def matching_rules(self, path: str) -> list:
+        """
+        Return the compiled rules whose globs match a path.
+        """
+        return [rule for rule in self.rules if rule["regex"].match(path)]
+
+    def _roots(self) -> list:
+        """
+        Return the rule roots, without roots nested in other roots.
+        """
+        roots = []
+        for root in sorted({r for rule in self.rules for r in rule["roots"]}):
+            if not any(root.startswith(r.rstrip("/") + "/") for r in roots):
+                roots.append(root)
+        return roots
+
+    def walk(self):
+        """
+        Yield every path below the rule roots once, roots included.
+        """
+        for root in self._roots():
+            if not os.path.lexists(root):
+                self.logger.warning("Rule root %s does not exist.", root)
+                continue
+            yield root
+            for dirpath, dirnames, filenames in os.walk(root):
+                for name in dirnames + filenames:
+                    yield os.path.join(dirpath, name)
+
+    def check(self, paths: list = None, _pytest_acls: dict = None):
+        """
+        Check all rules and yield the violations.
+
+        Args:
+            paths (list, optional): Paths to check instead of walking the tree.
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Yields:
+            dict: Violations with `rule`, `path`, `acl` and `mode`.
+        """
+        source = self.source
+        if _pytest_acls is not None:
+            source = SnapshotSource(_pytest_acls, v=self.v)
+        kwargs = dict(
+            v=self.v,
+            numeric=self.numeric,
+            groups=self.groups,
+            source=CachingSource(source),
+        )
+        memo = TraceMemo()
+        resolver = PathResolver(v=self.v)
+
+        for path in paths if paths is not None else self.walk():
+            rules = self.matching_rules(path)
+            if not rules:
+                continue
+            facl = None
+            for rule in rules:
+                acl, mode = rule["query"], rule["mode"]
+                if rule["trace"] or rule["can_execute"]:
+                    cls = FACLTrace if rule["trace"] else FACLHas
+                    granted = (
+                        cls(path=path, memo=memo, resolver=resolver, **kwargs)
+                        .check(acl, mode, lazy=True)
+                        .granted
+                    )
+                else:
+                    if facl is None:
+                        facl = FACL.from_facl(
+                            kwargs["source"].get(path), path=path, **kwargs
+                        )
+                    granted = facl.has_permission(acl, mode)
+                if not granted:
+                    yield {
+                        "rule": rule["name"],
+                        "path": path,
+                        "acl": rule["acl"],
+                        "mode": mode,
+                    }
@@ -0,0 +1,171 @@
+import functools
+import grp
+import pwd
+
+TYPES = {
+    "u": "user",
+    "user": "user",
+    "g": "group",
+    "group": "group",
+    "m": "mask",
+    "mask": "mask",
+    "o": "other",
+    "other": "other",
+}
+BITS = {"r": 4, "w": 2, "x": 1}
+MODES = ("exact", "at_least", "at_most")
+
+
+@functools.lru_cache(maxsize=4096)
+def _name_to_id(entity_type: str, name: str) -> str:
+    """
+    Convert a user or group name to its numeric id, or return the name unchanged.
+    """
+    if not name or name.isdigit():
+        return name
+    try:
+        if entity_type == "user":
+            return str(pwd.getpwnam(name).pw_uid)
+        if entity_type == "group":
+            return str(grp.getgrnam(name).gr_gid)
+    except KeyError:
+        pass
+    return name
+
+
+class Query:
+    """
+    A parsed permission query, e.g. `user:user1:r-x` with mode "at_least".
+
+    Queries are compiled once with `compile_query` and can be passed instead of an
+    ACL string to every API, which skips parsing on every level and path.
+    """
+
+    __slots__ = (
+        "acl",
+        "type",
+        "name",
+        "permissions",
+        "bits",
+        "mode",
+        "groups",
+        "numeric",
+        "_navigation",
+    )
+
+    def __init__(
+        self,
+        acl: str,
+        entity_type: str,
+        name: str,
+        permissions: str,
+        mode: str = "at_least",
+        groups: tuple = None,
+        numeric: bool = False,
+    ) -> None:
+        """
+        Args:
+            acl (str): The ACL string of the query.
+            entity_type (str): 'user', 'group' or 'other'.
+            name (str): The user or group name (or id if numeric). Empty for the
+                owner or owning group.
+            permissions (str): The permissions, e.g. "r-x".
+            mode (str): The permission mode ("at_least", "exact", or "at_most").
+            groups (tuple, optional): Pre-resolved groups of a user.
+            numeric (bool): The name is a numeric uid/gid.
+        """
+        self.acl = acl
+        self.type = entity_type
+        self.name = name
+        self.permissions = permissions
+        self.bits = sum(BITS[c] for c in permissions if c in BITS)
+        self.mode = mode
+        self.groups = groups
+        self.numeric = numeric
+        self._navigation = None
+
+    def __str__(self) -> str:
+        return self.acl
+
+    def __repr__(self) -> str:
+        return f"Query({self.acl!r}, mode={self.mode!r})"
+
+    def with_name(self, name: str) -> "Query":
+        """
+        Return a copy of the query for another principal name.
+        """
+        return Query(
+            f"{self.type}:{name}:{self.permissions}",
+            self.type,
+            name,
+            self.permissions,
+            mode=self.mode,
+            groups=self.groups,
+            numeric=self.numeric,
+        )
+
+    def navigation(self) -> "Query":
+        """
+        Return the `--x` "at_least" query of the same principal, used to check
+        that parent directories can be traversed.
+        """
+        if self._navigation is None:
+            self._navigation = Query(
+                f"{self.type}:{self.name}:--x",
+                self.type,
+                self.name,
+                "--x",
+                mode="at_least",
+                groups=self.groups,
+                numeric=self.numeric,
+            )
+        return self._navigation
+
+
+def compile_query(
+    acl, mode: str = "at_least", groups=None, numeric: bool = False
+) -> Query:
+    """
+    Parse an ACL query string once for repeated checks.
+
+    Args:
+        acl (str | Query): The ACL string to check (e.g., "user:user1:r-x"). A
+            `Query` is returned unchanged if mode and numeric match.
+        mode (str): The permission mode ("at_least", "exact", or "at_most").
+        groups (list | GroupResolver, optional): Groups of the queried user, or a
+            resolver to look them up now instead of at every check.
+        numeric (bool): Convert user and group names to numeric ids.
+
+    Returns:
+        Query: The compiled query.
+
+    Raises:
+        ValueError: If the query or mode is invalid.
+    """
+    if isinstance(acl, Query):
+        if acl.mode == mode and acl.numeric == numeric and groups is None:
+            return acl
+        if groups is None:
+            groups = acl.groups
+        acl = acl.acl
+    if mode not in MODES:
+        raise ValueError(
+            f"Invalid mode '{mode}'. Choose from 'exact', 'at_least', 'at_most'."
+        )
+
+    fields = acl.split(":")
+    if len(fields) != 3 or fields[0] not in TYPES:
+        raise ValueError(f"Invalid ACL query '{acl}', expected e.g. 'user:name:r-x'.")
+    entity_type, name, permissions = TYPES[fields[0]], fields[1], fields[2]
+    if len(permissions) != 3 or not all(c in "rwx-" for c in permissions):
+        raise ValueError(f"Invalid permissions '{permissions}' in query '{acl}'.")
+    if numeric:
+        name = _name_to_id(entity_type, name)
+
+    if groups is not None and entity_type == "user" and name:
+        if hasattr(groups, "groups"):
+            groups = groups.groups(name)
+        groups = tuple(groups)
+    else:
+        groups = None
+    return Query(acl, entity_type, name, permissions, mode, groups, numeric)
@@ -0,0 +1,151 @@
+import json
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+
+def format_level(entry: dict, color: bool = True) -> str:
+    """
+    Render a single trace level, e.g. `0) ✅ user:user1:rwx /home`.
+    """
+    granted = entry["has_permission"]
+    if entry["applicable_acl"] is None:
+        acl_info = "NO_ACL"
+    else:
+        acl_info = entry["applicable_acl"]["line"]
+    text = f"{entry['index']}) {'✅' if granted else '❌'} {acl_info} {entry['path']}"
+    if color:
+        return f"{GREEN if granted else RED}{text}{RESET}"
+    return text
+
+
+class CheckResult:
+    """
+    Verdict of a single permission check with the entry that decided it.
+
+    Results only store references to already parsed data. Text and JSON are
+    rendered on demand, so holding many results from a batch is cheap.
+    """
+
+    __slots__ = ("path", "acl", "mode", "granted", "entry", "elapsed")
+
+    def __init__(
+        self,
+        path: str,
+        acl: str,
+        mode: str,
+        granted: bool,
+        entry: dict = None,
+        elapsed: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            path (str): The checked path.
+            acl (str): The ACL string of the query.
+            mode (str): The permission mode of the query.
+            granted (bool): The verdict.
+            entry (dict, optional): The applicable ACL entry, None if none applied.
+            elapsed (float): Duration of the check in seconds.
+        """
+        self.path = path
+        self.acl = acl
+        self.mode = mode
+        self.granted = granted
+        self.entry = entry
+        self.elapsed = elapsed
+
+    def __bool__(self) -> bool:
+        return self.granted
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.path!r}, {self.acl!r}, {self.mode!r}, "
+            f"granted={self.granted})"
+        )
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+    def to_dict(self) -> dict:
+        """
+        Return the result as a JSON-serializable dictionary.
+        """
+        return {
+            "path": self.path,
+            "acl": self.acl,
+            "mode": self.mode,
+            "granted": self.granted,
+            "entry": self.entry["line"] if self.entry else None,
+            "elapsed": self.elapsed,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Return the result as a JSON string. Keyword arguments go to `json.dumps`.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_text(self, color: bool = False) -> str:
+        """
+        Return a human readable summary, optionally with ANSI colors.
+        """
+        verdict = "is granted" if self.granted else "is NOT granted"
+        text = f"Permission '{self.mode}' for ACL '{self.acl}' {verdict} on path "
+        text += f"'{self.path}'"
+        if self.entry:
+            text += f" (matched '{self.entry['line']}')"
+        if color:
+            return f"{GREEN if self.granted else RED}{text}{RESET}"
+        return text
+
+
+class TraceResult(CheckResult):
+    """
+    Verdict of a check over a directory hierarchy, with the evaluated path chain.
+    """
+
+    __slots__ = ("chain",)
+
+    def __init__(
+        self,
+        path: str,
+        acl: str,
+        mode: str,
+        granted: bool,
+        chain: list,
+        elapsed: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            chain (list): Trace entries with `path`, `applicable_acl`,
+                `has_permission` and `index`, ordered from `/` down. The entry of
+                the first denied level, or else the last level, decides the result.
+        """
+        entry = None
+        for level in chain:
+            entry = level["applicable_acl"]
+            if not level["has_permission"]:
+                break
+        super().__init__(path, acl, mode, granted, entry, elapsed)
+        self.chain = chain
+
+    def to_dict(self) -> dict:
+        result = super().to_dict()
+        result["chain"] = [
+            {
+                "index": level["index"],
+                "path": level["path"],
+                "entry": (
+                    level["applicable_acl"]["line"] if level["applicable_acl"] else None
+                ),
+                "granted": level["has_permission"],
+            }
+            for level in self.chain
+        ]
+        return result
+
+    def to_text(self, color: bool = False) -> str:
+        lines = [format_level(level, color=color) for level in self.chain]
+        lines.append(super().to_text(color=color))
+        return "\n".join(lines)
@@ -0,0 +1,355 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pyfacl import logger
+from pyfacl.pyfacl_capability import mount_for
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the rate of fetched paths.
+
+    Tokens refill at `rate` per second up to `burst`. A request takes its tokens
+    immediately and then sleeps until the bucket is out of debt, so concurrent
+    callers are served in arrival order and large batches are paced too.
+    """
+
+    def __init__(
+        self, rate: float, burst: float = None, _clock=time.monotonic, _sleep=None
+    ) -> None:
+        """
+        Args:
+            rate (float): Tokens (paths) per second.
+            burst (float, optional): Bucket size. Defaults to one second of tokens.
+            _clock, _sleep: For testing purposes with a fake clock.
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._clock = _clock
+        self._sleep = _sleep or time.sleep
+        self._tokens = self.burst
+        self._last = _clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> float:
+        """
+        Take `n` tokens, waiting until they are available.
+
+        Returns:
+            float: Seconds waited.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class ConcurrencyLimit:
+    """
+    Limit on the requests in flight to one mount, optionally adapted to latency.
+
+    With a `target_latency`, the limit follows additive increase/multiplicative
+    decrease: it grows by one after a full window of fast requests and shrinks by
+    a third after a request slower than the target, between `min_limit` and
+    `max_limit`.
+    """
+
+    def __init__(
+        self, max_limit: int, min_limit: int = 1, target_latency: float = None
+    ) -> None:
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.target_latency = target_latency
+        self.limit = self.min_limit if target_latency else max_limit
+        self.in_flight = 0
+        self.requests = 0
+        self._fast = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Wait for a free slot.
+
+        Returns:
+            float: Seconds waited.
+        """
+        start = time.monotonic()
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        return time.monotonic() - start
+
+    def release(self, latency: float) -> None:
+        """
+        Free a slot and adapt the limit to the latency of the finished request.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self.requests += 1
+            if self.target_latency:
+                if latency > self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * 2 // 3)
+                    self._fast = 0
+                else:
+                    self._fast += 1
+                    if self._fast >= self.limit:
+                        self.limit = min(self.max_limit, self.limit + 1)
+                        self._fast = 0
+            self._cond.notify_all()
+
+
+class FetchScheduler:
+    """
+    Schedule ACL fetches so they do not overload shared metadata servers.
+
+    Every fetch takes one token per path from a global token bucket and one slot
+    of the concurrency limit of its mount, see `TokenBucket` and
+    `ConcurrencyLimit`. Latencies, waits and limits are collected in `metrics`.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: float = None,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        target_latency: float = None,
+        v: int = 0,
+        _mounts: list = None,
+    ) -> None:
+        """
+        Args:
+            rate (float, optional): Maximum paths fetched per second over all
+                mounts. Unlimited by default. `FACLAudit` splits it over its
+                worker processes, see `split`.
+            burst (float, optional): Paths that may be fetched at once after an
+                idle period. Defaults to one second of `rate`.
+            max_concurrency (int): Maximum fetches in flight per mount.
+            min_concurrency (int): Lower bound of the adaptive limit per mount.
+            target_latency (float, optional): Adapt the concurrency per mount to
+                keep fetches below this many seconds.
+            _mounts (list, optional): For testing purposes with pre-defined mounts.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.rate = rate
+        self.burst = burst
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self._mounts = _mounts
+        self._limits = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "paths": 0,
+            "errors": 0,
+            "throttled_seconds": 0.0,
+            "queued_seconds": 0.0,
+            "latency_seconds": 0.0,
+            "latency_max_seconds": 0.0,
+        }
+
+    def __getstate__(self) -> dict:
+        # locks cannot be copied into worker processes, every process gets its
+        # own bucket and limits
+        state = self.__dict__.copy()
+        state.update(bucket=None, _limits={}, _lock=None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+        self._lock = threading.Lock()
+
+    def split(self, n: int) -> "FetchScheduler":
+        """
+        Return a scheduler for one of `n` processes sharing this rate.
+
+        Every copy gets `rate / n` and `burst / n`, so `n` processes together
+        fetch at most `rate` paths per second. Concurrency limits are per mount
+        and process, and are kept as they are.
+        """
+        scheduler = copy.copy(self)
+        scheduler._stats = dict(self._stats)
+        if self.rate:
+            scheduler.rate = self.rate / n
+            scheduler.burst = self.burst / n if self.burst else None
+            scheduler.bucket = TokenBucket(scheduler.rate, scheduler.burst)
+        return scheduler
+
+    def mount(self, path: str) -> str:
+        """
+        Return the mount point a path is scheduled under.
+        """
+        return mount_for(path, self._mounts).mount_point
+
+    def _limit(self, mount: str) -> ConcurrencyLimit:
+        with self._lock:
+            if mount not in self._limits:
+                self._limits[mount] = ConcurrencyLimit(
+                    self.max_concurrency, self.min_concurrency, self.target_latency
+                )
+            return self._limits[mount]
+
+    def run(self, mount: str, fetch, n: int = 1):
+        """
+        Run a fetch of `n` paths on a mount once a token and a slot are available.
+
+        Args:
+            mount (str): The mount point, see `mount`.
+            fetch (callable): Called without arguments, returns the FACLs.
+            n (int): The number of paths fetched.
+        Returns:
+            The result of `fetch`.
+        """
+        limit = self._limit(mount)
+        throttled = self.bucket.acquire(n) if self.bucket else 0.0
+        queued = limit.acquire()
+        start = time.monotonic()
+        failed = False
+        try:
+            return fetch()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            latency = time.monotonic() - start
+            limit.release(latency)
+            with self._lock:
+                stats = self._stats
+                stats["requests"] += 1
+                stats["paths"] += n
+                stats["errors"] += failed
+                stats["throttled_seconds"] += throttled
+                stats["queued_seconds"] += queued
+                stats["latency_seconds"] += latency
+                stats["latency_max_seconds"] = max(
+                    stats["latency_max_seconds"], latency
+                )
+            if latency > (self.target_latency or float("inf")):
+                self.logger.debug(
+                    "Slow fetch of %d paths on %s: %.3fs, limit %d",
+                    n,
+                    mount,
+                    latency,
+                    limit.limit,
+                )
+
+    def metrics(self) -> dict:
+        """
+        Return the counters and the current limit of every mount.
+
+        Returns:
+            dict: Totals (`requests`, `paths`, `errors`, seconds spent throttled by
+                the rate limit, queued for a slot and fetching) and per mount the
+                `limit`, `in_flight` and `requests`.
+        """
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics["mounts"] = {
+                mount: {
+                    "limit": limit.limit,
+                    "in_flight": limit.in_flight,
+                    "requests": limit.requests,
+                }
+                for mount, limit in self._limits.items()
+            }
+        return metrics
+
+    def samples(self) -> list:
+        """
+        Return the metrics as gauge samples for `MetricsRegistry.add_collector`.
+        """
+        metrics = self.metrics()
+        samples = [
+            (f"pyfacl_scheduler_{name}", {}, value)
+            for name, value in metrics.items()
+            if name != "mounts"
+        ]
+        for mount, limits in metrics["mounts"].items():
+            for name, value in limits.items():
+                samples.append(
+                    (f"pyfacl_scheduler_mount_{name}", {"mount": mount}, value)
+                )
+        return samples
+
+
+class ScheduledSource:
+    """
+    Fetch FACLs from another source through a `FetchScheduler`.
+
+    Single fetches (e.g. `FACL` and traces) and batches are paced by the same
+    scheduler. Batches are split by mount into chunks that run in a thread pool,
+    so different mounts are fetched in parallel, each within its own limit.
+    """
+
+    def __init__(
+        self,
+        source,
+        scheduler: FetchScheduler = None,
+        chunk_size: int = 100,
+        workers: int = 4,
+        **kwargs,
+    ) -> None:
+        """
+        Args:
+            source (ACLSource): The source to fetch from.
+            scheduler (FetchScheduler, optional): Shared scheduler. Created from
+                `kwargs` by default.
+            chunk_size (int): Paths per scheduled fetch of a batch.
+            workers (int): Threads fetching chunks of a batch.
+        """
+        self.source = source
+        self.scheduler = scheduler or FetchScheduler(**kwargs)
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def split(self, n: int) -> "ScheduledSource":
+        """
+        Return a copy for one of `n` worker processes, see `FetchScheduler.split`.
+        """
+        source = copy.copy(self)
+        source.scheduler = self.scheduler.split(n)
+        return source
+
+    def get(self, path: str) -> str:
+        return self.scheduler.run(
+            self.scheduler.mount(path), lambda: self.source.get(path)
+        )
+
+    def _fetch(self, chunk: tuple) -> dict:
+        mount, paths = chunk
+        return self.scheduler.run(
+            mount, lambda: self.source.get_many(paths), n=len(paths)
+        )
+
+    def get_many(self, paths: list) -> dict:
+        by_mount = {}
+        for path in dict.fromkeys(paths):
+            by_mount.setdefault(self.scheduler.mount(path), []).append(path)
+        chunks = [
+            (mount, mount_paths[i : i + self.chunk_size])
+            for mount, mount_paths in by_mount.items()
+            for i in range(0, len(mount_paths), self.chunk_size)
+        ]
+
+        facls = {}
+        if self.workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for result in pool.map(self._fetch, chunks):
+                    facls.update(result)
+        else:
+            for chunk in chunks:
+                facls.update(self._fetch(chunk))
+        return {path: facls[path] for path in paths}
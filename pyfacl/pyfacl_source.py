@@ -0,0 +1,584 @@
+import errno
+import functools
+import grp
+import os
+import pwd
+import re
+import sqlite3
+import stat
+import struct
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol, runtime_checkable
+
+from pyfacl import logger, metrics
+from pyfacl.pyfacl_capability import backend_for, getfacl_available
+
+# POSIX ACL xattr format, see linux/posix_acl_xattr.h
+XATTR_ACCESS = "system.posix_acl_access"
+XATTR_DEFAULT = "system.posix_acl_default"
+XATTR_VERSION = 2
+XATTR_TAGS = {
+    0x01: "user_obj",
+    0x02: "user",
+    0x04: "group_obj",
+    0x08: "group",
+    0x10: "mask",
+    0x20: "other",
+}
+
+
+@runtime_checkable
+class ACLSource(Protocol):
+    """
+    Protocol for backends that return the raw FACL text of paths.
+
+    The text is in `getfacl` output format, so every source can be parsed by `FACL`.
+    An empty string means the FACL could not be retrieved. Sources that read the
+    live filesystem set `reads_filesystem = True`, which lets `FACL` evaluate
+    paths without an extended ACL from `os.stat` alone, see `stat_minimal`.
+    Wrappers expose the wrapped source as `source`, see `reads_filesystem`.
+    """
+
+    def get(self, path: str) -> str:
+        """
+        Return the FACL text of a single path.
+        """
+        ...
+
+    def get_many(self, paths: list) -> dict:
+        """
+        Return a mapping of path to FACL text for many paths.
+        """
+        ...
+
+
+def _abspath(path: str) -> str:
+    return path if path.startswith("/") else os.path.abspath(path)
+
+
+def reads_filesystem(source) -> bool:
+    """
+    Whether a source, or the source it wraps (e.g. a `CachingSource`), reads the
+    live filesystem rather than a snapshot of it.
+    """
+    while source is not None:
+        if getattr(source, "reads_filesystem", False):
+            return True
+        source = getattr(source, "source", None)
+    return False
+
+
+def stat_minimal(path: str) -> os.stat_result:
+    """
+    Return the stat of a path whose ACL is fully described by its mode bits.
+
+    A file has a minimal ACL if it has no `system.posix_acl_access` xattr (or its
+    filesystem does not support ACLs). None is returned for files with an
+    extended ACL, and for paths that cannot be read, so callers fall back to their
+    regular source and its error handling.
+    """
+    try:
+        if XattrSource._read_xattr(path, XATTR_ACCESS) is not None:
+            return None
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class GetfaclSource:
+    """
+    Read FACLs by running `getfacl` for every path.
+    """
+
+    reads_filesystem = True
+
+    def __init__(self, numeric: bool = False, v: int = 0) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.numeric = numeric
+
+    @staticmethod
+    def _facl_available() -> bool:
+        """
+        Check if the `getfacl` command is available on the system. The check runs
+        once per process.
+
+        Returns:
+            bool: True if `getfacl` is available, False otherwise.
+        """
+        return getfacl_available()
+
+    def get(self, path: str) -> str:
+        # facl available
+        if not self._facl_available():
+            self.logger.error("The 'getfacl' command is not available on this system.")
+            return ""
+
+        try:
+            path = _abspath(path)
+            cmd = ["getfacl", "-n", path] if self.numeric else ["getfacl", path]
+            metrics.registry.inc("pyfacl_subprocesses", command="getfacl")
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            self.logger.error("Error retrieving FACL for %s: %s", path, e)
+            return ""
+
+    def get_many(self, paths: list) -> dict:
+        return {path: self.get(path) for path in paths}
+
+
+def _unescape_getfacl_path(path: str) -> str:
+    """
+    Undo the octal escaping (e.g., `\\040` for a space) getfacl uses in headers.
+    """
+    return re.sub(
+        r"\\(\\|[0-7]{3})",
+        lambda m: "\\" if m.group(1) == "\\" else chr(int(m.group(1), 8)),
+        path,
+    )
+
+
+def tree_key(path: str) -> str:
+    """
+    Sort key that orders every path directly before all of its descendants.
+
+    Plain string order would put `/a b` between `/a` and `/a/c`.
+    """
+    return path.replace("/", "\x01")
+
+
+def split_getfacl_output(output: str) -> dict:
+    """
+    Split multi-path `getfacl` output into one FACL text per path.
+
+    Records are separated by blank lines and start with a `# file:` header. Every
+    record keeps its terminating blank line, so it reads like the output of
+    `getfacl` for that path alone.
+
+    Args:
+        output (str): The output of `getfacl path1 path2 ...` or `getfacl -R`.
+    Returns:
+        dict: Mapping of the unescaped `# file:` path to its FACL text.
+    """
+    records = {}
+    for record in re.split(r"\n\s*\n", output):
+        record = record.strip("\n")
+        if not record.startswith("# file: "):
+            continue
+        header = record.split("\n", 1)[0]
+        path = _unescape_getfacl_path(header[len("# file: ") :])
+        # like `getfacl` output for a single path, ending with a blank line
+        records[path] = record + "\n\n"
+    return records
+
+
+class BatchGetfaclSource:
+    """
+    Read FACLs by sending many paths to one `getfacl` invocation.
+
+    Paths are passed in chunks on stdin (`getfacl -p -`), and chunks may run in a
+    small pool of parallel invocations. The multi-path output is split back into
+    one FACL per path. Paths that fail (e.g., missing files) return an empty
+    string without failing the rest of the batch.
+    """
+
+    reads_filesystem = True
+
+    def __init__(
+        self,
+        numeric: bool = False,
+        chunk_size: int = 500,
+        workers: int = 1,
+        v: int = 0,
+    ) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.numeric = numeric
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def _run(self, args: list, stdin: str = None) -> dict:
+        """
+        Run `getfacl` and split its output into per-path records.
+        """
+        cmd = ["getfacl", "--absolute-names"]
+        if self.numeric:
+            cmd.append("-n")
+        metrics.registry.inc("pyfacl_subprocesses", command="getfacl")
+        result = subprocess.run(
+            cmd + args, input=stdin, capture_output=True, text=True, check=False
+        )
+        if result.returncode != 0:
+            self.logger.warning(
+                "Error retrieving FACLs for some paths: %s", result.stderr.strip()
+            )
+        return split_getfacl_output(result.stdout)
+
+    def _run_chunk(self, paths: list) -> dict:
+        """
+        Run one `getfacl` invocation for a chunk of absolute paths.
+        """
+        # paths with newlines cannot be passed on stdin
+        stdin_paths = [p for p in paths if "\n" not in p]
+        arg_paths = [p for p in paths if "\n" in p]
+        records = {}
+        if stdin_paths:
+            records.update(self._run(["-"], "\n".join(stdin_paths) + "\n"))
+        if arg_paths:
+            records.update(self._run(["--", *arg_paths]))
+        return {path: records.get(path, "") for path in paths}
+
+    def get(self, path: str) -> str:
+        return self.get_many([path])[path]
+
+    def get_many(self, paths: list) -> dict:
+        if not GetfaclSource._facl_available():
+            self.logger.error("The 'getfacl' command is not available on this system.")
+            return {path: "" for path in paths}
+
+        absolute = {path: _abspath(path) for path in paths}
+        unique = list(dict.fromkeys(absolute.values()))
+        chunks = [
+            unique[i : i + self.chunk_size]
+            for i in range(0, len(unique), self.chunk_size)
+        ]
+        facls = {}
+        if self.workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for result in pool.map(self._run_chunk, chunks):
+                    facls.update(result)
+        else:
+            for chunk in chunks:
+                facls.update(self._run_chunk(chunk))
+        return {path: facls[absolute[path]] for path in paths}
+
+
+@functools.lru_cache(maxsize=4096)
+def _user_name(uid: int) -> str:
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+@functools.lru_cache(maxsize=4096)
+def _group_name(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+
+class XattrSource:
+    """
+    Read FACLs natively from the `system.posix_acl_*` extended attributes.
+
+    No subprocess is started. Files without an extended ACL are rendered from the
+    mode bits returned by `os.stat`.
+    """
+
+    reads_filesystem = True
+
+    def __init__(self, numeric: bool = False, v: int = 0) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.numeric = numeric
+
+    @staticmethod
+    def _read_xattr(path: str, name: str) -> bytes:
+        """
+        Return the raw ACL xattr, or None if the file has none.
+        """
+        try:
+            return os.getxattr(path, name)
+        except OSError as e:
+            if e.errno in (errno.ENODATA, errno.ENOTSUP, errno.EOPNOTSUPP):
+                return None
+            raise
+
+    @staticmethod
+    def _decode_xattr(data: bytes) -> list:
+        """
+        Decode a POSIX ACL xattr into `(tag, id, permissions)` tuples.
+        """
+        (version,) = struct.unpack_from("<I", data, 0)
+        if version != XATTR_VERSION:
+            raise ValueError(f"Unsupported ACL xattr version {version}.")
+        entries = []
+        for tag, perm, qualifier in struct.iter_unpack("<HHI", data[4:]):
+            permissions = (
+                ("r" if perm & 4 else "-")
+                + ("w" if perm & 2 else "-")
+                + ("x" if perm & 1 else "-")
+            )
+            entries.append((XATTR_TAGS.get(tag), qualifier, permissions))
+        return entries
+
+    @staticmethod
+    def _mode_entries(mode: int) -> list:
+        """
+        Return the minimal ACL entries equivalent to the mode bits.
+        """
+        entries = []
+        for tag, shift in [("user_obj", 6), ("group_obj", 3), ("other", 0)]:
+            bits = (mode >> shift) & 7
+            permissions = (
+                ("r" if bits & 4 else "-")
+                + ("w" if bits & 2 else "-")
+                + ("x" if bits & 1 else "-")
+            )
+            entries.append((tag, None, permissions))
+        return entries
+
+    @staticmethod
+    def _mode_flags(mode: int) -> str:
+        """
+        Return the setuid, setgid and sticky flags as shown by `getfacl`.
+        """
+        return (
+            ("s" if mode & stat.S_ISUID else "-")
+            + ("s" if mode & stat.S_ISGID else "-")
+            + ("t" if mode & stat.S_ISVTX else "-")
+        )
+
+    def _format_entry(self, tag: str, qualifier: int, permissions: str) -> str:
+        if tag == "user_obj":
+            return f"user::{permissions}"
+        elif tag == "user":
+            name = str(qualifier) if self.numeric else _user_name(qualifier)
+            return f"user:{name}:{permissions}"
+        elif tag == "group_obj":
+            return f"group::{permissions}"
+        elif tag == "group":
+            name = str(qualifier) if self.numeric else _group_name(qualifier)
+            return f"group:{name}:{permissions}"
+        elif tag == "mask":
+            return f"mask::{permissions}"
+        return f"other::{permissions}"
+
+    def _render(self, path: str, st: os.stat_result, access, default) -> str:
+        """
+        Render the FACL in `getfacl` output format.
+        """
+        owner = str(st.st_uid) if self.numeric else _user_name(st.st_uid)
+        group = str(st.st_gid) if self.numeric else _group_name(st.st_gid)
+        lines = [
+            f"# file: {path.lstrip('/') or '.'}",
+            f"# owner: {owner}",
+            f"# group: {group}",
+        ]
+        flags = self._mode_flags(st.st_mode)
+        if flags != "---":
+            lines.append(f"# flags: {flags}")
+        lines.extend(self._format_entry(*entry) for entry in access)
+        lines.extend("default:" + self._format_entry(*entry) for entry in default)
+        return "\n".join(lines) + "\n"
+
+    def get(self, path: str) -> str:
+        path = _abspath(path)
+        try:
+            st = os.stat(path)
+            access = self._read_xattr(path, XATTR_ACCESS)
+            default = None
+            if stat.S_ISDIR(st.st_mode):
+                default = self._read_xattr(path, XATTR_DEFAULT)
+        except OSError as e:
+            self.logger.error("Error retrieving FACL for %s: %s", path, e)
+            return ""
+
+        access = (
+            self._decode_xattr(access) if access else self._mode_entries(st.st_mode)
+        )
+        default = self._decode_xattr(default) if default else []
+        return self._render(path, st, access, default)
+
+    def get_many(self, paths: list) -> dict:
+        return {path: self.get(path) for path in paths}
+
+
+class SnapshotSource:
+    """
+    Serve FACLs from an in-memory mapping of path to FACL text.
+    """
+
+    def __init__(self, acls: dict, v: int = 0) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.acls = acls
+
+    def get(self, path: str) -> str:
+        if path not in self.acls:
+            self.logger.warning("No FACL for %s in snapshot.", path)
+            return ""
+        return self.acls[path]
+
+    def get_many(self, paths: list) -> dict:
+        return {path: self.get(path) for path in paths}
+
+
+class IndexSource:
+    """
+    Serve FACLs from an on-disk SQLite index of path to FACL text.
+
+    Build an index with `IndexSource.build(db_path, paths, source)`.
+    """
+
+    def __init__(self, db_path: str, v: int = 0, chunk_size: int = 500) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self._conn = None
+
+    def __getstate__(self) -> dict:
+        # connections cannot be shared across processes
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS acls (path TEXT PRIMARY KEY, facl TEXT)"
+            )
+        return self._conn
+
+    @classmethod
+    def build(cls, db_path: str, paths: list, source, v: int = 0) -> "IndexSource":
+        """
+        Fetch the FACLs of paths from another source and store them in an index.
+        """
+        index = cls(db_path, v=v)
+        for i in range(0, len(paths), index.chunk_size):
+            index.put_many(source.get_many(paths[i : i + index.chunk_size]))
+        return index
+
+    def put_many(self, acls: dict) -> None:
+        """
+        Insert or replace FACL texts in the index.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO acls (path, facl) VALUES (?, ?)", acls.items()
+            )
+
+    def get(self, path: str) -> str:
+        return self.get_many([path])[path]
+
+    def get_many(self, paths: list) -> dict:
+        found = {}
+        for i in range(0, len(paths), self.chunk_size):
+            chunk = paths[i : i + self.chunk_size]
+            query = "SELECT path, facl FROM acls WHERE path IN ({})".format(
+                ",".join("?" * len(chunk))
+            )
+            found.update(self.conn.execute(query, chunk).fetchall())
+        missing = [path for path in paths if path not in found]
+        if missing:
+            self.logger.warning("No FACL for %d paths in index.", len(missing))
+        return {path: found.get(path, "") for path in paths}
+
+    def iter_sorted(self):
+        """
+        Stream all `(path, facl)` pairs in tree order, see `tree_key`.
+        """
+        yield from self.conn.execute(
+            "SELECT path, facl FROM acls ORDER BY replace(path, '/', char(1))"
+        )
+
+
+class CachingSource:
+    """
+    LRU cache in front of another source.
+    """
+
+    def __init__(self, source, maxsize: int = 100_000, resolver=None) -> None:
+        """
+        Args:
+            resolver (PathResolver, optional): Key the cache by canonical path, so
+                paths reached through different symlinks share one entry.
+        """
+        self.source = source
+        self.resolver = resolver
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def _store(self, path: str, facl: str) -> None:
+        self._cache[path] = facl
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def get(self, path: str) -> str:
+        return self.get_many([path])[path]
+
+    def get_many(self, paths: list) -> dict:
+        if self.resolver is None:
+            keys = {path: path for path in paths}
+        else:
+            keys = {path: self.resolver.resolve(path) for path in paths}
+        result = {}
+        missing = []
+        for key in dict.fromkeys(keys.values()):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                result[key] = self._cache[key]
+                self.hits += 1
+            else:
+                missing.append(key)
+        registry = metrics.registry
+        if registry.enabled:
+            registry.inc(
+                "pyfacl_cache_requests", len(result), cache="acl", result="hit"
+            )
+            registry.inc(
+                "pyfacl_cache_requests", len(missing), cache="acl", result="miss"
+            )
+        if missing:
+            self.misses += len(missing)
+            for key, facl in self.source.get_many(missing).items():
+                self._store(key, facl)
+                result[key] = facl
+        return {path: result[keys[path]] for path in paths}
+
+    def clear(self) -> None:
+        """
+        Remove all cached FACLs.
+        """
+        self._cache.clear()
+
+
+class AutoSource:
+    """
+    Pick the best backend per filesystem, based on one-time capability detection.
+
+    Paths are grouped by the backend chosen for their mount (see
+    `pyfacl_capability.backend_for`) and fetched in one batch per backend.
+    """
+
+    reads_filesystem = True
+
+    def __init__(self, numeric: bool = False, v: int = 0) -> None:
+        self.logger = logger.logger_basic(__name__, v)
+        self.sources = {
+            "xattr": XattrSource(numeric=numeric, v=v),
+            "getfacl-batch": BatchGetfaclSource(numeric=numeric, v=v),
+        }
+
+    def get(self, path: str) -> str:
+        return self.get_many([path])[path]
+
+    def get_many(self, paths: list) -> dict:
+        by_backend = {}
+        for path in paths:
+            by_backend.setdefault(backend_for(_abspath(path)), []).append(path)
+
+        facls = {}
+        for backend, backend_paths in by_backend.items():
+            if backend is None:
+                self.logger.error("No ACL backend available for %s", backend_paths[0])
+                facls.update((path, "") for path in backend_paths)
+                continue
+            facls.update(self.sources[backend].get_many(backend_paths))
+        return {path: facls[path] for path in paths}
@@ -1,6 +1,12 @@
+import logging
 import os
+import time
 
-from pyfacl import FACL, logger
+from pyfacl import FACL, logger, metrics
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_query import compile_query
+from pyfacl.pyfacl_result import TraceResult, format_level
+from pyfacl.pyfacl_source import GetfaclSource, SnapshotSource
 
 
 class FACLTrace:
@@ -8,11 +14,44 @@ class FACLTrace:
     Analyze and trace ACLs through directory hierarchy.
     """
 
-    def __init__(self, path: str = None, v: int = 0) -> None:
+    def __init__(
+        self,
+        path: str = None,
+        v: int = 0,
+        memo=None,
+        numeric: bool = False,
+        groups=None,
+        source=None,
+        resolver=None,
+        trusted=None,
+    ) -> None:
+        """
+        Args:
+            memo (TraceMemo, optional): Shared memo of ancestor verdicts. Traces of
+                sibling paths stop at the first cached ancestor.
+            numeric (bool): Match numeric uids/gids instead of names.
+            groups (GroupResolver, optional): Shared resolver for group memberships.
+            source (ACLSource, optional): Backend used to read FACLs. Defaults to
+                running `getfacl`.
+            resolver (PathResolver, optional): Shared resolver for symlinks. The
+                trace is evaluated over the canonical path chain.
+            trusted (TrustedPrefixes, optional): Trusted boundaries. Verdicts from
+                `/` down to a boundary are evaluated once and reused.
+        """
         self.logger = logger.logger_basic(__name__, v)
         self.print = logger.logger_print(v)
         self.v = v
         self.path = path
+        self.memo = memo
+        self.numeric = numeric
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        if resolver is None:
+            resolver = PathResolver(v=v)
+        self.resolver = resolver
+        self.trusted = trusted
 
         # catch common error that path and acl are mixed up
         if "/" not in path and ":" in path:
@@ -20,6 +59,57 @@ class FACLTrace:
                 f"Path looks like an ACL entry. Please check your input:\nPath: {path}"
             )
 
+    def _get_facls(self, paths: list, source) -> dict:
+        """
+        Fetch and parse the FACLs of the given levels in one batch.
+        """
+        return FACL.from_source(
+            paths, source, v=self.v, numeric=self.numeric, groups=self.groups
+        )
+
+    def _trace_entry(self, facl: FACL, path: str, acl: str, mode: str) -> dict:
+        """
+        Evaluate the query against the FACL of a single level.
+        """
+        # denied if no applicable ACL exists, not recorded as a check of its own
+        has_permission, applicable_acl = facl._verdict(acl, mode)
+
+        return {
+            "path": path,
+            "applicable_acl": applicable_acl,
+            "has_permission": has_permission,
+        }
+
+    def _cached(self, path: str, acl: str, mode: str, source) -> list:
+        """
+        Return the known trace from `/` down to `path`, or None.
+
+        The memo is checked first, then trusted boundaries. A trusted boundary that
+        has not been evaluated for this query yet is traced once and stored.
+        """
+        if self.memo is not None:
+            cached = self.memo.get(path, acl, mode)
+            if cached is not None:
+                return cached
+        if self.trusted is None or path not in self.trusted.boundaries:
+            return None
+
+        cached = self.trusted.get(path, acl, mode)
+        if cached is None:
+            trace = FACLTrace(
+                path=path,
+                v=self.v,
+                numeric=self.numeric,
+                groups=self.groups,
+                source=source,
+                resolver=self.resolver,
+            )._trace(acl, mode)
+            self.trusted.put(path, acl, mode, trace)
+            cached = self.trusted.get(path, acl, mode)
+        if self.memo is not None:
+            self.memo.put(cached, acl, mode)
+        return cached
+
     def _trace(self, acl: str, mode: str, _pytest_acls: dict = None) -> list:
         """
         Trace and return all applicable ACLs for the given path.
@@ -33,92 +123,162 @@ class FACLTrace:
         Returns:
             List[dict]: List of dictionaries with applicable ACLs, path, and permission
         """
-        trace = []
-        current_path = self.path
-        if not current_path.startswith("/"):
-            current_path = os.path.abspath(current_path)
+        source = self.source
+        if _pytest_acls is not None:
+            source = SnapshotSource(_pytest_acls, v=self.v)
+        current_path = self.resolver.resolve_for(self.path, source)
 
+        # collect levels up to the first cached or trusted ancestor
+        levels = []
         while True:
-
-            # get info (from pytest dict or by parsing)
-            if _pytest_acls is None:
-                facl = FACL(path=current_path, v=self.v)
-            else:
-                facl_str = _pytest_acls[current_path]
-                facl = FACL(v=self.v, _facl=facl_str)
-                facl.is_init = True
-                facl._parse_metadata()
-                facl._parse_acls()
-
-            # check for applicable ACL
-            applicable_acl = facl.get_applicable_acl(acl)
-            # Default to False when no applicable ACL exists
-            # Only check permission if we have an applicable ACL
-            has_permission = False
-            if applicable_acl:
-                has_permission = facl.has_permission(acl, mode)
-
-            # store info
-            trace_entry = {
-                "path": current_path,
-                "applicable_acl": applicable_acl,
-                "has_permission": has_permission,
-            }
-            trace.append(trace_entry)
-
-            # stop traversing if no applicable ACL found
-            if not applicable_acl:
+            cached = self._cached(current_path, acl, mode, source)
+            if cached is not None:
                 break
-
-            # move up one directory
+            levels.append(current_path)
             parent_path = os.path.dirname(current_path)
             if parent_path == current_path:
                 break
             current_path = parent_path
 
-        # reverse and add index
+        # fetch all levels in one batch
+        facls = self._get_facls(levels, source)
+
+        trace = []
+        for current_path in levels:
+            trace_entry = self._trace_entry(
+                facls[current_path], current_path, acl, mode
+            )
+            trace.append(trace_entry)
+
+            # stop traversing if no applicable ACL found
+            if not trace_entry["applicable_acl"]:
+                cached = None
+                break
+
+        # reverse, add cached prefix and index
+        if self.memo is not None:
+            self.memo.put(trace, acl, mode)
         trace.reverse()
+        if cached:
+            trace = cached + trace
         for i, entry in enumerate(trace):
             entry["index"] = i
         return trace
 
+    def iter_trace(self, acl: str, mode: str, _pytest_acls: dict = None):
+        """
+        Lazily evaluate the trace top-down, from `/` to the target path.
+
+        Levels are fetched one at a time and evaluation stops after the first
+        level that does not grant the permission, so denials near the top of the
+        tree skip all deeper fetches. Use `_trace` for the full trace.
+
+        Args:
+            acl (str): The ACL string to check (e.g., "user:user1:rwx").
+            mode (str): The permission mode to check.
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+
+        Yields:
+            dict: Trace entries with `path`, `applicable_acl`, `has_permission` and
+                `index`, ordered from `/` down.
+        """
+        source = self.source
+        if _pytest_acls is not None:
+            source = SnapshotSource(_pytest_acls, v=self.v)
+        levels = self.resolver.levels_for(self.path, source)
+        levels.reverse()
+
+        # start below the deepest cached or trusted ancestor
+        index = 0
+        if self.memo is not None or self.trusted is not None:
+            for depth in range(len(levels) - 1, -1, -1):
+                cached = self._cached(levels[depth], acl, mode, source)
+                if cached is None:
+                    continue
+                for entry in cached:
+                    entry["index"] = index
+                    index += 1
+                    yield entry
+                    if not entry["has_permission"]:
+                        return
+                levels = levels[depth + 1 :]
+                break
+
+        for current_path in levels:
+            facl = self._get_facls([current_path], source)[current_path]
+            entry = self._trace_entry(facl, current_path, acl, mode)
+            if self.memo is not None:
+                self.memo.put([entry], acl, mode)
+            entry["index"] = index
+            index += 1
+            yield entry
+            if not entry["has_permission"]:
+                return
+
     def _print_permission(self, trace_entry: dict) -> None:
         """
         Print the permission trace for a given path.
         """
-        color = {
-            True: "\033[92m",  # Green for granted
-            False: "\033[91m",  # Red for denied
-        }[trace_entry["has_permission"]]
-        emoji = {
-            True: "✅",
-            False: "❌",
-        }[trace_entry["has_permission"]]
-
-        # Handle case where no applicable ACL was found
-        if trace_entry["applicable_acl"] is None:
-            acl_info = "NO_ACL"
-        else:
-            acl_info = trace_entry["applicable_acl"]["line"]
+        if not self.print.isEnabledFor(logging.INFO):
+            return
 
-        self.print.info(
-            (
-                f"{color}{trace_entry['index']}) {emoji} "
-                f"{acl_info} "
-                f"{trace_entry['path']}\033[0m"
-            )
-        )
+        self.print.info("%s", format_level(trace_entry))
 
-    def has_permission(self, acl: str, mode: str, _pytest_acls: dict = None) -> bool:
+    def has_permission(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> bool:
         """
         Check if a specific user or group has a certain permission at the given path.
+
+        Args:
+            acl (str | Query): The ACL string or a compiled `Query`.
+            mode (str, optional): The permission mode. Defaults to the mode of the
+                query, or "at_least".
+            lazy (bool): Evaluate top-down and stop at the first denial instead of
+                building the full trace. Only the evaluated levels are printed.
         """
+        result = self.check(acl, mode, _pytest_acls=_pytest_acls, lazy=lazy)
+        for entry in result.chain:
+            self._print_permission(entry)
+        return result.granted
 
-        trace = self._trace(acl, mode, _pytest_acls=_pytest_acls)
+    def check(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> TraceResult:
+        """
+        Trace a permission and return the verdict with the evaluated path chain.
 
-        has = True
-        for entry in trace:
-            if not entry["has_permission"]:
-                has = False
-            self._print_permission(entry)
-        return has
+        The query is compiled once and reused at every level.
+
+        Args:
+            acl (str | Query): The ACL string (e.g., "user:user1:rwx") or a
+                compiled `Query`.
+            mode (str, optional): The permission mode ("at_least", "exact", or
+                "at_most"). Defaults to the mode of the query, or "at_least".
+            _pytest_acls (dict, optional): For testing purposes with pre-defined ACLs.
+            lazy (bool): Evaluate top-down and stop at the first denial.
+
+        Returns:
+            TraceResult: The verdict, the trace entries from `/` down and timing.
+        """
+        result = self._check(acl, mode, _pytest_acls=_pytest_acls, lazy=lazy)
+        metrics.record_check("trace", result)
+        return result
+
+    def _check(
+        self, acl, mode: str = None, _pytest_acls: dict = None, lazy: bool = False
+    ) -> TraceResult:
+        """
+        Run `check` without recording metrics, for traces inside other checks.
+        """
+        start = time.perf_counter()
+        mode = mode or getattr(acl, "mode", "at_least")
+        query = compile_query(acl, mode, numeric=self.numeric)
+        if lazy:
+            trace = list(self.iter_trace(query, mode, _pytest_acls=_pytest_acls))
+        else:
+            trace = self._trace(query, mode, _pytest_acls=_pytest_acls)
+        granted = all(entry["has_permission"] for entry in trace)
+        return TraceResult(
+            self.path, str(acl), mode, granted, trace, time.perf_counter() - start
+        )
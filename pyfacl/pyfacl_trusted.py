@@ -0,0 +1,116 @@
+import os
+
+from pyfacl import FACLTrace, logger
+from pyfacl.pyfacl_capability import mounts
+from pyfacl.pyfacl_query import compile_query
+
+
+class TrustedPrefixes:
+    """
+    Ancestor directories whose FACLs are treated as stable for the whole run.
+
+    Top-level directories like `/` or `/data1` rarely change but appear in every
+    trace. A trace that reaches a trusted boundary reuses the verdicts from `/`
+    down to that boundary, which are evaluated once per principal and mode instead
+    of once per path. Boundaries are configured prefixes and, optionally, all
+    mount points of the current process.
+    """
+
+    def __init__(
+        self,
+        prefixes: list = (),
+        mount_points: bool = False,
+        v: int = 0,
+        _mounts: list = None,
+    ) -> None:
+        """
+        Args:
+            prefixes (list): Directories to trust, including their ancestors.
+            mount_points (bool): Also trust every mount point from
+                `/proc/self/mountinfo`.
+            _mounts (list, optional): For testing purposes with pre-defined mounts.
+        """
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        boundaries = {os.path.realpath(prefix) for prefix in prefixes}
+        if mount_points:
+            for mount in _mounts if _mounts is not None else mounts():
+                boundaries.add(mount.mount_point)
+        self.boundaries = frozenset(boundaries)
+        self._verdicts = {}
+
+    def boundary_for(self, path: str) -> str:
+        """
+        Return the deepest boundary that is the path or one of its ancestors.
+
+        Args:
+            path (str): Canonical absolute path.
+        Returns:
+            str: The boundary, or None if the path is not below any boundary.
+        """
+        while True:
+            if path in self.boundaries:
+                return path
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+    def get(self, boundary: str, acl: str, mode: str) -> list:
+        """
+        Return the trace from `/` down to a boundary, or None if not evaluated yet.
+
+        Returns:
+            list: Copies of the trace entries, ordered from `/` to the boundary.
+        """
+        trace = self._verdicts.get((boundary, str(acl), mode))
+        if trace is None:
+            return None
+        return [dict(entry) for entry in trace]
+
+    def put(self, boundary: str, acl: str, mode: str, trace: list) -> None:
+        """
+        Store the trace from `/` down to a boundary.
+        """
+        self._verdicts[(boundary, str(acl), mode)] = [
+            {
+                "path": entry["path"],
+                "applicable_acl": entry["applicable_acl"],
+                "has_permission": entry["has_permission"],
+            }
+            for entry in trace
+        ]
+
+    def precompute(
+        self,
+        acls: list,
+        mode: str = "at_least",
+        navigation: bool = True,
+        **kwargs,
+    ) -> None:
+        """
+        Evaluate all boundaries for the given principals up front.
+
+        Args:
+            acls (list): ACL strings (e.g., ["user:user1:r-x"]) or `Query` objects.
+            mode (str): The permission mode of the trace checks.
+            navigation (bool): Also evaluate the `--x` navigation check used by
+                `FACLHas`.
+            **kwargs: Passed to `FACLTrace`, e.g. `source`, `numeric` or `groups`.
+        """
+        numeric = kwargs.get("numeric", False)
+        queries = [compile_query(acl, mode, numeric=numeric) for acl in acls]
+        if navigation:
+            queries += [query.navigation() for query in queries]
+        for boundary in sorted(self.boundaries):
+            for query in queries:
+                if self.get(boundary, query, query.mode) is None:
+                    trace = FACLTrace(path=boundary, v=self.v, **kwargs)._trace(
+                        query, query.mode
+                    )
+                    self.put(boundary, query, query.mode, trace)
+        self.logger.debug(
+            "Precomputed %d trusted verdicts for %d boundaries",
+            len(self._verdicts),
+            len(self.boundaries),
+        )
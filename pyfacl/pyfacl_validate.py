@@ -0,0 +1,248 @@
+import json
+import os
+import pwd
+import random
+import time
+
+from pyfacl import FACL, FACLHas, FACLTrace, logger, metrics
+from pyfacl.pyfacl_groups import GroupResolver
+from pyfacl.pyfacl_path import PathResolver
+from pyfacl.pyfacl_query import compile_query
+from pyfacl.pyfacl_source import GetfaclSource, _group_name
+
+ENGINES = ("facl", "trace", "has")
+ACCESS_FLAGS = {"r": os.R_OK, "w": os.W_OK, "x": os.X_OK}
+
+
+class FACLValidator:
+    """
+    Cross-check pyfacl verdicts against the kernel for a sample of paths.
+
+    For every sampled path, the verdict of `FACL`, `FACLTrace` or `FACLHas` for
+    the user running the process is compared with `faccessat(AT_EACCESS)`
+    (`os.access` with `effective_ids=True`), or plain `os.access` where effective
+    ids are not supported. Queries use the effective uid and the supplementary
+    groups of the process, like the kernel does, not the group database.
+
+    The kernel resolves the whole path, so "has" (--x on every parent and the
+    permission on the path) is the engine with the same semantics. "facl"
+    ignores the parents and "trace" requires the permission at every level, so
+    they differ from the kernel by design on some trees. None of the engines
+    apply the mask, and root bypasses most permission checks, so run validations
+    as an unprivileged user.
+
+    Sampling is random with probability `rate`. With `max_overhead`, samples are
+    skipped while the time spent validating exceeds that fraction of the time
+    since the validator was created, so it can stay enabled in production runs.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.01,
+        max_overhead: float = None,
+        engine: str = "has",
+        permissions: tuple = ("r--", "-w-", "--x"),
+        max_discrepancies: int = 1000,
+        seed: int = None,
+        v: int = 0,
+        numeric: bool = False,
+        groups=None,
+        source=None,
+        resolver=None,
+    ) -> None:
+        """
+        Args:
+            rate (float): Probability of validating an observed path.
+            max_overhead (float, optional): Maximum fraction of wall time spent
+                validating, e.g. 0.05 for 5%. Unlimited by default.
+            engine (str): The checks to validate: "facl", "trace" or "has".
+            permissions (tuple): Permissions checked per sampled path, e.g.
+                ("r-x",). Every one is compared with the kernel separately.
+            max_discrepancies (int): Maximum number of discrepancies kept in
+                `discrepancies`. All of them are counted and logged.
+            seed (int, optional): Seed of the sampling, for reproducible runs.
+            numeric (bool): Match numeric uids/gids instead of names.
+            groups (GroupResolver, optional): Shared resolver for group memberships
+                of ACL entries.
+            source (ACLSource, optional): Backend used to read FACLs. Defaults to
+                running `getfacl`.
+            resolver (PathResolver, optional): Shared resolver for symlinks.
+        """
+        if engine not in ENGINES:
+            raise ValueError(
+                f"Invalid engine '{engine}'. Choose from {', '.join(ENGINES)}."
+            )
+        self.logger = logger.logger_basic(__name__, v)
+        self.v = v
+        self.rate = rate
+        self.max_overhead = max_overhead
+        self.engine = engine
+        self.max_discrepancies = max_discrepancies
+        self.numeric = numeric
+        if groups is None:
+            groups = GroupResolver(v=v, numeric=numeric)
+        self.groups = groups
+        if source is None:
+            source = GetfaclSource(numeric=numeric, v=v)
+        self.source = source
+        if resolver is None:
+            resolver = PathResolver(v=v)
+        self.resolver = resolver
+        self._random = random.Random(seed)
+
+        # the kernel checks the effective ids and groups of the process
+        uid = os.geteuid()
+        gids = dict.fromkeys([os.getegid(), *os.getgroups()])
+        if numeric:
+            self.user = str(uid)
+            process_groups = [str(gid) for gid in gids]
+        else:
+            try:
+                self.user = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self.user = str(uid)
+            process_groups = [_group_name(gid) for gid in gids]
+        self.queries = [
+            compile_query(
+                f"user:{self.user}:{permission}",
+                groups=process_groups,
+                numeric=numeric,
+            )
+            for permission in permissions
+        ]
+        self.effective_ids = os.access in os.supports_effective_ids
+        if not self.effective_ids and (os.getuid(), os.getgid()) != (
+            uid,
+            os.getegid(),
+        ):
+            raise ValueError(
+                "Cannot validate with different real and effective ids: "
+                "os.access does not support effective_ids on this platform."
+            )
+        if uid == 0:
+            self.logger.warning(
+                "Validating as root: the kernel grants most access regardless of "
+                "ACLs, expect discrepancies."
+            )
+
+        self.discrepancies = []
+        self.stats = {
+            "observed": 0,
+            "sampled": 0,
+            "checks": 0,
+            "discrepancies": 0,
+            "skipped_overhead": 0,
+            "seconds": 0.0,
+        }
+        self._start = time.monotonic()
+
+    def _kernel(self, path: str, permissions: str) -> bool:
+        """
+        Return the kernel verdict for the process credentials.
+        """
+        flags = os.F_OK
+        for c in permissions:
+            flags |= ACCESS_FLAGS.get(c, 0)
+        if self.effective_ids:
+            return os.access(path, flags, effective_ids=True)
+        return os.access(path, flags)
+
+    def _check(self, path: str, query, lazy: bool = True):
+        """
+        Return the result of the validated engine.
+        """
+        kwargs = dict(
+            v=self.v, numeric=self.numeric, groups=self.groups, source=self.source
+        )
+        if self.engine == "facl":
+            return FACL(path=self.resolver.resolve(path), **kwargs).check(query)
+        cls = FACLTrace if self.engine == "trace" else FACLHas
+        return cls(path=path, resolver=self.resolver, **kwargs).check(query, lazy=lazy)
+
+    def validate(self, path: str) -> list:
+        """
+        Compare the verdicts of one path with the kernel, without sampling.
+
+        Returns:
+            list: The discrepancies found, see `discrepancies`.
+        """
+        start = time.monotonic()
+        found = []
+        for query in self.queries:
+            kernel = self._kernel(path, query.permissions)
+            result = self._check(path, query)
+            self.stats["checks"] += 1
+            if result.granted == kernel:
+                metrics.registry.inc(
+                    "pyfacl_validations", engine=self.engine, result="match"
+                )
+                continue
+
+            metrics.registry.inc(
+                "pyfacl_validations", engine=self.engine, result="discrepancy"
+            )
+            # explain with the full chain, not just the levels up to a denial
+            result = self._check(path, query, lazy=False)
+            discrepancy = {
+                "path": path,
+                "acl": query.acl,
+                "engine": self.engine,
+                "pyfacl": result.granted,
+                "kernel": kernel,
+                "effective_ids": self.effective_ids,
+                "groups": list(query.groups),
+                "result": result.to_dict(),
+                "explanation": result.to_text(),
+            }
+            found.append(discrepancy)
+            self.stats["discrepancies"] += 1
+            if len(self.discrepancies) < self.max_discrepancies:
+                self.discrepancies.append(discrepancy)
+            self.logger.warning(
+                "Verdict differs from the kernel for '%s' on %s: pyfacl %s, "
+                "kernel %s\n%s",
+                query.acl,
+                path,
+                "granted" if result.granted else "denied",
+                "granted" if kernel else "denied",
+                discrepancy["explanation"],
+            )
+        self.stats["seconds"] += time.monotonic() - start
+        return found
+
+    def observe(self, path: str) -> list:
+        """
+        Validate a path of a batch run if it is sampled.
+
+        Returns:
+            list: The discrepancies found, or None if the path was not sampled.
+        """
+        self.stats["observed"] += 1
+        if self.rate <= 0 or self._random.random() >= self.rate:
+            return None
+        if self.max_overhead is not None:
+            elapsed = time.monotonic() - self._start
+            if self.stats["seconds"] > self.max_overhead * elapsed:
+                self.stats["skipped_overhead"] += 1
+                return None
+        self.stats["sampled"] += 1
+        return self.validate(path)
+
+    def write(self, path: str) -> None:
+        """
+        Write the kept discrepancies to a file, one JSON record per line.
+        """
+        with open(path, "w") as f:
+            for discrepancy in self.discrepancies:
+                f.write(json.dumps(discrepancy) + "\n")
+
+    def summary(self) -> str:
+        """
+        Return a one-line summary of the validation.
+        """
+        stats = self.stats
+        return (
+            f"Validated {stats['sampled']}/{stats['observed']} paths against the "
+            f"kernel as '{self.user}' ({self.engine}): {stats['discrepancies']} "
+            f"discrepancies in {stats['checks']} checks, {stats['seconds']:.3f}s"
+        )
@@ -21,6 +21,49 @@ def generate_facl_str(path, owner, group, custom_acls=[]):
     return "\n".join(facl_lines) + "\n"
 
 
+class CountingDict(dict):
+    """Dictionary that records which keys were looked up."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = []
+
+    def __getitem__(self, key):
+        self.lookups.append(key)
+        return super().__getitem__(key)
+
+
+class TreeSource:
+    """
+    Grant user1 r-x everywhere, except on paths named `private*`.
+    """
+
+    def __init__(self, distinct: bool = False):
+        self.distinct = distinct
+
+    def get(self, path):
+        name = os.path.basename(path)
+        if name.startswith("private"):
+            return generate_facl_str(path, "root", "root", ["user:user1:---"])
+        custom = ["user:user1:r-x"]
+        if self.distinct:
+            custom.append(f"user:{name}:r--")
+        return generate_facl_str(path, "root", "root", custom)
+
+    def get_many(self, paths):
+        return {path: self.get(path) for path in paths}
+
+
+def make_tree(root):
+    """
+    Create a tree of 10 paths below `root`, including `root` itself.
+    """
+    for path in ["a/private", "a/b", "c"]:
+        os.makedirs(os.path.join(root, path))
+    for path in ["a/f1", "a/private/f2", "a/b/f3", "c/f4", "f5"]:
+        open(os.path.join(root, path), "w").close()
+
+
 @pytest.fixture
 def facl_fixture():
     # rewrite using generate_facl_str
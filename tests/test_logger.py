@@ -0,0 +1,40 @@
+import logging
+
+from pyfacl import logger
+
+
+def test_logger_cached():
+    assert logger.logger_basic("pyfacl.test", 0) is logger.logger_basic(
+        "pyfacl.test", 0
+    )
+    assert logger.logger_print(1) is logger.logger_print(1)
+
+
+def test_logger_verbosity_per_instance():
+    quiet = logger.logger_print(0)
+    verbose = logger.logger_print(1)
+
+    assert quiet.logger is verbose.logger
+    assert not quiet.isEnabledFor(logging.INFO)
+    assert verbose.isEnabledFor(logging.INFO)
+
+    # creating a quiet logger does not silence an existing verbose one
+    logger.logger_print(0)
+    assert verbose.isEnabledFor(logging.INFO)
+
+
+def test_logger_lazy_formatting(caplog):
+    class Expensive:
+        calls = 0
+
+        def __str__(self):
+            Expensive.calls += 1
+            return "expensive"
+
+    log = logger.logger_basic("pyfacl.test_lazy", 0)
+    with caplog.at_level(logging.DEBUG, logger="pyfacl.test_lazy"):
+        log.debug("value: %s", Expensive())
+        assert Expensive.calls == 0
+        log.warning("value: %s", Expensive())
+        assert Expensive.calls > 0
+    assert "value: expensive" in caplog.text
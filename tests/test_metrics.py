@@ -0,0 +1,98 @@
+import pytest
+
+import pyfacl
+from pyfacl import FACL, MetricsRegistry, ScheduledSource, SnapshotSource, metrics
+from pyfacl.pyfacl_capability import Mount
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.enable(buckets=(0.001, 1.0))
+    yield registry
+    metrics.disable()
+
+
+def test_null_registry_default():
+    assert not metrics.registry.enabled
+    with metrics.registry.timed("pyfacl_check_duration_seconds"):
+        metrics.registry.inc("pyfacl_checks")
+    # callers can use the registry API without checking if metrics are enabled
+    metrics.registry.add_collector(lambda: [("pyfacl_cache_size", {}, 1)])
+    assert metrics.registry.collect() == {
+        "counters": {},
+        "gauges": {},
+        "histograms": {},
+    }
+    assert metrics.registry.render() == "# EOF\n"
+
+
+def test_render_openmetrics():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("pyfacl_subprocesses", command="getfacl")
+    registry.inc("pyfacl_subprocesses", 2, command="getfacl")
+    registry.observe("pyfacl_check_duration_seconds", 0.5, api="facl")
+    registry.add_collector(lambda: [("pyfacl_cache_size", {"cache": "acl"}, 7)])
+    text = registry.render()
+    assert 'pyfacl_subprocesses_total{command="getfacl"} 3' in text
+    assert "# TYPE pyfacl_check_duration_seconds histogram" in text
+    assert 'pyfacl_check_duration_seconds_bucket{api="facl",le="0.1"} 0' in text
+    assert 'pyfacl_check_duration_seconds_bucket{api="facl",le="1.0"} 1' in text
+    assert 'pyfacl_check_duration_seconds_bucket{api="facl",le="+Inf"} 1' in text
+    assert 'pyfacl_check_duration_seconds_sum{api="facl"} 0.5' in text
+    assert 'pyfacl_cache_size{cache="acl"} 7' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_instrumented_checks(registry, acls_fixture, facl_fixture):
+    FACL.from_facl(facl_fixture).has_permission("user:user1:r--")
+    source = pyfacl.CachingSource(SnapshotSource(acls_fixture))
+    for _ in range(2):
+        pyfacl.has_permission(
+            "/home/user1/project", "user:user1:rwx", trace=True, source=source
+        )
+    pyfacl.has_permission(
+        "/home/user1/project", "user:user1:rwx", can_execute=True, source=source
+    )
+
+    data = registry.collect()
+    counters = data["counters"]
+    assert counters[("pyfacl_checks", (("api", "facl"), ("granted", "true")))] == 1
+    assert counters[("pyfacl_checks", (("api", "trace"), ("granted", "true")))] == 2
+    assert counters[("pyfacl_checks", (("api", "has"), ("granted", "true")))] == 1
+    hits = counters[("pyfacl_cache_requests", (("cache", "acl"), ("result", "hit")))]
+    misses = counters[("pyfacl_cache_requests", (("cache", "acl"), ("result", "miss")))]
+    assert misses == 4 and hits >= 4
+    fetch = data["histograms"][
+        ("pyfacl_acl_fetch_duration_seconds", (("source", "CachingSource"),))
+    ]
+    assert fetch["count"] >= 3
+    top_level = data["histograms"][
+        ("pyfacl_check_duration_seconds", (("api", "has_permission"),))
+    ]
+    assert top_level["count"] == 3
+
+
+@pytest.mark.parametrize("flags", [{}, {"trace": True}, {"can_execute": True}], ids=str)
+def test_checks_recorded_once(registry, acls_fixture, flags):
+    pyfacl.has_permission(
+        "/home/user1/project", "user:user1:rwx", _pytest_acls=acls_fixture, **flags
+    )
+    checks = {
+        labels: value
+        for (name, labels), value in registry.collect()["counters"].items()
+        if name == "pyfacl_checks"
+    }
+    # levels evaluated inside a trace are not checks of their own
+    api = "trace" if flags.get("trace") else "has" if flags else "facl"
+    assert checks == {(("api", api), ("granted", "true")): 1}
+
+
+def test_scheduler_collector(registry, acls_fixture):
+    source = ScheduledSource(
+        SnapshotSource(acls_fixture), _mounts=[Mount("/", "ext4", "/dev/sda1")]
+    )
+    registry.add_collector(source.scheduler.samples)
+    source.get_many(list(acls_fixture))
+    text = registry.render()
+    assert "pyfacl_scheduler_paths 4" in text
+    assert 'pyfacl_scheduler_mount_limit{mount="/"} 4' in text
@@ -1,6 +1,19 @@
+import os
+import struct
+
 import pytest
 
-from pyfacl import FACL
+from pyfacl import (
+    FACL,
+    CachingSource,
+    FACLHas,
+    FACLTrace,
+    ScheduledSource,
+    SnapshotSource,
+    XattrSource,
+)
+from pyfacl.pyfacl_capability import Mount
+from pyfacl.pyfacl_source import XATTR_ACCESS, stat_minimal
 
 
 @pytest.fixture
@@ -158,3 +171,172 @@ def test_has_permission(facl_fixture):
     assert facl.has_permission("group:unknown_group:r-x", mode="at_most")
     assert facl.has_permission("group:unknown_group:rwx", mode="at_most")
     assert not facl.has_permission("group:unknown_group:rwx", mode="at_least")
+
+
+def test_has_permissions(facl_fixture):
+    facl = FACL(v=1, _facl=facl_fixture)
+
+    facl._parse_metadata()
+    facl._parse_acls()
+
+    acls = [
+        "user:user1:rwx",
+        "group:group1:r-x",
+        "other::rwx",
+        "user:unknown_user:r-x",
+    ]
+    assert facl.has_permissions(acls, mode="at_least") == [True, True, False, True]
+    assert facl.has_permissions(acls, mode="at_least") == [
+        facl.has_permission(acl, mode="at_least") for acl in acls
+    ]
+
+
+def test_has_permission_numeric():
+    facl_str = """
+# file: testfile
+# owner: 1000
+# group: 1000
+user::rwx
+user:2000:rw-
+group::r-x
+group:0:r--
+mask::rwx
+other::---
+"""
+    facl = FACL(v=1, _facl=facl_str, numeric=True)
+    facl.is_init = True
+    facl._parse_metadata()
+    facl._parse_acls()
+
+    # owner and named user by uid
+    assert facl.has_permission("user:1000:rwx", mode="exact")
+    assert facl.has_permission("user:2000:rw-", mode="exact")
+
+    # uid 0 is in gid 0, names are converted to ids
+    assert facl.has_permission("user:0:r--", mode="exact")
+    assert facl.has_permission("user:root:r--", mode="exact")
+    assert facl.has_permission("group:root:r--", mode="exact")
+    assert facl.has_permission("group:1000:r-x", mode="exact")
+
+    # unknown ids fall back to other
+    assert facl.has_permission("group:4242:---", mode="exact")
+
+
+def test_scan_directory(tmp_path):
+    modes = [0o644, 0o600, 0o755, 0o640, 0o644, 0o644]
+    for i, mode in enumerate(modes):
+        path = tmp_path / f"f{i}"
+        path.touch()
+        path.chmod(mode)
+    (tmp_path / "d").mkdir()
+
+    class CountingFACL(FACL):
+        parsed = 0
+
+        @classmethod
+        def from_facl(cls, facl, path=None, **kwargs):
+            cls.parsed += 1
+            return super().from_facl(facl, path=path, **kwargs)
+
+        @classmethod
+        def from_stat(cls, path, st, **kwargs):
+            cls.parsed += 1
+            return super().from_stat(path, st, **kwargs)
+
+    results = dict(CountingFACL.scan_directory(str(tmp_path), "other::r--"))
+    source = XattrSource()
+    assert results == {
+        str(path): FACL(path=str(path), source=source).has_permission("other::r--")
+        for path in tmp_path.iterdir()
+    }
+    assert results[str(tmp_path / "f0")] and not results[str(tmp_path / "f1")]
+    # one evaluation per distinct file type, mode, owner and group: d and f2 are
+    # both 0755 but of different types
+    assert CountingFACL.parsed == 5
+
+
+def _set_access_xattr(path, entries):
+    """
+    Write an extended access ACL of `(tag, permission bits, id)` entries.
+    """
+    data = struct.pack("<I", 2) + b"".join(
+        struct.pack("<HHI", tag, perm, qualifier) for tag, perm, qualifier in entries
+    )
+    try:
+        os.setxattr(path, XATTR_ACCESS, data)
+    except OSError as e:
+        pytest.skip(f"Cannot set ACL xattr: {e}")
+
+
+@pytest.mark.parametrize("numeric", [False, True])
+def test_stat_fast_path(tmp_path, numeric):
+    paths = []
+    for name, mode in [("f1", 0o640), ("f2", 0o4755), ("d1", 0o3775), ("d2", 0o1700)]:
+        path = tmp_path / name
+        if name.startswith("d"):
+            path.mkdir()
+        else:
+            path.touch()
+        path.chmod(mode)
+        paths.append(str(path))
+
+    source = XattrSource(numeric=numeric)
+    for path in paths:
+        assert stat_minimal(path) is not None
+        fast = FACL(path=path, source=source, numeric=numeric)
+        text = FACL.from_facl(source.get(path), path=path, numeric=numeric)
+        assert fast.facl == ""
+        for attr in ["path", "owner", "group", "flags", "acls"]:
+            assert getattr(fast, attr) == getattr(text, attr)
+
+    # trace entries are identical to evaluating the rendered text
+    snapshot = SnapshotSource(
+        source.get_many(
+            FACLTrace(path=paths[0], source=source).resolver.levels(paths[0])
+        )
+    )
+    for acl in ["other::r--", "user::rw-", "group::r--"]:
+        for cls in [FACLTrace, FACLHas]:
+            fast = cls(path=paths[0], source=source, numeric=numeric).check(acl)
+            text = cls(path=paths[0], source=snapshot, numeric=numeric).check(acl)
+            assert fast.granted == text.granted
+            assert fast.chain == text.chain
+
+
+def test_stat_fast_path_extended_acl(tmp_path):
+    path = str(tmp_path / "f")
+    open(path, "w").close()
+    os.chmod(path, 0o640)
+    # user::rw-, user:1234:r--, group::r--, mask::r--, other::---
+    _set_access_xattr(
+        path,
+        [(0x01, 6, 2**32 - 1), (0x02, 4, 1234), (0x04, 4, 2**32 - 1)]
+        + [(0x10, 4, 2**32 - 1), (0x20, 0, 2**32 - 1)],
+    )
+    assert stat_minimal(path) is None
+    facl = FACL(path=path, source=XattrSource(numeric=True), numeric=True)
+    assert "user:1234:r--" in facl.facl
+    assert facl.has_permission("user:1234:r--")
+    assert not facl.has_permission("other::r--")
+
+
+def test_stat_fast_path_wrapped_source(tmp_path):
+    path = str(tmp_path / "f")
+    open(path, "w").close()
+    os.chmod(path, 0o640)
+
+    class CountingSource(XattrSource):
+        fetched = 0
+
+        def get(self, path):
+            CountingSource.fetched += 1
+            return super().get(path)
+
+    # wrappers such as a cache or a scheduler keep the fast path
+    for wrapped in [
+        CachingSource(CountingSource()),
+        ScheduledSource(CountingSource(), _mounts=[Mount("/", "ext4", "/dev/sda1")]),
+    ]:
+        assert FACL(path=path, source=wrapped).facl == ""
+        assert FACL.from_source([path], wrapped)[path].facl == ""
+    assert CountingSource.fetched == 0
@@ -0,0 +1,58 @@
+import os
+
+import pyfacl
+from pyfacl import FACLAudit, SnapshotSource
+
+PATHS = ["/home/user1/project", "/home/user1", "/home", "/"]
+
+
+def test_facl_audit_shards():
+    facl_audit = FACLAudit("user:user1:r-x", chunk_size=2)
+    shards = facl_audit._shards(
+        ["/data/b/1", "/data/a/2", "/data/a/1", "/data/a/3", "/data/c"]
+    )
+    assert shards == [
+        ["/data/a/1", "/data/a/2"],
+        ["/data/a/3"],
+        ["/data/b/1"],
+        ["/data/c"],
+    ]
+
+
+def test_facl_audit_run(acls_fixture):
+    for flags in [{}, {"trace": True}, {"can_execute": True}]:
+        for jobs in [1, 2]:
+            facl_audit = FACLAudit("user:root:rwx", jobs=jobs, chunk_size=1, **flags)
+            results = dict(facl_audit.run(PATHS, _pytest_acls=acls_fixture))
+            assert results == {
+                path: pyfacl.has_permission(
+                    path, "user:root:rwx", _pytest_acls=acls_fixture, **flags
+                )
+                for path in PATHS
+            }
+
+
+class RecordingSource(SnapshotSource):
+    """
+    Record the pid of every process the source is copied into.
+    """
+
+    def __init__(self, acls, log):
+        super().__init__(acls)
+        self.log = log
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        with open(self.log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+
+
+def test_facl_audit_source_per_worker(acls_fixture, tmp_path):
+    log = tmp_path / "copies"
+    source = RecordingSource(acls_fixture, str(log))
+    audit = FACLAudit("user:root:rwx", jobs=2, chunk_size=1, source=source)
+    assert len(dict(audit.run(PATHS * 3))) == len(PATHS)
+    # copied at most once into every worker (forked workers share it), not once
+    # per shard
+    pids = log.read_text().split() if log.exists() else []
+    assert len(pids) == len(set(pids)) <= 2
@@ -0,0 +1,59 @@
+import pytest
+
+from pyfacl import AutoSource, pyfacl_capability
+from pyfacl.pyfacl_capability import backend_for, mount_for, parse_mountinfo
+
+MOUNTINFO = """\
+28 1 254:0 / / rw,relatime - ext4 /dev/vda rw
+40 28 0:50 / /data1 rw,relatime shared:1 - gpfs gpfs0 rw
+41 28 0:51 / /scratch\\040space rw - lustre 10.0.0.1@tcp:/scratch rw
+42 28 0:52 / /home rw - nfs4 server:/home rw,vers=4.2
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_xattr_support(monkeypatch):
+    monkeypatch.setattr(pyfacl_capability, "_xattr_support", {})
+
+
+def test_parse_mountinfo():
+    mounts = parse_mountinfo(MOUNTINFO)
+    assert [(m.mount_point, m.fstype) for m in mounts] == [
+        ("/", "ext4"),
+        ("/data1", "gpfs"),
+        ("/scratch space", "lustre"),
+        ("/home", "nfs4"),
+    ]
+
+
+def test_mount_for():
+    mounts = parse_mountinfo(MOUNTINFO)
+    assert mount_for("/data1/collab002/x", mounts).fstype == "gpfs"
+    assert mount_for("/data10", mounts).fstype == "ext4"
+    assert mount_for("/scratch space/a", mounts).fstype == "lustre"
+    assert mount_for("/", mounts).fstype == "ext4"
+
+
+def test_backend_for(monkeypatch, tmp_path):
+    mounts = parse_mountinfo(MOUNTINFO)
+    monkeypatch.setattr(pyfacl_capability, "getfacl_available", lambda: True)
+    assert backend_for("/data1/collab002", mounts) == "getfacl-batch"
+    assert backend_for("/home/user1", mounts) == "getfacl-batch"
+
+    # local filesystem: native xattr if supported, probed once per mount
+    monkeypatch.setitem(pyfacl_capability._xattr_support, "/", True)
+    assert backend_for(str(tmp_path), mounts) == "xattr"
+    monkeypatch.setitem(pyfacl_capability._xattr_support, "/", False)
+    assert backend_for(str(tmp_path), mounts) == "getfacl-batch"
+
+    monkeypatch.setattr(pyfacl_capability, "getfacl_available", lambda: False)
+    assert backend_for(str(tmp_path), mounts) is None
+
+
+def test_auto_source(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("")
+    if backend_for(str(path)) != "xattr":
+        pytest.skip("POSIX ACL xattrs not supported on the test filesystem")
+    facls = AutoSource().get_many([str(path)])
+    assert facls[str(path)] == AutoSource().sources["xattr"].get(str(path))
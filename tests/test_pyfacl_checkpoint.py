@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+from conftest import TreeSource, make_tree
+
+from pyfacl import FACLCheckpoint
+
+
+class CrashingSource(TreeSource):
+    """
+    Fail after a number of batch fetches, like a node reboot, and log all fetches.
+    """
+
+    def __init__(self, crash_after: int = None):
+        super().__init__()
+        self.crash_after = crash_after
+        self.fetched = []
+
+    def get_many(self, paths):
+        if self.crash_after is not None:
+            if self.crash_after == 0:
+                raise KeyboardInterrupt
+            self.crash_after -= 1
+        self.fetched.extend(paths)
+        return super().get_many(paths)
+
+
+@pytest.mark.parametrize("flags", [{}, {"can_execute": True}], ids=str)
+def test_checkpoint_resume(tmp_path, flags):
+    root = str(tmp_path / "tree")
+    make_tree(root)
+    output = str(tmp_path / "out.tsv")
+    checkpoint = str(tmp_path / "audit.json")
+
+    # reference run without interruption
+    FACLCheckpoint(
+        checkpoint, "user:user1:r-x", source=CrashingSource(), batch_size=1, **flags
+    ).run(root, output)
+    with open(output) as f:
+        expected = f.read()
+    os.remove(checkpoint)
+
+    source = CrashingSource(crash_after=3)
+    audit = FACLCheckpoint(
+        checkpoint,
+        "user:user1:r-x",
+        source=source,
+        batch_size=1,
+        interval=0,
+        **flags,
+    )
+    with pytest.raises(KeyboardInterrupt):
+        audit.run(root, output)
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert not state["complete"] and state["frontier"]
+    written = {line.split("\t")[1] for line in open(output).read().splitlines()}
+
+    resumed = CrashingSource()
+    stats = FACLCheckpoint(
+        checkpoint, "user:user1:r-x", source=resumed, batch_size=1, **flags
+    ).run(root, output, resume=True)
+    with open(output) as f:
+        assert f.read() == expected
+    assert stats["total"] == 10
+    # completed entries are not fetched again
+    assert not written & set(resumed.fetched)
+
+    # resuming a complete audit does nothing
+    again = CrashingSource(crash_after=0)
+    FACLCheckpoint(checkpoint, "user:user1:r-x", source=again, **flags).run(
+        root, output, resume=True
+    )
+
+
+def test_checkpoint_other_audit(tmp_path):
+    root = str(tmp_path / "tree")
+    make_tree(root)
+    checkpoint = str(tmp_path / "audit.json")
+    output = str(tmp_path / "out.tsv")
+    FACLCheckpoint(checkpoint, "user:user1:r-x", source=TreeSource()).run(root, output)
+    with pytest.raises(ValueError):
+        FACLCheckpoint(checkpoint, "user:user2:r-x", source=TreeSource()).run(
+            root, output, resume=True
+        )
+
+
+def test_checkpoint_resume_after_root(tmp_path):
+    root = str(tmp_path / "tree")
+    make_tree(root)
+    output = str(tmp_path / "out.tsv")
+    checkpoint = str(tmp_path / "audit.json")
+
+    # crash on the first batch, right after the root line was checkpointed
+    audit = FACLCheckpoint(
+        checkpoint,
+        "user:user1:r-x",
+        source=CrashingSource(crash_after=0),
+        batch_size=1,
+        interval=0,
+    )
+    with pytest.raises(KeyboardInterrupt):
+        audit.run(root, output)
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert not state["complete"]
+    assert [frame["path"] for frame in state["frontier"]] == [root]
+    assert len(open(output).read().splitlines()) == 1
+
+    stats = FACLCheckpoint(
+        checkpoint, "user:user1:r-x", source=CrashingSource(), batch_size=1
+    ).run(root, output, resume=True)
+    assert stats["total"] == 10
+    assert len(open(output).read().splitlines()) == 10
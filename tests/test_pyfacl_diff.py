@@ -0,0 +1,85 @@
+import json
+
+from conftest import generate_facl_str
+from typer.testing import CliRunner
+
+from pyfacl import FACLDiff, IndexSource
+from pyfacl.cli import app
+from pyfacl.pyfacl_diff import facl_hash
+from pyfacl.pyfacl_source import tree_key
+
+
+def test_tree_key():
+    paths = ["/a/c", "/a b", "/", "/a", "/a/c/d"]
+    assert sorted(paths, key=tree_key) == ["/", "/a", "/a/c", "/a/c/d", "/a b"]
+
+
+def test_facl_hash():
+    a = generate_facl_str("/a", "user1", "group1", ["user:user2:r-x"])
+    b = generate_facl_str("/b", "user1", "group1", ["user:user2:r-x"])
+    assert facl_hash(a) == facl_hash(b)
+    assert facl_hash(a) != facl_hash(a.replace("user2:r-x", "user2:rwx"))
+
+
+def test_diff(acls_fixture):
+    new = dict(acls_fixture)
+    new["/home"] = generate_facl_str("/home", "root", "group1", ["user:user1:rw-"])
+    new["/home/user1/project"] = generate_facl_str(
+        "/home/user1/project", "user1", "group1", ["user:root:rwx"]
+    )
+    new["/home/user2"] = generate_facl_str("/home/user2", "user2", "group1")
+
+    records = {r["path"]: r for r in FACLDiff().diff(acls_fixture, new)}
+    assert set(records) == {"/home", "/home/user1/project", "/home/user2"}
+
+    home = records["/home"]
+    assert home["status"] == "changed"
+    assert home["changes"] == [{"principal": "user:user1", "old": "rwx", "new": "rw-"}]
+    # user1 lost traversal for everything below /home
+    assert home["descendants"] == 3
+
+    project = records["/home/user1/project"]
+    assert {c["principal"]: c["new"] for c in project["changes"]} == {
+        "user:root": "rwx",
+        "group:group2": "--x",
+    }
+    assert project["descendants"] == 0
+    assert records["/home/user2"]["status"] == "added"
+
+
+def test_diff_index_and_cli(tmp_path, acls_fixture):
+    new = dict(acls_fixture)
+    del new["/home/user1/project"]
+    IndexSource(str(tmp_path / "old.db")).put_many(acls_fixture)
+    (tmp_path / "new.txt").write_text("\n".join(new.values()))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["diff", str(tmp_path / "old.db"), str(tmp_path / "new.txt"), "--json"]
+    )
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [(r["path"], r["status"]) for r in records] == [
+        ("/home/user1/project", "removed")
+    ]
+
+
+def test_diff_mask():
+    custom = ["user:user2:rwx", "group:group2:r-x"]
+    old = {
+        "/data": generate_facl_str("/data", "user1", "group1", custom + ["mask::rwx"])
+    }
+    new = {
+        "/data": generate_facl_str("/data", "user1", "group1", custom + ["mask::---"])
+    }
+
+    (record,) = FACLDiff().diff(old, new)
+    # the mask limits named users and all groups, not the owner or other
+    assert {c["principal"]: (c["old"], c["new"]) for c in record["changes"]} == {
+        "user:user2": ("rwx", "---"),
+        "group:group1": ("r-x", "---"),
+        "group:group2": ("r-x", "---"),
+    }
+    assert FACLDiff().effective_permissions(
+        new["/data"], ["user:user1", "user:user2", "other:"]
+    ) == {"user:user1": "rwx", "user:user2": "---", "other:": "--x"}
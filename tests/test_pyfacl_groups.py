@@ -0,0 +1,62 @@
+import pyfacl
+from pyfacl import FACLAudit, FACLMatrix, GroupSnapshot
+
+GROUP = """\
+root:x:0:
+users:x:100:
+lab:x:2000:alice,bob
+collab:x:2001:bob,carol
+"""
+
+PASSWD = """\
+root:x:0:0:root:/root:/bin/bash
+alice:x:1000:100::/home/alice:/bin/bash
+bob:x:1001:2001::/home/bob:/bin/bash
+"""
+
+
+def test_group_snapshot():
+    snapshot = GroupSnapshot(GROUP, PASSWD)
+    assert snapshot.groups("alice") == ["users", "lab"]
+    assert snapshot.groups("bob") == ["collab", "lab"]
+    assert snapshot.groups("carol") == ["collab"]
+    assert snapshot.groups("nobody") == []
+    assert snapshot.members("lab") == ["alice", "bob"]
+    assert snapshot.members("users") == ["alice"]
+    assert snapshot.members_many(["collab"]) == {"collab": ["bob", "carol"]}
+    assert snapshot.groups_many(["root"]) == {"root": ["root"]}
+
+
+def test_group_snapshot_numeric(tmp_path):
+    (tmp_path / "group").write_text(GROUP)
+    (tmp_path / "passwd").write_text(PASSWD)
+    snapshot = GroupSnapshot.from_files(
+        tmp_path / "group", tmp_path / "passwd", numeric=True
+    )
+    assert snapshot.groups("1000") == ["100", "2000"]
+    # carol has no uid in passwd
+    assert snapshot.members("2001") == ["1001"]
+
+
+def test_group_snapshot_checks(acls_fixture):
+    # alice is only granted through group2, without any local lookup
+    snapshot = GroupSnapshot("group2:x:3000:alice\n")
+    path = "/home/user1/project"
+    assert pyfacl.has_permission(
+        path, "user:alice:r-x", groups=snapshot, _pytest_acls=acls_fixture
+    )
+    assert not pyfacl.has_permission(path, "user:alice:r-x", _pytest_acls=acls_fixture)
+    assert pyfacl.has_permissions(
+        path, ["user:alice:r-x"], groups=snapshot, _pytest_acls=acls_fixture
+    ) == {"user:alice:r-x": True}
+
+    audit = FACLAudit("user:alice:r-x", jobs=2, chunk_size=1, groups=snapshot)
+    assert dict(audit.run([path, "/home"], _pytest_acls=acls_fixture)) == {
+        path: True,
+        "/home": False,
+    }
+
+    matrix = FACLMatrix([path], groups=snapshot).matrix(
+        ["user:alice:r-x"], _pytest_acls=acls_fixture
+    )
+    assert matrix == [[True]]
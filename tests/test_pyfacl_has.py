@@ -58,3 +58,12 @@ def test_facl_has(acls_fixture):
         _pytest_acls=acls_fixture,
     )
     assert not has_permission
+
+
+def test_facl_has_lazy(acls_fixture):
+    facl_has = FACLHas(path="/home/user1/project", v=0)
+    for acl in ["user:user1:rwx", "user:root:rwx", "group:group2:r-x", "other::r-x"]:
+        for mode in ["at_least", "exact", "at_most"]:
+            assert facl_has.has_permission(
+                acl, mode, _pytest_acls=acls_fixture, lazy=True
+            ) == facl_has.has_permission(acl, mode, _pytest_acls=acls_fixture)
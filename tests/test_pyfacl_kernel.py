@@ -0,0 +1,269 @@
+import errno
+import itertools
+import os
+import shutil
+import struct
+import tempfile
+
+import pytest
+
+from pyfacl import FACLKernel, SnapshotSource, XattrSource
+
+FACL_STR = """# file: /data/file
+# owner: alice
+# group: staff
+user::r--
+user:bob:rwx
+group::r-x
+group:lab:-w-
+mask::rw-
+other::--x
+"""
+
+
+class StaticGroups:
+    """Group resolver with fixed memberships."""
+
+    def __init__(self, memberships):
+        self.memberships = memberships
+        self.lookups = []
+
+    def groups(self, user):
+        self.lookups.append(user)
+        return self.memberships.get(user, [])
+
+
+@pytest.fixture
+def facl_kernel():
+    groups = StaticGroups({"alice": ["lab"], "carol": ["staff", "lab"], "dave": []})
+    return FACLKernel.from_facl(FACL_STR, path="/data/file", groups=groups)
+
+
+@pytest.mark.parametrize(
+    "acl,mode,expected",
+    [
+        # owner entry is final, even though alice is in 'lab'
+        ("user:alice:r--", "exact", True),
+        ("user:alice:-w-", "at_least", False),
+        # named users are masked
+        ("user:bob:rw-", "exact", True),
+        ("user:bob:--x", "at_least", False),
+        # each group entry is checked on its own for at_least
+        ("user:carol:r--", "at_least", True),
+        ("user:carol:-w-", "at_least", True),
+        ("user:carol:rw-", "at_least", False),
+        ("user:carol:rw-", "at_most", True),
+        # matching groups never fall through to other
+        ("group:lab:--x", "at_least", False),
+        ("user:dave:--x", "exact", True),
+        ("other::--x", "exact", True),
+        # root may read and write, and execute since an x bit is set
+        ("user:root:rwx", "at_least", True),
+    ],
+)
+def test_facl_kernel(facl_kernel, acl, mode, expected):
+    assert facl_kernel.has_permission(acl, mode) == expected
+
+
+def test_facl_kernel_early_exit(facl_kernel):
+    for acl in ["user:root:r--", "user:alice:r--", "user:bob:r--"]:
+        facl_kernel.has_permission(acl, "at_least")
+    assert facl_kernel.groups_resolver.lookups == []
+    facl_kernel.has_permission("user:carol:r--", "at_least")
+    assert facl_kernel.groups_resolver.lookups == ["carol"]
+
+    result = facl_kernel.check("user:carol:-w-", "at_least")
+    assert result.entry["line"] == "group:lab:-w-"
+
+
+def _encode_xattr(entries):
+    data = struct.pack("<I", 2)
+    for tag, perm, qualifier in entries:
+        data += struct.pack("<HHI", tag, perm, qualifier)
+    return data
+
+
+def _access_as(path, uid, gids):
+    """Return os.access results for r, w and x as another user in a child."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - child
+        try:
+            os.setgroups(gids[1:])
+            os.setresgid(gids[0], gids[0], gids[0])
+            os.setresuid(uid, uid, uid)
+            result = "".join(
+                c if os.access(path, flag) else "-"
+                for c, flag in zip("rwx", (os.R_OK, os.W_OK, os.X_OK))
+            )
+            os.write(write_fd, result.encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as f:
+        return f.read()
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root"
+)
+def test_facl_kernel_matches_os_access():
+    """Differential test against the kernel for all combinations of entries."""
+    base = tempfile.mkdtemp(prefix="pyfacl-kernel-")
+    try:
+        _check_against_os_access(base)
+    finally:
+        shutil.rmtree(base)
+
+
+def _check_against_os_access(base):
+    os.chmod(base, 0o711)
+    parent = os.path.dirname(base)
+    while parent != "/":
+        if not os.stat(parent).st_mode & 0o001:
+            pytest.skip(f"{parent} is not searchable by other users")
+        parent = os.path.dirname(parent)
+    path = os.path.join(base, "file")
+    open(path, "w").close()
+    os.chown(path, 50001, 60001)
+
+    uid_owner, uid_named, uid_other = 50001, 50002, 50003
+    gid_owner, gid_named = 60001, 60002
+    users = {
+        "owner": (uid_owner, [gid_named]),
+        "named": (uid_named, [gid_owner]),
+        "owning-group": (uid_other, [gid_owner]),
+        "named-group": (uid_other, [60009, gid_named]),
+        "both-groups": (uid_other, [gid_owner, gid_named]),
+        "other": (uid_other, [60009]),
+    }
+    memberships = {str(uid): [] for uid, _ in users.values()}
+
+    for user_obj, named, group_obj, named_group, mask, other in itertools.product(
+        [0, 5, 6], [0, 3, 7], [1, 4], [2, 5], [3, 7], [0, 1, 6]
+    ):
+        acl = _encode_xattr(
+            [
+                (0x01, user_obj, 0xFFFFFFFF),
+                (0x02, named, uid_named),
+                (0x04, group_obj, 0xFFFFFFFF),
+                (0x08, named_group, gid_named),
+                (0x10, mask, 0xFFFFFFFF),
+                (0x20, other, 0xFFFFFFFF),
+            ]
+        )
+        try:
+            os.setxattr(path, "system.posix_acl_access", acl)
+        except OSError as e:
+            if e.errno in (errno.ENOTSUP, errno.EOPNOTSUPP, errno.EPERM):
+                pytest.skip("POSIX ACL xattrs not supported")
+            raise
+        facl_str = XattrSource(numeric=True).get(path)
+
+        for label, (uid, gids) in users.items():
+            memberships[str(uid)] = [str(g) for g in gids]
+            facl = FACLKernel.from_facl(
+                facl_str,
+                path=path,
+                numeric=True,
+                groups=StaticGroups(memberships),
+                source=SnapshotSource({path: facl_str}),
+            )
+            expected = _access_as(path, uid, gids)
+            for c in "rwx":
+                perms = "".join(p if p == c else "-" for p in "rwx")
+                assert facl.has_permission(f"user:{uid}:{perms}", "at_least") == (
+                    c in expected
+                ), (label, facl_str, perms, expected)
+
+
+def test_facl_kernel_mode_only(tmp_path):
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    os.chmod(path, 0o640)
+    source = XattrSource(numeric=True)
+    facl = FACLKernel(path=path, source=source, numeric=True)
+    text = FACLKernel.from_facl(source.get(path), path=path, numeric=True)
+    uid, gid = os.stat(path).st_uid, os.stat(path).st_gid
+    for acl in [
+        f"user:{uid}:rw-",
+        f"group:{gid}:r--",
+        f"group:{gid}:-w-",
+        "other::r--",
+    ]:
+        assert facl.has_permission(acl) == text.has_permission(acl)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root"
+)
+def test_facl_kernel_minimal_acls_match_os_access(monkeypatch):
+    """Differential test for directories, root and minimal ACLs from mode bits."""
+    base = tempfile.mkdtemp(prefix="pyfacl-kernel-")
+    try:
+        os.chmod(base, 0o711)
+        parent = os.path.dirname(base)
+        while parent != "/":
+            if not os.stat(parent).st_mode & 0o001:
+                pytest.skip(f"{parent} is not searchable by other users")
+            parent = os.path.dirname(parent)
+        # the header paths are relative, the result must not depend on the cwd
+        monkeypatch.chdir(base)
+
+        users = {"owner": (50001, [60009]), "group": (50003, [60001])}
+        users["other"] = (50003, [60009])
+        source = XattrSource(numeric=True)
+        for i, (is_dir, mode) in enumerate(
+            itertools.product([False, True], [0o000, 0o100, 0o600, 0o654, 0o705])
+        ):
+            path = os.path.join(base, f"entry{i}")
+            if is_dir:
+                os.mkdir(path)
+            else:
+                open(path, "w").close()
+            os.chown(path, 50001, 60001)
+            os.chmod(path, mode)
+            facl_str = source.get(path)
+            facls = [
+                FACLKernel(path=path, numeric=True, source=source),
+                FACLKernel.from_facl(facl_str, path=path, numeric=True),
+            ]
+
+            expected = {
+                0: "".join(
+                    c if os.access(path, flag) else "-"
+                    for c, flag in zip("rwx", (os.R_OK, os.W_OK, os.X_OK))
+                )
+            }
+            for uid, gids in users.values():
+                expected[uid] = _access_as(path, uid, gids)
+            memberships = {
+                str(uid): [str(g) for g in gids] for uid, gids in users.values()
+            }
+            for facl in facls:
+                facl.groups_resolver = StaticGroups(memberships)
+                for uid, access in expected.items():
+                    for c in "rwx":
+                        perms = "".join(p if p == c else "-" for p in "rwx")
+                        assert facl.has_permission(f"user:{uid}:{perms}") == (
+                            c in access
+                        ), (is_dir, oct(mode), uid, perms, access)
+    finally:
+        shutil.rmtree(base)
+
+
+def test_facl_kernel_scan_directory_file_types(tmp_path):
+    os.mkdir(tmp_path / "dir")
+    (tmp_path / "file").touch()
+    for name in ["dir", "file"]:
+        os.chmod(tmp_path / name, 0o644)
+
+    # same mode bits and owners, but root only gets --x on the directory
+    results = dict(FACLKernel.scan_directory(str(tmp_path), "user:root:--x"))
+    for name in ["dir", "file"]:
+        path = str(tmp_path / name)
+        facl = FACLKernel(path=path, source=XattrSource())
+        assert results[path] == facl.has_permission("user:root:--x")
+    assert results[str(tmp_path / "dir")] is True
+    assert results[str(tmp_path / "file")] is False
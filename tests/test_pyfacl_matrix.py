@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from pyfacl import FACLMatrix, XattrSource
+
+PATHS = ["/home/user1/project", "/home/user1", "/home"]
+ACLS = ["user:user1:r-x", "user:root:r-x", "group:group2:r-x", "other::--x"]
+
+
+def test_facl_matrix_python(acls_fixture):
+    facl_matrix = FACLMatrix(PATHS, v=0)
+
+    matrix = facl_matrix.matrix(
+        ACLS, "at_least", trace=True, engine="python", _pytest_acls=acls_fixture
+    )
+    assert matrix == [
+        [True, True, False, True],
+        [True, True, False, True],
+        [True, True, False, True],
+    ]
+
+    rows, columns = facl_matrix.matrix(
+        ["group:group2:r-x"],
+        "at_least",
+        sparse=True,
+        engine="python",
+        _pytest_acls=acls_fixture,
+    )
+    assert (rows, columns) == ([0], [0])
+
+
+@pytest.mark.parametrize("mode", ["at_least", "exact", "at_most"])
+@pytest.mark.parametrize("flags", [{}, {"trace": True}, {"can_execute": True}], ids=str)
+def test_facl_matrix_numpy_matches_python(acls_fixture, mode, flags):
+    pytest.importorskip("numpy")
+    facl_matrix = FACLMatrix(PATHS, v=0)
+
+    dense = facl_matrix.matrix(
+        ACLS, mode, engine="numpy", _pytest_acls=acls_fixture, **flags
+    )
+    expected = facl_matrix.matrix(
+        ACLS, mode, engine="python", _pytest_acls=acls_fixture, **flags
+    )
+    assert dense.tolist() == expected
+
+    rows, columns = facl_matrix.matrix(
+        ACLS, mode, sparse=True, engine="numpy", _pytest_acls=acls_fixture, **flags
+    )
+    assert sorted(zip(rows.tolist(), columns.tolist())) == [
+        (i, j) for i, row in enumerate(expected) for j, cell in enumerate(row) if cell
+    ]
+
+
+def test_facl_matrix_invalid_engine(acls_fixture):
+    with pytest.raises(ValueError, match="Invalid engine"):
+        FACLMatrix(PATHS).matrix(ACLS, engine="gpu", _pytest_acls=acls_fixture)
+
+
+def test_facl_matrix_without_numpy(acls_fixture, monkeypatch):
+    monkeypatch.setattr("pyfacl.pyfacl_matrix.np", None)
+    facl_matrix = FACLMatrix(PATHS, v=0)
+
+    matrix = facl_matrix.matrix(ACLS, "at_least", _pytest_acls=acls_fixture)
+    assert isinstance(matrix, list)
+    with pytest.raises(ValueError, match="requires NumPy"):
+        facl_matrix.matrix(ACLS, engine="numpy", _pytest_acls=acls_fixture)
+
+
+@pytest.mark.parametrize("mode", ["at_least", "exact", "at_most"])
+@pytest.mark.parametrize("flags", [{}, {"trace": True}, {"can_execute": True}], ids=str)
+def test_facl_matrix_numpy_owner_queries(acls_fixture, mode, flags):
+    pytest.importorskip("numpy")
+    facl_matrix = FACLMatrix(PATHS, v=0)
+    acls = ["user::rwx", "group::r-x", "user::--x", "user:user1:r-x"]
+
+    dense = facl_matrix.matrix(
+        acls, mode, engine="numpy", _pytest_acls=acls_fixture, **flags
+    )
+    assert dense.tolist() == facl_matrix.matrix(
+        acls, mode, engine="python", _pytest_acls=acls_fixture, **flags
+    )
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_facl_matrix_resolves_symlinks(engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    base = tempfile.mkdtemp(prefix="pyfacl-matrix-")
+    try:
+        os.chmod(base, 0o755)
+        parent = base
+        while parent != "/":
+            if not os.stat(parent).st_mode & 0o001:
+                pytest.skip(f"{parent} is not searchable by other users")
+            parent = os.path.dirname(parent)
+        closed = os.path.join(base, "closed")
+        os.makedirs(os.path.join(closed, "real"), 0o755)
+        os.mkdir(os.path.join(base, "open"), 0o755)
+        link = os.path.join(base, "open", "link")
+        os.symlink(os.path.join(closed, "real"), link)
+        os.chmod(closed, 0o700)
+
+        # the link is reachable through open/, its target is not
+        facl_matrix = FACLMatrix([link], source=XattrSource())
+        matrix = facl_matrix.matrix(
+            ["other::r-x"], can_execute=True, sparse=True, engine=engine
+        )
+        assert list(matrix[0]) == []
+        os.chmod(closed, 0o755)
+        matrix = facl_matrix.matrix(
+            ["other::r-x"], can_execute=True, sparse=True, engine=engine
+        )
+        assert list(matrix[0]) == [0]
+    finally:
+        shutil.rmtree(base)
@@ -0,0 +1,70 @@
+from conftest import CountingDict, generate_facl_str
+
+import pyfacl
+from pyfacl import FACLHas, FACLTrace, TraceMemo
+
+
+def test_trace_memo_reuses_ancestors(acls_fixture):
+    acls = CountingDict(acls_fixture)
+    acls["/home/user1/other"] = generate_facl_str("/home/user1/other", "user1", "g")
+    memo = TraceMemo()
+
+    trace = FACLTrace(path="/home/user1/project", memo=memo)._trace(
+        "user:root:r-x", "at_least", _pytest_acls=acls
+    )
+    assert len(acls.lookups) == 4
+
+    # sibling only evaluates its own level
+    acls.lookups.clear()
+    sibling = FACLTrace(path="/home/user1/other", memo=memo)._trace(
+        "user:root:r-x", "at_least", _pytest_acls=acls
+    )
+    assert acls.lookups == ["/home/user1/other"]
+    assert [e["path"] for e in sibling] == [
+        "/",
+        "/home",
+        "/home/user1",
+        "/home/user1/other",
+    ]
+    assert [e["index"] for e in sibling] == [0, 1, 2, 3]
+
+    # fully cached trace is identical and needs no lookups
+    acls.lookups.clear()
+    cached = FACLTrace(path="/home/user1/project", memo=memo)._trace(
+        "user:root:r-x", "at_least", _pytest_acls=acls
+    )
+    assert acls.lookups == []
+    assert cached == trace
+
+    # different query is not served from the memo
+    FACLTrace(path="/home/user1/project", memo=memo)._trace(
+        "user:root:r-x", "exact", _pytest_acls=acls
+    )
+    assert len(acls.lookups) == 4
+
+
+def test_trace_memo_stops_at_missing_acl(acls_fixture_with_file):
+    memo = TraceMemo()
+    trace = FACLTrace(path="/home/user1/file.txt", memo=memo)._trace(
+        "user:user2:rwx", "at_least", _pytest_acls=acls_fixture_with_file
+    )
+    assert memo.get("/home/user1/file.txt", "user:user2:rwx", "at_least") == [
+        {k: v for k, v in trace[0].items() if k != "index"}
+    ]
+
+
+def test_has_memo(acls_fixture):
+    memo = TraceMemo()
+    acls = CountingDict(acls_fixture)
+    facl_has = FACLHas(path="/home/user1/project", memo=memo)
+
+    assert facl_has.has_permission("group:group2:r-x", "at_least", _pytest_acls=acls)
+    acls.lookups.clear()
+    assert pyfacl.has_permission(
+        "/home/user1/project",
+        "group:group2:r-x",
+        can_execute=True,
+        memo=memo,
+        _pytest_acls=acls,
+    )
+    assert acls.lookups == ["/home/user1/project"]
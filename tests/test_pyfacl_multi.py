@@ -0,0 +1,109 @@
+import pytest
+from conftest import generate_facl_str
+
+import pyfacl
+from pyfacl import FACLHas, FACLMatrix, FACLMulti, GroupResolver
+
+
+def test_facl_multi_matrix(acls_fixture):
+    facl_multi = FACLMulti(path="/home/user1/project", v=0)
+
+    result = facl_multi.matrix(
+        ["user:user1:rwx", "user:root:rwx", "group:group2:r-x"],
+        mode="at_least",
+        trace=True,
+        _pytest_acls=acls_fixture,
+    )
+
+    assert result["paths"] == ["/", "/home", "/home/user1", "/home/user1/project"]
+    assert result["matrix"] == [
+        [True, True, False],
+        [True, True, False],
+        [True, False, False],
+        [True, False, True],
+    ]
+
+
+def test_facl_multi_has_permission(acls_fixture):
+    facl_multi = FACLMulti(path="/home/user1/project", v=0)
+    acls = ["user:user1:r-x", "user:root:rwx", "group:group2:r-x", "other::r-x"]
+
+    # single path
+    assert facl_multi.has_permission(acls, "at_least", _pytest_acls=acls_fixture) == {
+        "user:user1:r-x": True,
+        "user:root:rwx": False,
+        "group:group2:r-x": True,
+        "other::r-x": False,
+    }
+
+    # can execute: parents only need --x
+    result = facl_multi.has_permission(
+        acls, "at_least", can_execute=True, _pytest_acls=acls_fixture
+    )
+    assert result["group:group2:r-x"] is True
+
+    # trace: group2 falls back to other::--x on parents
+    result = facl_multi.has_permission(
+        acls, "at_least", trace=True, _pytest_acls=acls_fixture
+    )
+    assert result["group:group2:r-x"] is False
+
+
+def test_facl_multi_matches_single_checks(acls_fixture):
+    """Multi-principal results agree with the single-principal API."""
+    acls = ["user:user1:r-x", "user:root:r-x", "group:group1:--x", "other::--x"]
+    for mode in ["at_least", "exact", "at_most"]:
+        for flags in [{}, {"trace": True}, {"can_execute": True}]:
+            result = pyfacl.has_permissions(
+                "/home/user1/project", acls, mode, _pytest_acls=acls_fixture, **flags
+            )
+            for acl in acls:
+                assert result[acl] == pyfacl.has_permission(
+                    "/home/user1/project",
+                    acl,
+                    mode,
+                    _pytest_acls=acls_fixture,
+                    **flags,
+                )
+
+
+def test_has_permissions_both_flags_raises():
+    with pytest.raises(ValueError, match="Cannot set both"):
+        pyfacl.has_permissions(
+            "/some/path", ["other::r-x"], trace=True, can_execute=True
+        )
+
+
+def test_group_resolver_parse_output():
+    output = "user1 : group1 group2\nuser2 : group3\n"
+    parsed = GroupResolver._parse_groups_output(output, ["user1", "user2", "user3"])
+    assert parsed == {"user1": ["group1", "group2"], "user2": ["group3"]}
+
+
+@pytest.mark.parametrize("mode", ["at_least", "exact", "at_most"])
+def test_facl_multi_root_can_execute(mode):
+    acls = {"/": generate_facl_str("/", "root", "group1", ["group:g2:r--"])}
+    queries = ["group:g2:r--", "group:group1:r-x", "other::--x", "user:root:rwx"]
+    engines = ["python"]
+    try:
+        import numpy  # noqa: F401
+
+        engines.append("numpy")
+    except ImportError:
+        pass
+
+    multi = pyfacl.has_permissions(
+        "/", queries, mode, can_execute=True, _pytest_acls=acls
+    )
+    for engine in engines:
+        matrix = FACLMatrix(["/"]).matrix(
+            queries, mode, can_execute=True, engine=engine, _pytest_acls=acls
+        )
+        assert dict(zip(queries, matrix[0])) == multi
+    for acl in queries:
+        assert multi[acl] == FACLHas(path="/").has_permission(
+            acl, mode, _pytest_acls=acls
+        )
+    if mode == "at_least":
+        # g2 cannot navigate into `/`
+        assert multi["group:g2:r--"] is False
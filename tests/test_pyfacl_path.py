@@ -0,0 +1,95 @@
+import os
+
+from conftest import generate_facl_str
+
+from pyfacl import (
+    CachingSource,
+    FACLHas,
+    FACLMulti,
+    FACLTrace,
+    PathResolver,
+    SnapshotSource,
+)
+from pyfacl.pyfacl_path import ancestors
+
+
+def test_path_resolver(tmp_path):
+    real = tmp_path / "real"
+    (real / "sub").mkdir(parents=True)
+    os.symlink(real, tmp_path / "link")
+    os.symlink("sub", real / "rel")
+    base = os.path.realpath(tmp_path)
+
+    resolver = PathResolver()
+    assert resolver.resolve(f"{tmp_path}/link/sub/x") == f"{base}/real/sub/x"
+    assert resolver.resolve(f"{tmp_path}/link/rel") == f"{base}/real/sub"
+    # '..' is applied after resolving the symlink, not lexically
+    assert resolver.resolve(f"{tmp_path}/link/sub/../..") == base
+    assert resolver.resolve("/a/./b//c") == "/a/b/c"
+    assert resolver.levels("/a/b") == ["/a/b", "/a", "/"]
+
+    # components are cached
+    assert f"{base}/link" in resolver._components
+    resolver.clear()
+    assert not resolver._components
+
+
+def test_trace_follows_symlinks(tmp_path, acls_fixture):
+    link = str(tmp_path / "link")
+
+    # pretend that `link` is a symlink to the fixture's /home/user1, and that the
+    # snapshot is a live source (symlinks are only resolved for live sources)
+    live = SnapshotSource(dict(acls_fixture))
+    live.reads_filesystem = True
+    source = CachingSource(live)
+    resolver = PathResolver()
+    resolver._components[os.path.join(os.path.realpath(tmp_path), "link")] = (
+        "/home/user1"
+    )
+    trace = FACLTrace(path=f"{link}/project", resolver=resolver, source=source)._trace(
+        "user:user1:r-x", "at_least"
+    )
+    assert [t["path"] for t in trace] == [
+        "/",
+        "/home",
+        "/home/user1",
+        "/home/user1/project",
+    ]
+    assert FACLHas(
+        path=f"{link}/project", resolver=resolver, source=source
+    ).has_permission("user:user1:r-x", "at_least")
+
+
+def test_snapshot_keeps_symlinks(tmp_path, caplog):
+    (tmp_path / "real").mkdir()
+    os.symlink(tmp_path / "real", tmp_path / "link")
+    path = f"{tmp_path}/link/file"
+
+    # a snapshot captured elsewhere, where `link` is not a symlink
+    acls = {
+        level: generate_facl_str(level, "user1", "group1", ["user:user1:r-x"])
+        for level in ancestors(path)
+    }
+    source = SnapshotSource(acls)
+    for cls in [FACLTrace, FACLHas]:
+        result = cls(path=path, source=source).check("user:user1:r-x")
+        assert result.granted
+        assert result.chain[-1]["path"] == path
+    multi = FACLMulti(path=path, source=source)
+    assert multi.has_permission(["user:user1:r-x"], "at_least", trace=True) == {
+        "user:user1:r-x": True
+    }
+    assert "No FACL" not in caplog.text
+
+
+def test_caching_source_canonical_keys(tmp_path):
+    (tmp_path / "real").mkdir()
+    os.symlink(tmp_path / "real", tmp_path / "link")
+    real = os.path.realpath(tmp_path / "real")
+    source = CachingSource(
+        SnapshotSource({real: generate_facl_str(real, "user1", "group1")}),
+        resolver=PathResolver(),
+    )
+    facls = source.get_many([str(tmp_path / "link"), str(tmp_path / "real")])
+    assert len(set(facls.values())) == 1
+    assert source.misses == 1
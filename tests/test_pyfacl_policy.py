@@ -0,0 +1,89 @@
+import json
+import re
+
+import pytest
+from conftest import generate_facl_str
+
+from pyfacl import FACLPolicy
+from pyfacl.pyfacl_policy import _glob_to_regex, load_rules
+
+RULES = [
+    {
+        "name": "user1 can reach the project",
+        "acl": "user:user1:r-x",
+        "paths": "/home/user1/**",
+        "can_execute": True,
+    },
+    {
+        "name": "other has at most --x",
+        "acl": "other::--x",
+        "mode": "at_most",
+        "paths": ["/home/**"],
+    },
+    {
+        "name": "group2 can read every level",
+        "acl": "group:group2:r-x",
+        "paths": "/home/*/project",
+        "trace": True,
+    },
+]
+
+
+@pytest.mark.parametrize(
+    "pattern,path,match",
+    [
+        ("/home/**", "/home", True),
+        ("/home/**", "/home/a/b", True),
+        ("/home/**", "/homes", False),
+        ("/home/*/project", "/home/user1/project", True),
+        ("/home/*/project", "/home/a/b/project", False),
+        ("/home/**/project", "/home/a/b/project", True),
+        ("/home/**/project", "/home/project", True),
+        ("/data?", "/data1", True),
+    ],
+)
+def test_glob_to_regex(pattern, path, match):
+    assert bool(re.match(_glob_to_regex(pattern), path)) == match
+
+
+def test_policy_check(acls_fixture):
+    acls = dict(acls_fixture)
+    acls["/home/user1/open"] = generate_facl_str(
+        "/home/user1/open", "user1", "group1", ["other::rwx"]
+    ).replace("other::--x\n", "")
+
+    policy = FACLPolicy(RULES)
+    assert policy._roots() == ["/home"]
+    assert [r["name"] for r in policy.matching_rules("/home/user1/project")] == [
+        r["name"] for r in RULES
+    ]
+
+    violations = list(policy.check(paths=sorted(acls), _pytest_acls=acls))
+    assert [(v["rule"], v["path"]) for v in violations] == [
+        ("other has at most --x", "/home/user1/open"),
+        ("group2 can read every level", "/home/user1/project"),
+    ]
+
+
+def test_policy_walk_and_load(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "file").write_text("x")
+    rules = [{"acl": "other::--x", "mode": "at_most", "paths": f"{tmp_path}/a/**"}]
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"rules": rules}))
+
+    policy = FACLPolicy.from_file(str(rules_file))
+    assert sorted(policy.walk()) == [
+        f"{tmp_path}/a",
+        f"{tmp_path}/a/b",
+        f"{tmp_path}/a/file",
+    ]
+
+    toml_file = tmp_path / "rules.toml"
+    toml_file.write_text(
+        '[[rules]]\nacl = "other::--x"\nmode = "at_most"\npaths = "/data1/**"\n'
+    )
+    assert load_rules(str(toml_file))[0]["paths"] == "/data1/**"
+
+    with pytest.raises(ValueError):
+        FACLPolicy([{"acl": "other::--x", "paths": "/", "mode": "some"}])
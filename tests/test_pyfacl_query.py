@@ -0,0 +1,96 @@
+import pickle
+
+import pytest
+
+import pyfacl
+from pyfacl import FACL, FACLHas, FACLMulti, FACLTrace, Query, TraceMemo, compile_query
+
+
+def test_compile_query():
+    query = compile_query("u:user1:r-x", "exact")
+    assert isinstance(query, Query)
+    assert (query.type, query.name, query.permissions) == ("user", "user1", "r-x")
+    assert query.bits == 5 and query.mode == "exact"
+    assert str(query) == "u:user1:r-x"
+    assert compile_query(query, "exact") is query
+    assert compile_query(query, "at_most").mode == "at_most"
+
+    navigation = query.navigation()
+    assert (navigation.permissions, navigation.mode) == ("--x", "at_least")
+    assert query.navigation() is navigation
+    assert pickle.loads(pickle.dumps(query)).acl == query.acl
+
+
+@pytest.mark.parametrize(
+    "acl, mode",
+    [
+        ("user1:r-x", "at_least"),
+        ("x:user1:r-x", "at_least"),
+        ("user:user1:rwxr", "at_least"),
+        ("user:user1:abc", "at_least"),
+        ("user:user1:r-x", "most"),
+    ],
+)
+def test_compile_query_invalid(acl, mode):
+    with pytest.raises(ValueError):
+        compile_query(acl, mode)
+
+
+def test_query_accepted_everywhere(acls_fixture):
+    path = "/home/user1/project"
+    query = compile_query("user:user1:rwx")
+    facl = FACL.from_facl(acls_fixture[path])
+    assert facl.has_permission(query) == facl.has_permission("user:user1:rwx")
+    assert facl.check(query).acl == "user:user1:rwx"
+
+    for acl in ("user:user1:rwx", "group:group2:r-x", "other::r--"):
+        for trace, can_execute in ((True, False), (False, True)):
+            assert pyfacl.has_permission(
+                path,
+                compile_query(acl),
+                trace=trace,
+                can_execute=can_execute,
+                _pytest_acls=acls_fixture,
+            ) == pyfacl.has_permission(
+                path,
+                acl,
+                trace=trace,
+                can_execute=can_execute,
+                _pytest_acls=acls_fixture,
+            )
+
+    # the mode of the query applies unless a mode is passed
+    exact = compile_query("user:user1:r--", "exact")
+    assert not pyfacl.has_permission(path, exact, _pytest_acls=acls_fixture)
+    assert pyfacl.has_permission(path, exact, "at_least", _pytest_acls=acls_fixture)
+
+    assert pyfacl.has_permissions(
+        path, [query, "group:group2:r-x"], trace=True, _pytest_acls=acls_fixture
+    ) == {"user:user1:rwx": True, "group:group2:r-x": False}
+
+
+def test_query_pre_resolved_groups(acls_fixture):
+    path = "/home/user1/project"
+    source = pyfacl.SnapshotSource(acls_fixture)
+    query = compile_query("user:alice:r-x", groups=["group2"])
+    assert query.groups == ("group2",)
+
+    facl = FACL.from_facl(acls_fixture[path])
+    assert facl.get_applicable_acl(query)["line"] == "group:group2:r-x"
+    assert FACLMulti(path=path, source=source).has_permission([query], "at_least") == {
+        "user:alice:r-x": True
+    }
+    # navigation keeps the groups, other grants --x on every level
+    assert FACLHas(path=path, source=source).has_permission(query)
+
+
+def test_query_shares_memo(acls_fixture):
+    memo = TraceMemo()
+    source = pyfacl.SnapshotSource(acls_fixture)
+    path = "/home/user1/project"
+    FACLTrace(path=path, memo=memo, source=source).has_permission("user:user1:r-x")
+    query = compile_query("user:user1:r-x")
+    assert memo.get(path, query, "at_least") == memo.get(
+        path, "user:user1:r-x", "at_least"
+    )
+    assert memo.get(path, query, "at_least")
@@ -0,0 +1,77 @@
+import json
+
+import pyfacl
+from pyfacl import FACL, CheckResult, TraceResult
+
+
+def test_check_result(facl_fixture):
+    result = FACL.from_facl(facl_fixture).check("user:user1:r--", "at_least")
+    assert isinstance(result, CheckResult)
+    assert result and result.granted
+    assert result.entry["line"].startswith("user:")
+    assert result.elapsed >= 0
+    assert not hasattr(result, "__dict__")
+
+    data = json.loads(result.to_json())
+    assert data["granted"] is True
+    assert data["entry"] == result.entry["line"]
+    assert "is granted" in result.to_text()
+    assert result.to_text(color=True).startswith("\033[92m")
+
+
+def test_trace_result(acls_fixture):
+    result = pyfacl.has_permission(
+        "/home/user1/project",
+        "group:group2:r-x",
+        trace=True,
+        return_result=True,
+        _pytest_acls=acls_fixture,
+    )
+    assert isinstance(result, TraceResult)
+    assert not result
+    assert [level["path"] for level in result.chain][0] == "/"
+    assert len(result.to_dict()["chain"]) == len(result.chain)
+    assert "❌" in result.to_text()
+
+    # lazy results stop at the first denial
+    lazy = pyfacl.has_permission(
+        "/home/user1/project",
+        "group:group2:r-x",
+        trace=True,
+        lazy=True,
+        return_result=True,
+        _pytest_acls=acls_fixture,
+    )
+    assert not lazy and len(lazy.chain) == 1
+
+
+def test_can_execute_result(acls_fixture):
+    result = pyfacl.has_permission(
+        "/home/user1/project",
+        "user:user1:rwx",
+        can_execute=True,
+        return_result=True,
+        _pytest_acls=acls_fixture,
+    )
+    assert result.granted
+    assert [level["path"] for level in result.chain] == [
+        "/",
+        "/home",
+        "/home/user1",
+        "/home/user1/project",
+    ]
+    assert result.to_dict()["chain"][-1]["granted"] is True
+
+
+def test_result_paths(tmp_path):
+    # getfacl headers drop the leading "/", results keep the path passed in
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    source = pyfacl.XattrSource()
+    results = [
+        FACL(path=path, source=source).check("other::r--"),
+        FACL.from_facl(source.get(path), path=path).check("other::r--"),
+        pyfacl.FACLTrace(path=path, source=source).check("other::r--"),
+        pyfacl.FACLHas(path=path, source=source).check("other::r--"),
+    ]
+    assert [result.path for result in results] == [path] * 4
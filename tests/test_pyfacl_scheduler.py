@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+import pyfacl
+from pyfacl import FetchScheduler, ScheduledSource, SnapshotSource
+from pyfacl.pyfacl_capability import Mount
+from pyfacl.pyfacl_scheduler import ConcurrencyLimit, TokenBucket
+
+MOUNTS = [Mount("/", "ext4", "/dev/sda1"), Mount("/data", "gpfs", "data")]
+
+
+def test_token_bucket():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(10, burst=5, _clock=lambda: now[0], _sleep=sleep)
+    assert bucket.acquire(5) == 0
+    # the bucket is empty, 10 paths take one second
+    assert bucket.acquire(10) == 1.0
+    now[0] += 0.5
+    assert bucket.acquire(5) == 0
+    assert waits == [1.0]
+
+
+def test_adaptive_concurrency_limit():
+    limit = ConcurrencyLimit(8, min_limit=2, target_latency=0.1)
+    assert limit.limit == 2
+    for _ in range(10):
+        limit.acquire()
+        limit.release(0.01)
+    assert limit.limit > 2
+    grown = limit.limit
+    limit.acquire()
+    limit.release(1.0)
+    assert limit.limit < grown and limit.in_flight == 0
+
+    assert ConcurrencyLimit(8).limit == 8
+
+
+class SlowSource:
+    """
+    Record the maximum number of concurrent fetches.
+    """
+
+    def __init__(self, acls):
+        self.source = SnapshotSource(acls)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        return self.get_many([path])[path]
+
+    def get_many(self, paths):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return self.source.get_many(paths)
+
+
+def test_scheduled_source(acls_fixture):
+    acls = {f"/data/{i}": acls_fixture["/home"] for i in range(40)}
+    acls.update(acls_fixture)
+    slow = SlowSource(acls)
+    source = ScheduledSource(
+        slow, chunk_size=2, workers=8, max_concurrency=3, _mounts=MOUNTS
+    )
+    paths = sorted(acls)
+    assert source.get_many(paths) == acls
+    assert source.get("/home") == acls["/home"]
+    assert slow.max_in_flight <= 6  # 3 per mount
+
+    metrics = source.scheduler.metrics()
+    assert metrics["paths"] == len(paths) + 1
+    assert set(metrics["mounts"]) == {"/", "/data"}
+    assert metrics["mounts"]["/data"]["limit"] == 3
+    assert metrics["mounts"]["/data"]["in_flight"] == 0
+
+    # checks read through the scheduler like any other source
+    assert pyfacl.has_permission(
+        "/home/user1/project", "user:user1:rwx", trace=True, source=source
+    )
+
+
+def test_scheduled_source_rate(acls_fixture):
+    scheduler = FetchScheduler(rate=100, burst=1, _mounts=MOUNTS)
+    source = ScheduledSource(SnapshotSource(acls_fixture), scheduler=scheduler)
+    start = time.monotonic()
+    source.get_many(list(acls_fixture) * 3)
+    # 4 unique paths, the first token is free
+    assert time.monotonic() - start >= 0.03
+    assert scheduler.metrics()["throttled_seconds"] > 0
+
+
+def test_scheduled_source_audit_jobs(acls_fixture):
+    source = ScheduledSource(SnapshotSource(acls_fixture), rate=1000, _mounts=MOUNTS)
+    audit = pyfacl.FACLAudit("user:root:rwx", jobs=2, chunk_size=1, source=source)
+    assert dict(audit.run(sorted(acls_fixture))) == {
+        path: pyfacl.has_permission(path, "user:root:rwx", _pytest_acls=acls_fixture)
+        for path in acls_fixture
+    }
+
+
+class TimedSource(SnapshotSource):
+    """
+    Record the pid and time of every fetched path.
+    """
+
+    def __init__(self, acls, log):
+        super().__init__(acls)
+        self.log = log
+
+    def get(self, path):
+        with open(self.log, "a") as f:
+            f.write(f"{os.getpid()} {time.monotonic()}\n")
+        return super().get(path)
+
+
+def test_scheduled_source_audit_rate(acls_fixture, tmp_path):
+    rate = 50
+    acls = {f"/d{i}": acls_fixture["/home"] for i in range(16)}
+    acls["/"] = acls_fixture["/"]
+    log = tmp_path / "fetches"
+    source = ScheduledSource(
+        TimedSource(acls, str(log)), rate=rate, burst=1, _mounts=MOUNTS
+    )
+    audit = pyfacl.FACLAudit("user:root:rwx", jobs=2, chunk_size=1, source=source)
+    paths = sorted(acls)
+    assert len(dict(audit.run(paths))) == len(paths)
+
+    fetches = {}
+    for line in log.read_text().splitlines():
+        pid, t = line.split()
+        fetches.setdefault(pid, []).append(float(t))
+    assert sum(map(len, fetches.values())) >= len(paths)
+    for times in fetches.values():
+        # every worker gets half the rate, across all of its shards
+        if len(times) > 2:
+            assert (len(times) - 1) / (max(times) - min(times)) <= rate / 2 * 1.1
+    # and together they stay within the rate, after the first token of each
+    times = sorted(t for worker in fetches.values() for t in worker)
+    assert (len(times) - len(fetches)) / (times[-1] - times[0]) <= rate * 1.1
+
+
+def test_fetch_scheduler_split():
+    scheduler = FetchScheduler(rate=100, burst=10, max_concurrency=8, _mounts=MOUNTS)
+    worker = scheduler.split(4)
+    assert (worker.rate, worker.burst, worker.max_concurrency) == (25, 2.5, 8)
+    assert worker.bucket is not scheduler.bucket and worker.bucket.rate == 25
+    assert (scheduler.rate, scheduler.burst) == (100, 10)
+
+    source = ScheduledSource(SnapshotSource({}), scheduler=scheduler)
+    assert source.split(2).scheduler.rate == 50
+    assert source.scheduler is scheduler
+    assert FetchScheduler().split(4).rate is None
@@ -0,0 +1,164 @@
+import errno
+import os
+import shutil
+import struct
+
+import pytest
+
+import pyfacl
+from pyfacl import (
+    FACL,
+    ACLSource,
+    BatchGetfaclSource,
+    CachingSource,
+    GetfaclSource,
+    IndexSource,
+    SnapshotSource,
+    XattrSource,
+)
+from pyfacl.pyfacl_source import split_getfacl_output
+
+
+def encode_xattr(entries):
+    """Encode (tag, perm, id) tuples as a POSIX ACL xattr."""
+    data = struct.pack("<I", 2)
+    for tag, perm, qualifier in entries:
+        data += struct.pack("<HHI", tag, perm, qualifier)
+    return data
+
+
+@pytest.fixture
+def file_with_xattr_acl(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("")
+    os.chmod(path, 0o750)
+    acl = encode_xattr(
+        [(0x01, 7, 0xFFFFFFFF), (0x02, 5, 4242), (0x04, 5, 0xFFFFFFFF)]
+        + [(0x08, 4, 4343), (0x10, 5, 0xFFFFFFFF), (0x20, 1, 0xFFFFFFFF)]
+    )
+    try:
+        os.setxattr(path, "system.posix_acl_access", acl)
+    except OSError as e:
+        if e.errno in (errno.ENOTSUP, errno.EOPNOTSUPP, errno.EPERM):
+            pytest.skip("POSIX ACL xattrs not supported")
+        raise
+    return str(path)
+
+
+def test_sources_implement_protocol(tmp_path):
+    for source in [
+        GetfaclSource(),
+        BatchGetfaclSource(),
+        XattrSource(),
+        SnapshotSource({}),
+        IndexSource(str(tmp_path / "index.db")),
+        CachingSource(SnapshotSource({})),
+    ]:
+        assert isinstance(source, ACLSource)
+
+
+def test_xattr_source(file_with_xattr_acl):
+    facl_str = XattrSource(numeric=True).get(file_with_xattr_acl)
+    lines = facl_str.splitlines()
+    assert lines[0] == f"# file: {file_with_xattr_acl.lstrip('/')}"
+    assert lines[3:] == [
+        "user::rwx",
+        "user:4242:r-x",
+        "group::r-x",
+        "group:4343:r--",
+        "mask::r-x",
+        "other::--x",
+    ]
+
+    facl = FACL(path=file_with_xattr_acl, source=XattrSource(numeric=True))
+    assert facl.has_permission("user:4242:r-x", "exact")
+    assert facl.has_permission("group:4343:r--", "exact")
+    assert facl.has_permission("other::--x", "exact")
+
+
+def test_xattr_source_mode_bits(tmp_path):
+    path = tmp_path / "plain.txt"
+    path.write_text("")
+    os.chmod(path, 0o640)
+    facl_str = XattrSource().get(str(path))
+    assert facl_str.splitlines()[3:] == ["user::rw-", "group::r--", "other::---"]
+    assert XattrSource().get(str(tmp_path / "missing")) == ""
+
+
+def test_index_and_caching_source(tmp_path, acls_fixture):
+    paths = list(acls_fixture)
+    index = IndexSource.build(
+        str(tmp_path / "index.db"), paths, SnapshotSource(acls_fixture)
+    )
+    assert index.get_many(paths) == acls_fixture
+    assert index.get("/not/indexed") == ""
+
+    cache = CachingSource(index, maxsize=2)
+    cache.get_many(paths[:2])
+    cache.get_many(paths[:2])
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.get(paths[3])
+    assert len(cache._cache) == 2
+
+
+def test_has_permission_with_source(acls_fixture):
+    source = CachingSource(SnapshotSource(acls_fixture))
+    for flags in [{}, {"trace": True}, {"can_execute": True}]:
+        assert pyfacl.has_permission(
+            "/home/user1/project", "group:group2:r-x", source=source, **flags
+        ) == pyfacl.has_permission(
+            "/home/user1/project",
+            "group:group2:r-x",
+            _pytest_acls=acls_fixture,
+            **flags,
+        )
+    assert source.hits > 0
+
+
+def test_split_getfacl_output():
+    output = (
+        "# file: /home/user1\n"
+        "# owner: user1\n"
+        "# group: group1\n"
+        "user::rwx\n"
+        "group::r-x\n"
+        "other::--x\n"
+        "\n"
+        "# file: /home/user1/my\\040file\n"
+        "# owner: user1\n"
+        "# group: group1\n"
+        "user::rw-\n"
+        "group::r--\n"
+        "other::---\n"
+        "\n"
+    )
+    records = split_getfacl_output(output)
+    assert list(records) == ["/home/user1", "/home/user1/my file"]
+    assert records["/home/user1"].endswith("other::--x\n\n")
+    facl = FACL.from_facl(records["/home/user1/my file"])
+    assert facl.owner == "user1"
+    assert facl.has_permission("other::---", "exact")
+
+
+@pytest.mark.skipif(shutil.which("getfacl") is None, reason="getfacl not available")
+def test_batch_getfacl_source(tmp_path):
+    paths = []
+    for name in ["a", "b c", "d"]:
+        (tmp_path / name).write_text("")
+        paths.append(str(tmp_path / name))
+    missing = str(tmp_path / "missing")
+
+    source = BatchGetfaclSource(chunk_size=2, workers=2)
+    facls = source.get_many(paths + [missing])
+    assert facls[missing] == ""
+    for path in paths:
+        single = GetfaclSource().get(path)
+        # identical apart from the absolute `# file:` header
+        assert facls[path].split("\n")[1:] == single.split("\n")[1:]
+        batch, expected = FACL.from_facl(facls[path]), FACL.from_facl(single)
+        assert batch.acls and batch.acls == expected.acls
+        assert (batch.owner, batch.group, batch.flags) == (
+            expected.owner,
+            expected.group,
+            expected.flags,
+        )
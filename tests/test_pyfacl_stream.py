@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from conftest import TreeSource, make_tree
+
+import pyfacl
+from pyfacl import FACLStream
+
+
+@pytest.mark.parametrize("flags", [{}, {"trace": True}, {"can_execute": True}], ids=str)
+def test_stream_matches_checks(tmp_path, flags):
+    root = os.path.realpath(tmp_path)
+    make_tree(root)
+    source = TreeSource()
+    stream = FACLStream("user:user1:r-x", source=source, batch_size=2, **flags)
+    results = dict(stream.iter_results(root))
+    assert len(results) == 10
+    assert results == {
+        path: pyfacl.has_permission(path, "user:user1:r-x", source=source, **flags)
+        for path in results
+    }
+    assert stream.stats["total"] == 10
+    assert stream.stats["parsed"] <= 2
+    if flags:
+        # the denied subtree of a/private is not fetched
+        assert not results[os.path.join(root, "a/private/f2")]
+        assert stream.stats["fetched"] == 8
+
+
+def test_stream_max_depth(tmp_path):
+    make_tree(tmp_path)
+    stream = FACLStream("user:user1:r-x", source=TreeSource(), max_depth=1)
+    results = dict(stream.iter_results(tmp_path))
+    assert sorted(os.path.relpath(p, tmp_path) for p in results) == [
+        ".",
+        "a",
+        "c",
+        "f5",
+    ]
+
+
+def test_stream_sink_backpressure(tmp_path):
+    make_tree(tmp_path)
+    stream = FACLStream("user:user1:r-x", source=TreeSource(), queue_size=2)
+    release = threading.Event()
+    received = []
+
+    def sink(path, granted):
+        release.wait()
+        received.append((path, granted))
+
+    runner = threading.Thread(
+        target=lambda: received.append(stream.run(tmp_path, sink))
+    )
+    runner.start()
+    # the walk blocks after the first result plus a full queue
+    runner.join(timeout=0.5)
+    assert runner.is_alive() and stream.stats["total"] <= 4
+    release.set()
+    runner.join()
+    assert received[-1]["total"] == 10 and len(received) == 11
+
+    def failing_sink(path, granted):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        stream.run(tmp_path, failing_sink)
+
+
+RSS_SCRIPT = """
+import json, resource, sys
+from conftest import TreeSource
+from pyfacl import FACLStream
+
+stream = FACLStream("user:user1:r-x", source=TreeSource(distinct=True), max_acls=64)
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+stats = stream.run(sys.argv[1], lambda path, granted: None)
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+scale = 1 if sys.platform == "darwin" else 1024
+stats.update(acls=len(stream._acls), rss_growth=(after - before) * scale)
+print(json.dumps(stats))
+"""
+
+
+def _stream_rss(root):
+    """
+    Walk a tree in a fresh interpreter and return its stats and peak RSS growth.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(__file__), os.path.dirname(os.path.dirname(__file__))]
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", RSS_SCRIPT, str(root)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_stream_bounded_memory(tmp_path):
+    """
+    The peak RSS of the process grows by less than 2 MiB, independent of the tree
+    size.
+    """
+    pytest.importorskip("resource")
+    for name, directories, files in [("small", 2, 200), ("large", 20, 500)]:
+        for i in range(directories):
+            directory = tmp_path / name / f"d{i}"
+            directory.mkdir(parents=True)
+            for j in range(files):
+                (directory / f"f{j}").touch()
+
+    small = _stream_rss(tmp_path / "small")
+    large = _stream_rss(tmp_path / "large")
+    assert small["total"] == 403 and large["total"] == 10021
+    assert large["parsed"] > 64 and large["acls"] <= 64
+    assert large["rss_growth"] < 2 * 1024 * 1024
+    # 25 times more paths barely change the footprint
+    assert large["rss_growth"] - small["rss_growth"] < 1024 * 1024
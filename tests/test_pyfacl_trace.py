@@ -1,4 +1,6 @@
-from pyfacl import FACLTrace
+from conftest import CountingDict
+
+from pyfacl import FACLTrace, TraceMemo
 
 
 def test_facl_trace(acls_fixture):
@@ -191,3 +193,43 @@ def test_facl_trace_file_without_applicable_acl(acls_fixture_with_file):
     assert (
         file_entry["has_permission"] is False
     ), "File with no ACLs should have False for has_permission"
+
+
+def test_facl_trace_lazy(acls_fixture):
+    acls = CountingDict(acls_fixture)
+    facl_trace = FACLTrace(path="/home/user1/project", v=0)
+
+    # group2 is denied at '/', so nothing below is fetched
+    assert not facl_trace.has_permission(
+        "group:group2:r-x", "at_least", _pytest_acls=acls, lazy=True
+    )
+    assert acls.lookups == ["/"]
+
+    # granted everywhere: every level is fetched top-down
+    acls.lookups.clear()
+    entries = list(facl_trace.iter_trace("user:user1:r-x", "at_least", acls))
+    assert acls.lookups == ["/", "/home", "/home/user1", "/home/user1/project"]
+    assert [e["index"] for e in entries] == [0, 1, 2, 3]
+
+    # lazy and full trace agree
+    for acl in ["user:user1:rwx", "user:root:rwx", "group:group1:r-x", "other::--x"]:
+        for mode in ["at_least", "exact", "at_most"]:
+            assert facl_trace.has_permission(
+                acl, mode, _pytest_acls=acls, lazy=True
+            ) == facl_trace.has_permission(acl, mode, _pytest_acls=acls)
+
+
+def test_facl_trace_lazy_memo(acls_fixture):
+    acls = CountingDict(acls_fixture)
+    memo = TraceMemo()
+    FACLTrace(path="/home/user1", memo=memo).has_permission(
+        "user:user1:r-x", "at_least", _pytest_acls=acls, lazy=True
+    )
+    acls.lookups.clear()
+    entries = list(
+        FACLTrace(path="/home/user1/project", memo=memo).iter_trace(
+            "user:user1:r-x", "at_least", _pytest_acls=acls
+        )
+    )
+    assert acls.lookups == ["/home/user1/project"]
+    assert [e["path"] for e in entries][-2:] == ["/home/user1", "/home/user1/project"]
@@ -0,0 +1,74 @@
+from conftest import CountingDict, generate_facl_str
+
+import pyfacl
+from pyfacl import FACLAudit, FACLHas, FACLTrace, TraceMemo, TrustedPrefixes
+from pyfacl.pyfacl_capability import Mount
+
+
+def test_trusted_boundaries():
+    mounts = [Mount("/", "ext4", "/dev/sda1"), Mount("/data1", "gpfs", "data1")]
+    trusted = TrustedPrefixes(["/home"], mount_points=True, _mounts=mounts)
+    assert trusted.boundaries == {"/", "/home", "/data1"}
+    assert trusted.boundary_for("/home/user1/project") == "/home"
+    assert trusted.boundary_for("/data1/x") == "/data1"
+    assert trusted.boundary_for("/srv") == "/"
+    assert TrustedPrefixes(["/home"]).boundary_for("/srv") is None
+
+
+def test_trace_reuses_trusted_ancestors(acls_fixture):
+    acls = CountingDict(acls_fixture)
+    acls["/home/user2"] = generate_facl_str("/home/user2", "user1", "group1")
+    trusted = TrustedPrefixes(["/home"])
+
+    for path in ["/home/user1/project", "/home/user2"]:
+        for lazy in [False, True]:
+            for acl in ["user:user1:r-x", "user:root:r-x", "group:group2:r-x"]:
+                expected = FACLTrace(path=path).has_permission(
+                    acl, "at_least", _pytest_acls=acls_fixture, lazy=lazy
+                )
+                facl_trace = FACLTrace(path=path, trusted=trusted)
+                assert expected == facl_trace.has_permission(
+                    acl, "at_least", _pytest_acls=acls_fixture, lazy=lazy
+                )
+
+    # evaluated once: later traces only fetch the levels below /home
+    trace = FACLTrace(path="/home/user1/project", trusted=trusted)._trace(
+        "user:root:r-x", "at_least", _pytest_acls=acls
+    )
+    assert acls.lookups == ["/home/user1/project", "/home/user1"]
+    assert [t["path"] for t in trace] == [
+        "/",
+        "/home",
+        "/home/user1",
+        "/home/user1/project",
+    ]
+    assert [t["index"] for t in trace] == [0, 1, 2, 3]
+
+
+def test_trusted_precompute_and_memo(acls_fixture):
+    acls = CountingDict(acls_fixture)
+    trusted = TrustedPrefixes(["/home"])
+    trusted.precompute(["user:user1:rwx"], source=pyfacl.SnapshotSource(acls_fixture))
+    assert trusted.get("/home", "user:user1:--x", "at_least") is not None
+
+    memo = TraceMemo()
+    facl_has = FACLHas(path="/home/user1/project", memo=memo, trusted=trusted)
+    assert facl_has.has_permission("user:user1:rwx", "at_least", _pytest_acls=acls)
+    assert "/" not in acls.lookups and "/home" not in acls.lookups
+    # trusted verdicts are copied into the memo, so it stays complete
+    assert len(memo.get("/home/user1", "user:user1:--x", "at_least")) == 3
+
+
+def test_audit_with_trusted(acls_fixture):
+    paths = ["/home/user1", "/home/user1/project"]
+    for acl in ["user:user1:r-x", "user:root:r-x", "group:group2:r-x"]:
+        expected = {
+            path: pyfacl.has_permission(
+                path, acl, trace=True, _pytest_acls=acls_fixture
+            )
+            for path in paths
+        }
+        trusted = TrustedPrefixes(["/home"])
+        audit = FACLAudit(acl, trace=True, trusted=trusted)
+        assert dict(audit.run(paths, _pytest_acls=acls_fixture)) == expected
+        assert trusted.get("/home", acl, "at_least") is not None
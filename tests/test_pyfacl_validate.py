@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import pytest
+
+from pyfacl import FACLStream, FACLValidator, XattrSource
+from pyfacl.pyfacl_source import XATTR_ACCESS
+
+UID, GID = 50001, 60001
+
+needs_root = pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root"
+)
+
+
+def _validate_as(uid, gid, paths, **kwargs):
+    """Validate paths as another user in a child, return stats and discrepancies."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - child
+        try:
+            os.setgroups([])
+            os.setresgid(gid, gid, gid)
+            os.setresuid(uid, uid, uid)
+            validator = FACLValidator(
+                rate=1.0, numeric=True, source=XattrSource(numeric=True), **kwargs
+            )
+            for path in paths:
+                validator.observe(path)
+            data = {"stats": validator.stats, "discrepancies": validator.discrepancies}
+            os.write(write_fd, json.dumps(data).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as f:
+        return json.loads(f.read())
+
+
+@pytest.fixture
+def tree():
+    base = tempfile.mkdtemp(prefix="pyfacl-validate-")
+    os.chmod(base, 0o711)
+    parent = os.path.dirname(base)
+    while parent != "/":
+        if not os.stat(parent).st_mode & 0o001:
+            shutil.rmtree(base)
+            pytest.skip(f"{parent} is not searchable by other users")
+        parent = os.path.dirname(parent)
+    paths = []
+    for name, mode, owner in [
+        ("owned", 0o600, (UID, GID)),
+        ("group", 0o640, (0, GID)),
+        ("other", 0o604, (0, 0)),
+        ("private", 0o600, (0, 0)),
+    ]:
+        path = os.path.join(base, name)
+        open(path, "w").close()
+        os.chown(path, *owner)
+        os.chmod(path, mode)
+        paths.append(path)
+    closed = os.path.join(base, "closed")
+    os.mkdir(closed, 0o700)
+    open(os.path.join(closed, "file"), "w").close()
+    os.chmod(os.path.join(closed, "file"), 0o666)
+    paths.extend([closed, os.path.join(closed, "file")])
+    yield base, paths
+    shutil.rmtree(base)
+
+
+@needs_root
+def test_validator_matches_kernel(tree):
+    _, paths = tree
+    data = _validate_as(UID, GID, paths)
+    assert data["stats"]["sampled"] == len(paths)
+    assert data["stats"]["checks"] == 3 * len(paths)
+    assert data["discrepancies"] == []
+
+
+@needs_root
+def test_validator_records_discrepancies(tree):
+    base, _ = tree
+    path = os.path.join(base, "masked")
+    open(path, "w").close()
+    os.chmod(path, 0o640)
+    # user::rw-, user:50001:rw-, group::r--, mask::r--, other::---
+    data = struct.pack("<I", 2) + b"".join(
+        struct.pack("<HHI", tag, perm, qualifier)
+        for tag, perm, qualifier in [
+            (0x01, 6, 2**32 - 1),
+            (0x02, 6, UID),
+            (0x04, 4, 2**32 - 1),
+            (0x10, 4, 2**32 - 1),
+            (0x20, 0, 2**32 - 1),
+        ]
+    )
+    try:
+        os.setxattr(path, XATTR_ACCESS, data)
+    except OSError as e:
+        pytest.skip(f"Cannot set ACL xattr: {e}")
+
+    data = _validate_as(UID, GID, [path])
+    # the mask limits the named user to r--, which pyfacl does not apply
+    assert data["stats"]["discrepancies"] == 1
+    (discrepancy,) = data["discrepancies"]
+    assert discrepancy["acl"] == f"user:{UID}:-w-"
+    assert discrepancy["pyfacl"] and not discrepancy["kernel"]
+    assert discrepancy["result"]["chain"][-1]["entry"] == f"user:{UID}:rw-"
+    assert f"user:{UID}:rw- {path}" in discrepancy["explanation"]
+
+
+def test_validator_sampling(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"f{i}"
+        path.touch()
+        paths.append(str(path))
+
+    validator = FACLValidator(rate=0, source=XattrSource())
+    assert all(validator.observe(path) is None for path in paths)
+    assert validator.stats["observed"] == 20 and validator.stats["sampled"] == 0
+
+    validator = FACLValidator(rate=0.5, seed=1, source=XattrSource())
+    for path in paths:
+        validator.observe(path)
+    assert 0 < validator.stats["sampled"] < 20
+
+    # no time budget left after the first sample
+    validator = FACLValidator(rate=1.0, max_overhead=0.0, source=XattrSource())
+    for path in paths:
+        validator.observe(path)
+    assert validator.stats["sampled"] == 1
+    assert validator.stats["skipped_overhead"] == 19
+
+    with pytest.raises(ValueError):
+        FACLValidator(engine="kernel")
+
+
+def test_stream_validator(tmp_path):
+    for name in ["a", "b"]:
+        (tmp_path / name).touch()
+    validator = FACLValidator(rate=1.0, source=XattrSource())
+    stats = FACLStream("other::r--", source=XattrSource(), validator=validator).run(
+        str(tmp_path), lambda path, granted: None
+    )
+    assert validator.stats["observed"] == stats["total"] == 3
+    assert validator.stats["checks"] == 9
+
+
+@pytest.mark.parametrize("engine", ["facl", "trace", "has"])
+def test_validator_mode_only(tmp_path, engine):
+    path = str(tmp_path / "file")
+    open(path, "w").close()
+    os.chmod(path, 0o640)
+    validator = FACLValidator(rate=1.0, engine=engine, source=XattrSource())
+    assert validator.validate(path) == []
+    assert validator.stats["checks"] == 3